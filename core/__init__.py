@@ -7,11 +7,24 @@ __author__ = "Fire Modeling Team"
 # 导入核心类和函数
 from .cell import Cell, CellState
 from .fire_engine import FireEngine
+from .grid import TerrainGrid, LayerState
 from .cellular_automaton import CellularAutomaton
+from .event_engine import EventDrivenEngine
+from .batch import ScenarioBatch
+from .runner import ScenarioMatrixRunner
+from .decomposition import DomainDecomposition
+from .fork import ForkSnapshot
 
 __all__ = [
     'Cell',
     'CellState', 
     'FireEngine',
-    'CellularAutomaton'
+    'TerrainGrid',
+    'LayerState',
+    'CellularAutomaton',
+    'EventDrivenEngine',
+    'ScenarioBatch',
+    'ScenarioMatrixRunner',
+    'DomainDecomposition',
+    'ForkSnapshot'
 ] 
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+多情景批量模拟 - 共享静态地形，动态状态沿批维度堆叠后同步推进
+Batched Multi-Scenario Simulation - Shared Static Terrain, Dynamic State Stacked along a Batch Axis
+"""
+
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from .cell import CellState
+from .cellular_automaton import CellularAutomaton, UNBURNED
+from .fire_engine import with_wind_vector
+from .grid import LayerState
+from .kernels import edge_energy_transfer, fire_line_intensity
+
+# 情景覆盖项 → 配置键
+SCENARIO_OVERRIDES = {
+    'wind_vector': 'wind_vector',
+    'moisture': 'initial_moisture_content',
+    'fuel_load': 'initial_fuel_load',
+    'random_seed': 'random_seed',
+}
+
+# 不对应配置键的情景项
+SCENARIO_FIELDS = ('ignition_point', 'ignition_radius', 'name')
+
+class ScenarioBatch:
+    """
+    多情景批量模拟
+
+    各情景只在风向量、起火点、初始含水量、初始燃料载量（及随机种子）上不同：
+    静态地形与几何表只生成一次，两层动态数组堆叠为 (batch, height, width)，
+    能量传递、点燃、燃料消耗、树冠火跃变和火线强度对全部情景一次向量化计算，
+    逐情景执行的只有飞火抽样和少量簿记。
+
+    每个情景对应一个成员 CellularAutomaton，其层状态是批数组的视图，
+    结果与单独运行该情景相同，可直接用成员的 fire_state_at、burned_cells_at 等接口分析。
+    """
+
+    def __init__(self, config: dict, scenarios: List[Dict]):
+        """
+        初始化批量模拟
+
+        Args:
+            config: 基础配置参数字典
+            scenarios: 情景覆盖列表，每项可含 wind_vector、ignition_point、ignition_radius、
+                       moisture、fuel_load、random_seed，以及仅用于标识的 name
+        """
+        if not scenarios:
+            raise ValueError("scenarios must not be empty")
+        if config.get('adaptive_time_step', False):
+            raise ValueError("batched simulation requires a fixed time step (adaptive_time_step is set)")
+        if config.get('auto_expand_domain', False):
+            raise ValueError("batched simulation does not support auto_expand_domain (the terrain is shared)")
+
+        self.config = config
+        self.scenarios = [dict(scenario) for scenario in scenarios]
+        self.members = [CellularAutomaton(self._scenario_config(scenario)) for scenario in self.scenarios]
+
+        self.time_step = self.members[0].time_step
+        self.current_time = 0.0
+        self.terrain = None
+        self.stencil = None
+        self.surface: Optional[LayerState] = None   # (batch, height, width) 地表层状态
+        self.canopy: Optional[LayerState] = None    # (batch, height, width) 树冠层状态
+
+        self._running: List[int] = list(range(len(self.members)))   # 仍有活跃火点的情景
+        self._wind_factors: Dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _scenario_config(self, scenario: Dict) -> dict:
+        """基础配置叠加情景覆盖项"""
+        config = dict(self.config)
+        for key, value in scenario.items():
+            if key in SCENARIO_OVERRIDES:
+                config[SCENARIO_OVERRIDES[key]] = value
+            elif key not in SCENARIO_FIELDS:
+                raise ValueError(f"unknown scenario override: {key}")
+
+        if 'wind_vector' in scenario:
+            config = with_wind_vector(config, scenario['wind_vector'])
+        return config
+
+    def scenario_name(self, b: int) -> str:
+        """情景标识"""
+        return str(self.scenarios[b].get('name', b))
+
+    def initialize_terrain(self, terrain_type: str, **kwargs):
+        """
+        初始化共享地形，堆叠各情景的动态状态，并设置各情景的起火点
+
+        Args:
+            terrain_type: 地形类型 ("ideal" 或 "real")
+            **kwargs: 地形参数
+        """
+        first = self.members[0]
+        first.initialize_terrain(terrain_type, **kwargs)
+        self.terrain = first.terrain
+        self.stencil = first.stencil
+        for member in self.members[1:]:
+            member.attach_terrain(self.terrain, self.stencil)
+
+        # 各情景按自己的配置初始化后沿批维度堆叠，成员改用批数组的视图
+        self.surface = LayerState.stack([member.surface for member in self.members])
+        self.canopy = LayerState.stack([member.canopy for member in self.members])
+        spatial_index = first.spatial_index if first.enable_spotting else None
+        for b, member in enumerate(self.members):
+            member.surface = self.surface.select(b)
+            member.canopy = self.canopy.select(b)
+            member._spatial_index = spatial_index
+
+        self.current_time = 0.0
+        self._running = list(range(len(self.members)))
+        for member, scenario in zip(self.members, self.scenarios):
+            if 'ignition_point' in scenario:
+                member.set_ignition_point(scenario['ignition_point'], scenario.get('ignition_radius', 10.0))
+
+    def _wind_factor_table(self, enable_wind: bool) -> np.ndarray:
+        """各情景的风效应因子表堆叠为 (batch, 类别数)，风况不变时复用"""
+        key = tuple(member.fire_engine.wind_key(enable_wind) for member in self.members)
+        table = self._wind_factors.get(key)
+        if table is None:
+            if len(self._wind_factors) >= 8:
+                self._wind_factors.clear()
+            table = np.stack([self.stencil.wind_factor(member.fire_engine, enable_wind)
+                              for member in self.members])
+            self._wind_factors[key] = table
+        return table
+
+    def _gather(self, attr: str) -> Tuple[np.ndarray, List[Tuple[CellularAutomaton, int, int]]]:
+        """
+        拼接进行中情景的活跃集合为批扁平索引（按情景分段，段内保持各集合的顺序）
+
+        Returns:
+            indices: 批扁平索引 b·size + i
+            segments: [(成员, 段起点, 段终点)]
+        """
+        size = self.terrain.size
+        parts = []
+        segments = []
+        start = 0
+        for b in self._running:
+            member = self.members[b]
+            part = getattr(member, attr).indices()
+            parts.append(b * size + part)
+            segments.append((member, start, start + len(part)))
+            start += len(part)
+        indices = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        return indices, segments
+
+    def _split(self, indices: np.ndarray) -> List[Tuple[CellularAutomaton, np.ndarray]]:
+        """按情景拆分批扁平索引（索引须按情景有序），返回 [(成员, 层内扁平索引)]"""
+        size = self.terrain.size
+        bounds = np.searchsorted(indices // size, np.arange(len(self.members) + 1))
+        return [(self.members[b], indices[bounds[b]:bounds[b + 1]] - b * size)
+                for b in range(len(self.members)) if bounds[b] < bounds[b + 1]]
+
+    def step(self):
+        """所有进行中的情景同步推进一个时间步（阶段顺序与 CellularAutomaton.step 相同）"""
+        first = self.members[0]
+        dt = self.time_step
+        candidates = {}
+
+        # 1. 能量传递与预热：按各情景燃烧元胞逐边计算，代价与燃烧元胞总数成正比
+        for layer, attr in ((self.surface, '_burning_surface'), (self.canopy, '_burning_canopy')):
+            burning, _ = self._gather(attr)
+            if len(burning) == 0:
+                continue
+            targets, received = edge_energy_transfer(first.fire_engine, self.stencil, layer, burning, dt,
+                                                     first.enable_wind_effects,
+                                                     self._wind_factor_table(first.enable_wind_effects))
+            heated = received > 0
+            targets, received = targets[heated], received[heated]
+            layer.energy.reshape(-1)[targets] += received
+            moisture = layer.moisture.reshape(-1)
+            moisture[targets] = np.maximum(0.0, moisture[targets] - received * first.fire_engine.evaporation_coefficient)
+            candidates[attr] = targets
+
+        # 2. 点燃判定
+        for layer, attr, fire_type in ((self.surface, '_burning_surface', CellState.SURFACE_FIRE),
+                                       (self.canopy, '_burning_canopy', CellState.CROWN_FIRE)):
+            indices = candidates.get(attr)
+            if indices is None or len(indices) == 0:
+                continue
+            can_ignite = ((layer.state.reshape(-1)[indices] == UNBURNED) &
+                          (layer.energy.reshape(-1)[indices] >=
+                           layer.ignition_threshold(layer.moisture.reshape(-1)[indices])))
+            newly_ignited = indices[can_ignite]
+            layer.ignite(newly_ignited, fire_type, self.current_time + dt)
+            for member, part in self._split(newly_ignited):
+                getattr(member, attr).add(part)
+                if layer is self.surface:
+                    member._record_surface_ignition(part)
+
+        # 3. 燃料消耗与熄灭
+        for layer, attr, rate in ((self.surface, '_burning_surface', first.fuel_consumption_rate),
+                                  (self.canopy, '_burning_canopy', first.fuel_consumption_rate * 2)):
+            idx, segments = self._gather(attr)
+            if len(idx) == 0:
+                continue
+            fuel_load = layer.fuel_load.reshape(-1)
+            remaining = np.maximum(0.0, fuel_load[idx] - rate * dt)
+            if layer is self.surface:
+                consumed = fuel_load[idx] - remaining
+                for member, start, end in segments:
+                    member._surface_fuel_consumed += float(np.sum(consumed[start:end]))
+            fuel_load[idx] = remaining
+            layer.burn_time.reshape(-1)[idx] += dt
+
+            burned_out = idx[fuel_load[idx] <= 0.0]
+            layer.burn_out(burned_out, self.current_time + dt)
+            for member, part in self._split(burned_out):
+                getattr(member, attr).remove(part)
+
+        # 4. 树冠火跃变（可选）
+        if first.enable_crown_fire:
+            burning, _ = self._gather('_burning_surface')
+            if len(burning) > 0:
+                intensity = fire_line_intensity(first.fire_engine, self.stencil, self.surface, burning,
+                                                self._wind_factor_table(True))
+                critical_intensity = first.fire_engine.critical_crown_intensity(
+                    self.surface.canopy_base_height, self.surface.moisture.reshape(-1)[burning]
+                )
+                crown_candidates = burning[intensity > critical_intensity]
+                newly_crown_fires = crown_candidates[self.canopy.state.reshape(-1)[crown_candidates] == UNBURNED]
+                self.canopy.ignite(newly_crown_fires, CellState.CROWN_FIRE, self.current_time + dt)
+                for member, part in self._split(newly_crown_fires):
+                    member._burning_canopy.add(part)
+
+        # 5. 飞火（可选，逐情景使用各自的随机数发生器）
+        if first.enable_spotting:
+            for b in self._running:
+                self.members[b]._spotting_step()
+
+        # 6. 更新模拟时间
+        self.current_time += dt
+
+        # 7. 统计信息：最大火线强度对全部情景一次计算，再按情景分段取最大值
+        burning, segments = self._gather('_burning_surface')
+        intensity = np.zeros(0)
+        if len(burning) > 0:
+            intensity = fire_line_intensity(first.fire_engine, self.stencil, self.surface, burning,
+                                            self._wind_factor_table(True))
+        for member, start, end in segments:
+            member.current_time += dt
+            member._update_statistics(float(intensity[start:end].max()) if end > start else 0.0)
+
+            # 8. 记录历史
+            member._record_history()
+            member.step_sizes.append(dt)
+
+    def run_simulation(self, end_time: Optional[float] = None) -> List[Dict]:
+        """
+        同步运行全部情景；某个情景无活跃火点后停止推进，与单独运行时的结束时刻相同
+
+        Args:
+            end_time: 结束时间（分钟），None表示使用默认最大时间
+
+        Returns:
+            各情景的模拟结果字典列表（格式与 CellularAutomaton.run_simulation 相同）
+        """
+        if end_time is None:
+            end_time = self.members[0].max_simulation_time
+
+        print(f"开始批量火灾模拟（{len(self.members)} 个情景），目标时间: {end_time} 分钟")
+
+        for member in self.members:
+            member._rebuild_statistics()
+            member.step_sizes = []
+
+        while self.current_time < end_time and self._running:
+            self.step()
+
+            # 无活跃火点的情景自然结束
+            still_running = []
+            for b in self._running:
+                member = self.members[b]
+                if len(member._burning_surface) == 0 and len(member._burning_canopy) == 0:
+                    print(f"情景 {self.scenario_name(b)} 在 {member.current_time:.1f} 分钟时自然结束（无活跃火点）")
+                else:
+                    still_running.append(b)
+            self._running = still_running
+
+            # 每小时输出进度
+            if int(self.current_time) % 60 == 0:
+                print(f"模拟进度: {self.current_time:.1f} 分钟, "
+                      f"进行中情景: {len(self._running)}/{len(self.members)}")
+
+        print(f"批量模拟完成，总用时: {self.current_time:.1f} 分钟")
+
+        return [member.simulation_result() for member in self.members]
@@ -6,7 +6,7 @@ Cell Class Definition - Basic Unit for Fire Spread Model
 import numpy as np
 from enum import Enum
 from dataclasses import dataclass
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence
 
 class CellState(Enum):
     """元胞状态枚举"""
@@ -20,7 +20,7 @@ class LayerType(Enum):
     SURFACE = 0   # 地表层
     CANOPY = 1    # 树冠层
 
-@dataclass
+@dataclass(slots=True)
 class StaticAttributes:
     """静态属性 - 模拟开始前设定，不再变化"""
     id: int                    # 唯一标识符
@@ -36,7 +36,7 @@ class StaticAttributes:
     heat_content: float = 18500          # 热值 (kJ/kg)
     ignition_temp: float = 315           # 点燃温度 (°C)
 
-@dataclass 
+@dataclass(slots=True)
 class DynamicAttributes:
     """动态属性 - 模拟过程中不断变化"""
     state: CellState = CellState.UNBURNED
@@ -47,29 +47,65 @@ class DynamicAttributes:
     burn_time: float = 0.0              # 燃烧时间 (分钟)
 
 class Cell:
-    """元胞类 - 林火蔓延模型的基本单元"""
+    """
+    元胞类 - 林火蔓延模型的基本单元
+    
+    邻居以相对本元胞层内下标的偏移元组存放（最多8个；规则网格上同一边界类型的元胞共用一个元组），
+    访问 neighbors 时再从所属层的元胞序列中取出，元胞之间不互相持有引用；
+    各属性均用 __slots__ 存放，不建实例字典。本元胞的层内下标按 id 换算（id % 层元胞数）。
+    """
+    
+    __slots__ = ('static', 'dynamic', '_layer_cells', '_neighbor_offsets',
+                 '_ignition_threshold', '_base_ignition_energy', '_ignition_moisture_factor')
     
     def __init__(self, static_attrs: StaticAttributes, 
                  dynamic_attrs: Optional[DynamicAttributes] = None):
         self.static = static_attrs
         self.dynamic = dynamic_attrs or DynamicAttributes()
         
-        # 邻居元胞列表 (最多8个邻居)
-        self.neighbors: list = []
+        # 邻居：所属层的元胞序列 + 下标偏移元组 (最多8个邻居)
+        self._layer_cells: Optional[Sequence['Cell']] = None
+        self._neighbor_offsets: Tuple[int, ...] = ()
         
         # 点燃阈值（基于含水量动态计算）
         self._ignition_threshold = None
+        self._base_ignition_energy = 100.0
+        self._ignition_moisture_factor = 2.0
+    
+    @property
+    def neighbor_indices(self) -> Tuple[int, ...]:
+        """邻居在所属层元胞序列中的下标"""
+        if self._layer_cells is None:
+            return ()
+        index = self.static.id % len(self._layer_cells)
+        return tuple(index + offset for offset in self._neighbor_offsets)
+    
+    @property
+    def neighbors(self) -> Tuple['Cell', ...]:
+        """邻居元胞（按下标从所属层取出）"""
+        cells = self._layer_cells
+        return tuple(cells[i] for i in self.neighbor_indices)
+    
+    def set_neighbors(self, layer_cells: Sequence['Cell'], offsets: Tuple[int, ...]):
+        """
+        一次设定全部邻居
+        
+        Args:
+            layer_cells: 所属层的元胞序列（下标即层内网格索引）
+            offsets: 邻居下标相对本元胞下标的偏移元组（最多8个，可在元胞间共用）
+        """
+        if len(offsets) > 8:
+            raise ValueError(f"a cell has at most 8 neighbors, got {len(offsets)}")
+        self._layer_cells = layer_cells
+        self._neighbor_offsets = offsets
     
     @property
     def ignition_threshold(self) -> float:
         """点燃阈值 - 基于含水量和温度动态计算"""
         if self._ignition_threshold is None:
             # 使用配置参数计算点燃阈值
-            base_energy = getattr(self, '_base_ignition_energy', 100.0)
-            moisture_factor_exp = getattr(self, '_ignition_moisture_factor', 2.0)
-            
-            moisture_effect = np.exp(moisture_factor_exp * self.dynamic.moisture_content)
-            self._ignition_threshold = base_energy * moisture_effect
+            moisture_effect = np.exp(self._ignition_moisture_factor * self.dynamic.moisture_content)
+            self._ignition_threshold = self._base_ignition_energy * moisture_effect
         return self._ignition_threshold
     
     def set_ignition_parameters(self, base_energy: float, moisture_factor: float):
@@ -78,10 +114,26 @@ class Cell:
         self._ignition_moisture_factor = moisture_factor
         self._ignition_threshold = None  # 重置缓存
     
-    def add_neighbor(self, neighbor: 'Cell'):
-        """添加邻居元胞"""
-        if neighbor not in self.neighbors and len(self.neighbors) < 8:
-            self.neighbors.append(neighbor)
+    def add_neighbor(self, neighbor: 'Cell', layer_cells: Optional[Sequence['Cell']] = None):
+        """
+        追加单个邻居（兼容逐个添加的旧接口，批量建立时用 set_neighbors）
+        
+        邻居须与本元胞同属一层；其下标按 id 换算（层内网格索引 = id % 层元胞数）。
+        
+        Args:
+            neighbor: 邻居元胞
+            layer_cells: 所属层的元胞序列，已设定过时可省略
+        """
+        if layer_cells is not None:
+            self._layer_cells = layer_cells
+        if self._layer_cells is None:
+            raise ValueError("layer_cells is required for the first neighbor")
+        index = neighbor.static.id % len(self._layer_cells)
+        if self._layer_cells[index] is not neighbor:
+            raise ValueError(f"cell {neighbor.static.id} is not in this cell's layer")
+        offset = index - self.static.id % len(self._layer_cells)
+        if offset not in self._neighbor_offsets and len(self._neighbor_offsets) < 8:
+            self._neighbor_offsets += (offset,)
     
     def distance_to(self, other: 'Cell') -> float:
         """计算到其他元胞的三维距离"""
@@ -8,8 +8,21 @@ import random
 from typing import List, Dict, Tuple, Optional
 from .cell import Cell, CellState, LayerType
 from .fire_engine import FireEngine
+from .grid import TerrainGrid, LayerState, StencilTables, LayerCellView, GridCell, ActiveSet
+from .kernels import active_window, stencil_energy_transfer, fire_line_intensity
+from .spatial import build_spatial_index
+from .event_engine import EventDrivenEngine
+from .decomposition import DomainDecomposition
+from .travel_time import minimum_travel_time
+from .checkpoint import save_checkpoint, load_checkpoint
+from .fork import fork_simulation
 from .terrain import TerrainGenerator
 
+UNBURNED = CellState.UNBURNED.value
+SURFACE_FIRE = CellState.SURFACE_FIRE.value
+CROWN_FIRE = CellState.CROWN_FIRE.value
+BURNED_OUT = CellState.BURNED_OUT.value
+
 class CellularAutomaton:
     """多层元胞自动机 - 林火蔓延模拟"""
     
@@ -22,18 +35,47 @@ class CellularAutomaton:
         """
         self.config = config
         self.dt = config.get('time_step', 1.0)  # 时间步长（分钟）
+        self.time_step = self.dt
+        
+        # 自适应步长：无元胞临近点燃或燃尽时放大步长，直接跨到预计的下一个事件，
+        # 事件相对预计时刻最多延后 time_step_tolerance 分钟
+        self.adaptive_time_step = config.get('adaptive_time_step', False)
+        self.max_time_step = config.get('max_time_step', 10 * self.time_step)
+        self.time_step_tolerance = config.get('time_step_tolerance', 0.0)
+        self.step_sizes: List[float] = []
+        self._end_time: Optional[float] = None
         self.max_simulation_time = config.get('max_simulation_time', 4320)  # 最大模拟时间（72小时=4320分钟）
         
+        # 自动检查点：配置 output.checkpoint_path 时，run_simulation 每模拟 output.save_interval 分钟写一次
+        output_config = config.get('output', {})
+        self.checkpoint_path: Optional[str] = output_config.get('checkpoint_path')
+        self.checkpoint_interval = output_config.get('save_interval', 60)
+        self._resumed = False       # 刚从检查点恢复或分叉：下一次运行沿用已有的增量统计与步长记录
+        
+        # 自动扩展计算域：火场距网格边缘不足 expansion_margin 个元胞时，在该侧按地形规则增加行/列
+        # （至少 expansion_size，且不少于该方向现有尺寸的1/4，重建几何表的总代价与最终网格大小成正比）
+        self.auto_expand_domain = config.get('auto_expand_domain', False)
+        self.expansion_margin = config.get('expansion_margin', 2)
+        self.expansion_size = config.get('expansion_size', 50)
+        self._terrain_params: Optional[Dict] = None     # 理想地形参数（扩展时按同一规则生成新条带）
+        self._terrain_origin = (0, 0)                   # 首行、首列的网格编号
+        
         # 初始化组件
         self.fire_engine = FireEngine(config)
         self.terrain_generator = TerrainGenerator(config.get('cell_size', 10.0), config)
         
-        # 模拟状态
+        # 模拟状态（结构数组存储：静态地形 + 每层动态状态数组）
         self.current_time = 0.0
-        self.surface_cells: List[Cell] = []
-        self.canopy_cells: List[Cell] = []
-        self.burning_surface_cells: List[Cell] = []
-        self.burning_canopy_cells: List[Cell] = []
+        self.terrain: Optional[TerrainGrid] = None
+        self.stencil: Optional[StencilTables] = None
+        self.surface: Optional[LayerState] = None
+        self.canopy: Optional[LayerState] = None
+        self._burning_surface: Optional[ActiveSet] = None   # 燃烧中的地表元胞扁平索引
+        self._burning_canopy: Optional[ActiveSet] = None    # 燃烧中的树冠元胞扁平索引
+        self._shared_state = False      # fork() 后动态数组与燃烧集合仍与其他模拟共用（首次写入前复制）
+        
+        # 点燃候选：本步接收到能量的元胞扁平索引（只有它们可能越过点燃阈值）
+        self._ignition_candidates: Dict[LayerType, np.ndarray] = {}
         
         # 统计信息
         self.stats = {
@@ -43,6 +85,11 @@ class CellularAutomaton:
             'total_fuel_consumed': 0.0
         }
         
+        # 统计量的增量累计值（由点燃、燃料消耗的增量维护）
+        self._burned_surface_count = 0      # 已点燃地表元胞数
+        self._surface_fuel_consumed = 0.0   # 地表燃料累计消耗 (kg/m²，按元胞求和)
+        self._perimeter_edges = 0           # 已燃区域与未燃区域之间的元胞边数
+        
         # 历史记录
         self.fire_history = []
         self.stats_history = []
@@ -50,6 +97,12 @@ class CellularAutomaton:
         # 飞火参数
         self.spotting_probability = config.get('spotting_probability', 0.1)
         self.max_spotting_distance = config.get('max_spotting_distance', 500.0)
+        self.spotting_capture_radius = config.get('spotting_capture_radius', 50.0)  # 飞火落点捕获半径（米）
+        self._spatial_index = None
+        
+        # 随机数发生器：配置 random_seed 时使用独立的发生器（结果可复现），否则沿用全局 random 模块
+        self.random_seed = config.get('random_seed')
+        self.rng = random.Random(self.random_seed) if self.random_seed is not None else random
         
         # 燃料消耗速率
         self.fuel_consumption_rate = config.get('fuel_consumption_rate', 0.1)  # kg/m²/min
@@ -77,28 +130,172 @@ class CellularAutomaton:
             slope_angle = kwargs.get('slope_angle_deg', 30.0)
             intersection_distance = kwargs.get('intersection_distance', 1000.0)
             
-            self.surface_cells, self.canopy_cells = self.terrain_generator.create_ideal_terrain(
-                width, height, slope_angle, intersection_distance
+            # 相同参数的地形与几何表取自缓存（见 TerrainGenerator.ideal_terrain）
+            terrain, stencil = self.terrain_generator.ideal_terrain(
+                self.fire_engine, width, height, slope_angle, intersection_distance
             )
+            self.attach_terrain(terrain, stencil)
+            self._terrain_params = {'slope_angle_deg': slope_angle,
+                                    'intersection_distance': intersection_distance}
         else:
             raise NotImplementedError("真实地形初始化将在问题三中实现")
     
+    def attach_terrain(self, terrain: TerrainGrid, stencil: StencilTables):
+        """
+        使用已生成的静态地形与几何表（多个模拟可共用同一份），并按本模拟的配置新建两层动态状态
+        
+        Args:
+            terrain: 静态地形
+            stencil: 与地形匹配的每方向几何表
+        """
+        self.terrain = terrain
+        self.stencil = stencil
+        self._terrain_params = None
+        self._terrain_origin = (0, 0)
+        self._spatial_index = None
+        self.surface, self.canopy = self.terrain_generator.create_layer_states(self.terrain)
+        self._burning_surface = ActiveSet(self.terrain.size)
+        self._burning_canopy = ActiveSet(self.terrain.size)
+        self._rebuild_statistics()
+    
+    def reset(self):
+        """
+        把模拟恢复到刚初始化地形时的状态，以便在同一地形上运行下一个情景
+        
+        两层动态数组批量填充为初值（稀疏分块时释放全部块），清空燃烧集合、统计量与历史，
+        模拟时间归零，配置了 random_seed 时重新播种；静态地形、几何表与空间索引保留
+        （自动扩展过的计算域保持扩展后的大小）。代价与网格大小成正比但只有几次数组填充。
+        """
+        self.detach_state()
+        self.surface.reset()
+        self.canopy.reset()
+        self._burning_surface.clear()
+        self._burning_canopy.clear()
+        self._ignition_candidates = {}
+        
+        self.current_time = 0.0
+        self.dt = self.time_step
+        self.step_sizes = []
+        self._end_time = None
+        self._resumed = False
+        if self.random_seed is not None:
+            self.rng = random.Random(self.random_seed)
+        
+        self.stats = {key: 0.0 for key in self.stats}
+        self._burned_surface_count = 0
+        self._surface_fuel_consumed = 0.0
+        self._perimeter_edges = 0
+        self.fire_history = []
+        self.stats_history = []
+    
+    def fork(self, overrides: Optional[Dict] = None) -> 'CellularAutomaton':
+        """
+        分叉出与当前状态相同、此后独立推进的子模拟（如从第24小时起换风向或设置防火隔离带）
+        
+        子模拟共用静态地形与几何表，动态数组与燃烧集合写时复制：父、子模拟各自在首次推进、点燃、
+        重置前复制自己的一份（稀疏分块时只复制已分配的块），分叉本身的代价与网格大小无关。
+        直接修改 surface / canopy 数组前先调用 detach_state()。多进程使用见 fork.ForkSnapshot。
+        
+        Args:
+            overrides: 子模拟的配置覆盖项（风向量、功能开关、random_seed 等，
+                       不得改变地形与层状态参数，见 fork.FORK_FIXED_KEYS）
+            
+        Returns:
+            子模拟（不加覆盖项时与父模拟继续运行的结果逐位相同）
+        """
+        return fork_simulation(self, overrides)
+    
+    def detach_state(self):
+        """fork() 后复制出本模拟独有的动态数组与燃烧集合（写时复制；未共用时不做任何事）"""
+        if not self._shared_state:
+            return
+        self.surface.detach()
+        self.canopy.detach()
+        self._burning_surface = ActiveSet(self.terrain.size, self._burning_surface.indices())
+        self._burning_canopy = ActiveSet(self.terrain.size, self._burning_canopy.indices())
+        self._shared_state = False
+    
+    def reignite(self, position: Tuple[float, float], radius: float = 10.0):
+        """reset() 后在新的起火点点燃（同一地形上逐个运行起火点情景）"""
+        self.reset()
+        self.set_ignition_point(position, radius)
+    
+    @property
+    def surface_cells(self) -> LayerCellView:
+        """地表层元胞视图（按需构造 Cell 对象）"""
+        return self._layer_view(self.surface)
+    
+    @property
+    def canopy_cells(self) -> LayerCellView:
+        """树冠层元胞视图（按需构造 Cell 对象）"""
+        return self._layer_view(self.canopy)
+    
+    @property
+    def burning_surface_cells(self) -> LayerCellView:
+        """燃烧中的地表元胞视图"""
+        return self._layer_view(self.surface, self._burning_surface)
+    
+    @burning_surface_cells.setter
+    def burning_surface_cells(self, cells):
+        self._burning_surface = ActiveSet(self.terrain.size, [cell.index for cell in cells])
+    
+    @property
+    def burning_canopy_cells(self) -> LayerCellView:
+        """燃烧中的树冠元胞视图"""
+        return self._layer_view(self.canopy, self._burning_canopy)
+    
+    @burning_canopy_cells.setter
+    def burning_canopy_cells(self, cells):
+        self._burning_canopy = ActiveSet(self.terrain.size, [cell.index for cell in cells])
+    
+    def _layer_view(self, layer: Optional[LayerState], indices=None) -> LayerCellView:
+        if layer is None:
+            return []
+        # 元胞视图可写入层状态
+        self.detach_state()
+        return LayerCellView(self.terrain, layer, indices)
+    
+    def fire_state_at(self, time: float, layer_type: LayerType = LayerType.SURFACE) -> np.ndarray:
+        """
+        由到达时间栅格重建指定时刻的火场状态（一次模拟即可得到任意时刻的火场）
+    
+        Args:
+            time: 模拟时刻（分钟），应不超过已模拟到的 current_time
+            layer_type: 层类型
+    
+        Returns:
+            state: (height, width) 状态值数组
+        """
+        layer = self.surface if layer_type == LayerType.SURFACE else self.canopy
+        return layer.state_at(time)
+    
+    def burned_cells_at(self, time: float) -> LayerCellView:
+        """指定时刻已点燃（燃烧中或已燃尽）的地表元胞视图"""
+        state = self.fire_state_at(time).reshape(-1)
+        indices = np.flatnonzero(state != UNBURNED)
+        return self._layer_view(self.surface, indices)
+    
     def set_ignition_point(self, position: Tuple[float, float], radius: float = 10.0):
         """设置起火点"""
-        ignited_cells = self.terrain_generator.set_ignition_point(
-            self.surface_cells, position, radius
-        )
-        self.burning_surface_cells.extend(ignited_cells)
+        self.detach_state()
+        indices = self.terrain_generator.ignition_indices(self.terrain, position, radius)
+        indices = indices[self.surface.state.reshape(-1)[indices] == UNBURNED]
+        
+        self.surface.ignite(indices, CellState.SURFACE_FIRE, self.current_time)
+        self._burning_surface.add(indices)
+        self._record_surface_ignition(indices)
         
         # 记录起火点
         self.fire_history.append({
             'time': self.current_time,
-            'ignition_points': [cell.static.position for cell in ignited_cells]
+            'ignition_points': [self.terrain.position(idx) for idx in indices]
         })
     
     def step(self):
         """执行一个时间步的模拟"""
-        # 1. 能量传递与预热
+        self.detach_state()
+        
+        # 1. 能量传递与预热（自适应模式下同时确定本步步长）
         self._energy_transfer_step()
         
         # 2. 点燃判定
@@ -123,6 +320,9 @@ class CellularAutomaton:
         
         # 8. 记录历史
         self._record_history()
+        
+        self.step_sizes.append(self.dt)
+        self.dt = self.time_step
     
     def run_simulation(self, end_time: Optional[float] = None) -> Dict:
         """
@@ -139,166 +339,425 @@ class CellularAutomaton:
         
         print(f"开始火灾模拟，目标时间: {end_time} 分钟")
         
+        # 元胞状态可能经元胞视图在外部修改，开始前按数组重建一次增量统计；
+        # 从检查点恢复时沿用保存的累计值与步长记录（重新求和的舍入不同，续算将不再逐位相同）
+        if not self._resumed:
+            self._rebuild_statistics()
+            self.step_sizes = []
+        self._resumed = False
+        self._end_time = end_time
+        next_checkpoint = self._next_checkpoint_time()
+        
         while self.current_time < end_time:
+            if self.auto_expand_domain:
+                self._expand_if_needed()
             self.step()
             
             # 检查是否有活跃火点
-            if len(self.burning_surface_cells) == 0 and len(self.burning_canopy_cells) == 0:
+            if len(self._burning_surface) == 0 and len(self._burning_canopy) == 0:
                 print(f"模拟在 {self.current_time:.1f} 分钟时自然结束（无活跃火点）")
                 break
             
+            # 定期写检查点
+            if self.current_time >= next_checkpoint:
+                self.save_checkpoint(self.checkpoint_path)
+                next_checkpoint = self._next_checkpoint_time()
+            
             # 每小时输出进度
             if int(self.current_time) % 60 == 0:
                 print(f"模拟进度: {self.current_time:.1f} 分钟, "
                       f"燃烧面积: {self.stats['burned_area']:.1f} m²")
         
         print(f"模拟完成，总用时: {self.current_time:.1f} 分钟")
+        self._end_time = None
+        
+        return self.simulation_result()
+    
+    def _next_checkpoint_time(self) -> float:
+        """当前时刻之后的下一个检查点时刻（save_interval 的整数倍），未配置检查点路径时为 inf"""
+        if not self.checkpoint_path or not self.checkpoint_interval:
+            return np.inf
+        return (np.floor(self.current_time / self.checkpoint_interval) + 1) * self.checkpoint_interval
+    
+    def save_checkpoint(self, path: str):
+        """
+        把动态状态、燃烧集合、随机数发生器状态、模拟时间、统计量与历史写入 .npz 检查点
+        
+        Args:
+            path: 检查点文件路径
+        """
+        save_checkpoint(self, path)
+    
+    def load_checkpoint(self, path: str):
+        """
+        从 .npz 检查点恢复（须先用相同配置初始化地形），之后调用 run_simulation 续算，
+        结果与不中断的运行逐位相同
+        
+        Args:
+            path: 检查点文件路径
+        """
+        load_checkpoint(self, path)
+        print(f"已从检查点恢复: {path}（模拟时间 {self.current_time:.1f} 分钟）")
+    
+    def expand_domain(self, y_low: int = 0, y_high: int = 0, x_low: int = 0, x_high: int = 0):
+        """
+        在网格四侧增加行/列：新条带的地形按 initialize_terrain 的同一规则生成，
+        已有元胞的地形与两层动态状态原样保留，燃烧集合按原顺序换算为新网格的扁平索引
         
+        Args:
+            y_low, y_high: y 较小、较大一侧增加的行数
+            x_low, x_high: x 较小、较大一侧增加的列数
+        """
+        if self._terrain_params is None:
+            raise RuntimeError("domain expansion requires terrain created by initialize_terrain")
+        if min(y_low, y_high, x_low, x_high) < 0:
+            raise ValueError("expansion sizes must be non-negative")
+        
+        height, width = self.terrain.shape
+        new_height, new_width = height + y_low + y_high, width + x_low + x_high
+        row_offset, col_offset = self._terrain_origin[0] - y_low, self._terrain_origin[1] - x_low
+        
+        terrain = self.terrain_generator.create_ideal_grid(
+            new_width, new_height, self._terrain_params['slope_angle_deg'],
+            self._terrain_params['intersection_distance'], row_offset, col_offset
+        )
+        stencil = self.terrain_generator.build_stencil_tables(terrain, self.fire_engine)
+        surface, canopy = self.terrain_generator.create_layer_states(terrain)
+        interior = (slice(y_low, y_low + height), slice(x_low, x_low + width))
+        for new_layer, old_layer in ((surface, self.surface), (canopy, self.canopy)):
+            for name in LayerState.ARRAYS:
+                getattr(new_layer, name)[interior] = getattr(old_layer, name)
+        
+        def remap(indices: np.ndarray) -> np.ndarray:
+            rows, cols = np.divmod(indices, width)
+            return (rows + y_low) * new_width + (cols + x_low)
+        
+        self._burning_surface = ActiveSet(terrain.size, remap(self._burning_surface.indices()))
+        self._burning_canopy = ActiveSet(terrain.size, remap(self._burning_canopy.indices()))
+        self._ignition_candidates = {layer_type: remap(indices)
+                                     for layer_type, indices in self._ignition_candidates.items()}
+        
+        self.terrain = terrain
+        self.stencil = stencil
+        self.surface = surface
+        self.canopy = canopy
+        self._terrain_origin = (row_offset, col_offset)
+        self._spatial_index = None
+        self._shared_state = False
+        
+        print(f"计算域扩展至 {new_width} × {new_height} 元胞 "
+              f"(y: +{y_low}/+{y_high}, x: +{x_low}/+{x_high})")
+    
+    def _expand_if_needed(self):
+        """
+        火场（燃烧元胞）距某侧边缘不足扩展边距时向该侧扩展计算域
+        
+        启用飞火时边距至少覆盖飞火最远距离加捕获半径，保证落点不会落在网格之外。
+        """
+        burning = np.concatenate([self._burning_surface.indices(), self._burning_canopy.indices()])
+        if len(burning) == 0:
+            return
+        
+        margin = self.expansion_margin
+        if self.enable_spotting:
+            reach = self.max_spotting_distance + self.spotting_capture_radius
+            margin = max(margin, int(np.ceil(reach / self.terrain.cell_size)) + 1)
+        
+        height, width = self.terrain.shape
+        rows_added = max(self.expansion_size, margin, height // 4)
+        cols_added = max(self.expansion_size, margin, width // 4)
+        
+        rows, cols = np.divmod(burning, width)
+        y_low = rows_added if rows.min() < margin else 0
+        y_high = rows_added if rows.max() >= height - margin else 0
+        x_low = cols_added if cols.min() < margin else 0
+        x_high = cols_added if cols.max() >= width - margin else 0
+        if y_low or y_high or x_low or x_high:
+            self.expand_domain(y_low, y_high, x_low, x_high)
+    
+    def simulation_result(self) -> Dict:
+        """当前模拟结果字典（run_simulation 的返回格式）"""
         return {
             'final_time': self.current_time,
             'stats': self.stats.copy(),
             'surface_cells': self.surface_cells,
             'canopy_cells': self.canopy_cells,
             'fire_history': self.fire_history,
-            'stats_history': self.stats_history
+            'stats_history': self.stats_history,
+            'time_steps': list(self.step_sizes)
         }
     
+    def memory_report(self) -> Dict:
+        """
+        网格相关数组的内存占用（字节）
+        
+        Returns:
+            各部分字节数 terrain（坐标、高程、分区）、stencil（边类别）、surface、canopy（动态状态）、
+            active_sets（燃烧集合），合计 total 与每元胞字节数 bytes_per_cell
+        """
+        report = {
+            'terrain': self.terrain.nbytes,
+            'stencil': self.stencil.nbytes,
+            'surface': self.surface.nbytes,
+            'canopy': self.canopy.nbytes,
+            'active_sets': self._burning_surface.nbytes + self._burning_canopy.nbytes
+        }
+        report['total'] = sum(report.values())
+        report['bytes_per_cell'] = report['total'] / self.terrain.size
+        return report
+    
+    def minimum_travel_time(self, position: Tuple[float, float], radius: float = 10.0) -> np.ndarray:
+        """
+        最短蔓延时间求解：按蔓延速度在8邻域图上做 Dijkstra 扫描，得到地表到达时间栅格
+        
+        边耗时为 距离/蔓延速度，含水量取当前地表层状态；不模拟能量累积与飞火，用于快速方案筛选。
+        
+        Args:
+            position: 起火点位置 (x, y)
+            radius: 起火半径 (米)
+            
+        Returns:
+            arrival_time: (height, width) 到达时刻（分钟，模拟时间：以当前时刻 current_time 为起火时刻），不可达为 inf
+        """
+        sources = self.terrain_generator.ignition_indices(self.terrain, position, radius)
+        return minimum_travel_time(self.fire_engine, self.stencil, self.surface.moisture, sources,
+                                   self.enable_wind_effects, self.current_time)
+    
+    def run_event_simulation(self, end_time: Optional[float] = None,
+                             refresh_steps: Optional[int] = None) -> Dict:
+        """
+        用离散事件引擎运行模拟：只在点燃、燃尽、飞火等事件时刻做工作
+        
+        Args:
+            end_time: 结束时间（分钟），None表示使用默认最大时间
+            refresh_steps: 点燃预测的最大前瞻步数，None表示读取配置 event_refresh_steps
+            
+        Returns:
+            模拟结果字典（格式与 run_simulation 相同）
+        """
+        self.detach_state()
+        return EventDrivenEngine(self, refresh_steps).run(end_time)
+    
+    def run_decomposed_simulation(self, end_time: Optional[float] = None,
+                                  blocks: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        区域分解并行运行模拟：网格分块后每块由一个工作进程推进，结果与 run_simulation 相同
+        
+        Args:
+            end_time: 结束时间（分钟），None表示使用默认最大时间
+            blocks: 分块数 (rows, cols)，None表示读取配置 domain_blocks，默认按CPU核数切成行条
+            
+        Returns:
+            模拟结果字典（格式与 run_simulation 相同）
+        """
+        self.detach_state()
+        return DomainDecomposition(self, blocks).run(end_time)
+    
     def _energy_transfer_step(self):
-        """能量传递步骤"""
-        energy_updates = {}  # {cell_id: energy_delta}
-        
-        # 从地表火传递能量
-        for burning_cell in self.burning_surface_cells:
-            for neighbor in burning_cell.neighbors:
-                if neighbor.dynamic.state == CellState.UNBURNED:
-                    energy_delta = self.fire_engine.calculate_energy_transfer(
-                        burning_cell, neighbor, self.dt, self.enable_wind_effects
-                    )
-                    
-                    if neighbor.static.id not in energy_updates:
-                        energy_updates[neighbor.static.id] = 0.0
-                    energy_updates[neighbor.static.id] += energy_delta
-        
-        # 从树冠火传递能量
-        for burning_cell in self.burning_canopy_cells:
-            for neighbor in burning_cell.neighbors:
-                if neighbor.dynamic.state == CellState.UNBURNED:
-                    energy_delta = self.fire_engine.calculate_energy_transfer(
-                        burning_cell, neighbor, self.dt, self.enable_wind_effects
-                    )
-                    
-                    if neighbor.static.id not in energy_updates:
-                        energy_updates[neighbor.static.id] = 0.0
-                    energy_updates[neighbor.static.id] += energy_delta
-        
-        # 应用能量更新和湿度变化
-        all_cells = self.surface_cells + self.canopy_cells
-        for cell in all_cells:
-            if cell.static.id in energy_updates:
-                energy_received = energy_updates[cell.static.id]
-                cell.update_energy(energy_received)
-                
-                # 预热干燥过程
-                self.fire_engine.update_moisture_from_heat(cell, energy_received)
+        """能量传递步骤（整窗口8方向移位数组运算）"""
+        evaporation = self.fire_engine.evaporation_coefficient
+        
+        # 从地表火、树冠火分别向同层未燃烧邻居传递能量
+        # 目标窗口：燃烧元胞的外接矩形外扩一圈
+        transfers = []
+        for layer, burning in ((self.surface, self._burning_surface),
+                               (self.canopy, self._burning_canopy)):
+            if burning:
+                transfers.append((layer, active_window(burning.indices(), self.terrain.shape)))
+        
+        if self.adaptive_time_step:
+            # 能量传递与步长成正比：先按单位步长计算接收速率，再按选定步长缩放
+            rates = [stencil_energy_transfer(self.fire_engine, self.stencil, layer, 1.0, window,
+                                             self.enable_wind_effects)
+                     for layer, window in transfers]
+            self.dt = self._adaptive_step_size(transfers, rates)
+            received = [rate * self.dt for rate in rates]
+        else:
+            received = [stencil_energy_transfer(self.fire_engine, self.stencil, layer, self.dt, window,
+                                                self.enable_wind_effects)
+                        for layer, window in transfers]
+        
+        for (layer, window), energy_received in zip(transfers, received):
+            # 点燃候选：接收到能量的元胞（行优先顺序）
+            r0, r1, c0, c1 = window
+            rows, cols = np.nonzero(energy_received > 0)
+            candidates = (rows + r0) * self.terrain.width + (cols + c0)
+            energy_received = energy_received[rows, cols]
+            
+            # 应用能量更新和湿度变化（预热干燥过程），只写受热元胞
+            energy = layer.energy.reshape(-1)
+            energy[candidates] += energy_received
+            moisture = layer.moisture.reshape(-1)
+            moisture[candidates] = np.maximum(0.0, moisture[candidates] - energy_received * evaporation)
+            
+            self._ignition_candidates[layer.layer_type] = candidates
+    
+    def _adaptive_step_size(self, transfers, rates) -> float:
+        """
+        自适应步长：跨到下一个点燃或燃尽事件的预计时刻（加容差），限制在 [time_step, max_time_step] 内
+        
+        事件在 time_step 内即将发生时退回基本步长，与固定步长推进相同；
+        步长不越过下一个整点，每小时历史与进度输出与固定步长落在相同时刻。
+        
+        Args:
+            transfers: [(层状态, 窗口)]
+            rates: 各窗口内单位步长的接收能量
+            
+        Returns:
+            本步步长（分钟）
+        """
+        time_to_event = np.inf
+        
+        # 受热元胞越过点燃阈值所需时间（计入预热干燥对阈值的降低）
+        for (layer, (r0, r1, c0, c1)), rate in zip(transfers, rates):
+            heated = rate > 0
+            if not heated.any():
+                continue
+            energy_needed = self._energy_to_ignition(layer, layer.energy[r0:r1, c0:c1][heated],
+                                                     layer.moisture[r0:r1, c0:c1][heated])
+            time_to_event = min(time_to_event, float(np.min(energy_needed / rate[heated])))
+        
+        # 燃烧元胞燃料耗尽所需时间
+        for layer, burning, consumption_rate in ((self.surface, self._burning_surface, self.fuel_consumption_rate),
+                                                 (self.canopy, self._burning_canopy, self.fuel_consumption_rate * 2)):
+            if burning and consumption_rate > 0:
+                fuel = layer.fuel_load.reshape(-1)[burning.indices()]
+                time_to_event = min(time_to_event, float(fuel.min()) / consumption_rate)
+        
+        # 预计时间由下方逼近，略微放大以确保本步内越过阈值
+        time_to_event = time_to_event * (1.0 + 1e-9) + self.time_step_tolerance
+        dt = min(self.max_time_step, max(self.time_step, time_to_event))
+        if self._end_time is not None:
+            dt = min(dt, max(self.time_step, self._end_time - self.current_time))
+        next_hour = (self.current_time // 60.0 + 1) * 60.0
+        dt = min(dt, next_hour - self.current_time)
+        return dt
+    
+    def _energy_to_ignition(self, layer: LayerState, energy: np.ndarray, moisture: np.ndarray) -> np.ndarray:
+        """
+        一步内接收多少能量即可点燃：E + x ≥ E0·e^(k·max(0, M - evap·x)) 的最小 x
+        
+        左右之差关于 x 单调递增且为凹函数，从 x=0 起的牛顿迭代自下方收敛，所得估计不会偏大。
+        """
+        evaporation = self.fire_engine.evaporation_coefficient
+        x = np.zeros_like(energy)
+        for _ in range(20):
+            m = np.maximum(0.0, moisture - evaporation * x)
+            threshold = layer.ignition_threshold(m)
+            h = energy + x - threshold
+            slope = 1.0 + np.where(m > 0, layer.ignition_moisture_factor * evaporation * threshold, 0.0)
+            x_next = np.maximum(x, x - h / slope)
+            if np.array_equal(x_next, x):
+                break
+            x = x_next
+        return x
     
     def _ignition_step(self):
-        """点燃判定步骤"""
-        newly_ignited_surface = []
-        newly_ignited_canopy = []
-        
-        # 检查地表层元胞
-        for cell in self.surface_cells:
-            if cell.can_ignite():
-                cell.ignite(CellState.SURFACE_FIRE)
-                newly_ignited_surface.append(cell)
-        
-        # 检查树冠层元胞
-        for cell in self.canopy_cells:
-            if cell.can_ignite():
-                cell.ignite(CellState.CROWN_FIRE)
-                newly_ignited_canopy.append(cell)
-        
-        # 更新燃烧元胞列表
-        self.burning_surface_cells.extend(newly_ignited_surface)
-        self.burning_canopy_cells.extend(newly_ignited_canopy)
+        """点燃判定步骤（只检查本步接收到能量的前沿元胞）"""
+        for layer, burning, fire_type in ((self.surface, self._burning_surface, CellState.SURFACE_FIRE),
+                                          (self.canopy, self._burning_canopy, CellState.CROWN_FIRE)):
+            candidates = self._ignition_candidates.pop(layer.layer_type, None)
+            if candidates is None or len(candidates) == 0:
+                continue
+            
+            can_ignite = ((layer.state.reshape(-1)[candidates] == UNBURNED) & 
+                          (layer.energy.reshape(-1)[candidates] >= 
+                           layer.ignition_threshold(layer.moisture.reshape(-1)[candidates])))
+            newly_ignited = candidates[can_ignite]
+            
+            # 更新燃烧元胞列表
+            layer.ignite(newly_ignited, fire_type, self.current_time + self.dt)
+            burning.add(newly_ignited)
+            if layer is self.surface:
+                self._record_surface_ignition(newly_ignited)
     
     def _fuel_consumption_step(self):
         """燃料消耗步骤"""
-        # 处理地表火燃料消耗
-        cells_to_remove = []
-        for cell in self.burning_surface_cells:
-            cell.consume_fuel(self.fuel_consumption_rate, self.dt)
+        # 树冠火燃烧更快
+        for layer, burning, rate in ((self.surface, self._burning_surface, self.fuel_consumption_rate),
+                                     (self.canopy, self._burning_canopy, self.fuel_consumption_rate * 2)):
+            if not burning:
+                continue
+            idx = burning.indices()
+            fuel_load = layer.fuel_load.reshape(-1)
             
-            if cell.dynamic.state == CellState.BURNED_OUT:
-                cells_to_remove.append(cell)
-        
-        # 移除燃尽的元胞
-        for cell in cells_to_remove:
-            self.burning_surface_cells.remove(cell)
-        
-        # 处理树冠火燃料消耗
-        cells_to_remove = []
-        for cell in self.burning_canopy_cells:
-            cell.consume_fuel(self.fuel_consumption_rate * 2, self.dt)  # 树冠火燃烧更快
+            remaining = np.maximum(0.0, fuel_load[idx] - rate * self.dt)
+            if layer is self.surface:
+                self._surface_fuel_consumed += float(np.sum(fuel_load[idx] - remaining))
+            fuel_load[idx] = remaining
+            layer.burn_time.reshape(-1)[idx] += self.dt
             
-            if cell.dynamic.state == CellState.BURNED_OUT:
-                cells_to_remove.append(cell)
-        
-        # 移除燃尽的元胞
-        for cell in cells_to_remove:
-            self.burning_canopy_cells.remove(cell)
+            # 燃料耗尽则燃尽
+            burned_out = idx[fuel_load[idx] <= 0.0]
+            layer.burn_out(burned_out, self.current_time + self.dt)
+            
+            # 移除燃尽的元胞
+            burning.remove(burned_out)
     
     def _crown_fire_transition_step(self):
         """树冠火跃变步骤"""
-        newly_crown_fires = []
+        if not self._burning_surface:
+            return
+        burning = self._burning_surface.indices()
+        
+        # Van Wagner 临界火线强度判定
+        intensity = fire_line_intensity(self.fire_engine, self.stencil, self.surface, burning)
+        critical_intensity = self.fire_engine.critical_crown_intensity(
+            self.surface.canopy_base_height, self.surface.moisture.reshape(-1)[burning]
+        )
         
-        for surface_cell in self.burning_surface_cells:
-            if self.fire_engine.can_crown_fire_initiate(surface_cell):
-                # 找到对应的树冠层元胞
-                corresponding_canopy = self._find_corresponding_canopy_cell(surface_cell)
-                
-                if (corresponding_canopy and 
-                    corresponding_canopy.dynamic.state == CellState.UNBURNED):
-                    
-                    corresponding_canopy.ignite(CellState.CROWN_FIRE)
-                    newly_crown_fires.append(corresponding_canopy)
+        # 树冠层与地表层共用网格索引
+        candidates = burning[intensity > critical_intensity]
+        newly_crown_fires = candidates[self.canopy.state.reshape(-1)[candidates] == UNBURNED]
         
-        self.burning_canopy_cells.extend(newly_crown_fires)
+        self.canopy.ignite(newly_crown_fires, CellState.CROWN_FIRE, self.current_time + self.dt)
+        self._burning_canopy.add(newly_crown_fires)
     
-    def _spotting_step(self):
-        """飞火步骤"""
+    def _spotting_step(self) -> List[int]:
+        """飞火步骤，返回新飞火元胞的扁平索引"""
         new_spot_fires = []
         
-        for crown_cell in self.burning_canopy_cells:
-            if random.random() < self.spotting_probability:
+        # 飞火概率按 time_step 给出，步长放大时换算为本步内至少发生一次的概率
+        spotting_probability = self.spotting_probability
+        if self.dt != self.time_step:
+            spotting_probability = 1.0 - (1.0 - spotting_probability) ** (self.dt / self.time_step)
+        
+        for crown_idx in self._burning_canopy:
+            if self.rng.random() < spotting_probability:
                 # 在下风向随机选择飞火位置
-                spot_position = self._calculate_spot_fire_position(crown_cell)
+                spot_position = self._calculate_spot_fire_position(crown_idx)
                 
                 if spot_position:
                     # 寻找最近的未燃烧地表元胞
-                    target_cell = self._find_nearest_unburned_surface_cell(spot_position)
+                    target_idx = self._find_nearest_unburned_surface_cell(spot_position)
                     
-                    if target_cell:
-                        target_cell.ignite(CellState.SURFACE_FIRE)
-                        new_spot_fires.append(target_cell)
+                    if target_idx is not None:
+                        self.surface.ignite(target_idx, CellState.SURFACE_FIRE, self.current_time + self.dt)
+                        new_spot_fires.append(target_idx)
         
-        self.burning_surface_cells.extend(new_spot_fires)
+        self._burning_surface.add(new_spot_fires)
+        self._record_surface_ignition(new_spot_fires)
+        return new_spot_fires
+    
+    def canopy_cell_for(self, surface_cell: Cell) -> Optional[Cell]:
+        """地表元胞对应的树冠层元胞（两层共用网格索引，O(1)）"""
+        index = self.terrain_generator.surface_index(surface_cell.static.id, self.terrain.size)
+        if self.canopy is None:
+            return None
+        return GridCell(self.terrain, self.canopy, index)
+    
+    def surface_cell_for(self, canopy_cell: Cell) -> Optional[Cell]:
+        """树冠层元胞对应的地表元胞（两层共用网格索引，O(1)）"""
+        index = self.terrain_generator.surface_index(canopy_cell.static.id, self.terrain.size)
+        if self.surface is None:
+            return None
+        return GridCell(self.terrain, self.surface, index)
     
     def _find_corresponding_canopy_cell(self, surface_cell: Cell) -> Optional[Cell]:
         """找到地表元胞对应的树冠层元胞"""
-        surface_pos = surface_cell.static.position
-        
-        for canopy_cell in self.canopy_cells:
-            canopy_pos = canopy_cell.static.position
-            
-            # 检查x,y坐标是否匹配（z坐标不同）
-            if (abs(canopy_pos[0] - surface_pos[0]) < 1.0 and 
-                abs(canopy_pos[1] - surface_pos[1]) < 1.0):
-                return canopy_cell
-        
-        return None
+        return self.canopy_cell_for(surface_cell)
     
-    def _calculate_spot_fire_position(self, crown_cell: Cell) -> Optional[Tuple[float, float]]:
+    def _calculate_spot_fire_position(self, crown_idx: int) -> Optional[Tuple[float, float]]:
         """计算飞火位置"""
         # 获取风向量
         wind_vector = self.fire_engine.wind_vector
@@ -312,53 +771,95 @@ class CellularAutomaton:
         
         # 在风向方向±30度范围内随机选择
         wind_direction = np.arctan2(wind_vector[1], wind_vector[0])
-        direction_variation = random.uniform(-np.pi/6, np.pi/6)
+        direction_variation = self.rng.uniform(-np.pi/6, np.pi/6)
         spot_direction = wind_direction + direction_variation
         
         # 计算飞火位置
-        cx, cy, _ = crown_cell.static.position
+        cx, cy, _ = self.terrain.position(crown_idx, self.canopy.height_offset)
         spot_x = cx + spot_distance * np.cos(spot_direction)
         spot_y = cy + spot_distance * np.sin(spot_direction)
         
         return (spot_x, spot_y)
     
-    def _find_nearest_unburned_surface_cell(self, position: Tuple[float, float]) -> Optional[Cell]:
-        """找到离指定位置最近的未燃烧地表元胞"""
-        min_distance = float('inf')
-        nearest_cell = None
-        
-        for cell in self.surface_cells:
-            if cell.dynamic.state == CellState.UNBURNED:
-                cx, cy, _ = cell.static.position
-                distance = np.sqrt((cx - position[0])**2 + (cy - position[1])**2)
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_cell = cell
+    @property
+    def spatial_index(self):
+        """地表元胞空间索引（首次使用时构建）"""
+        if self._spatial_index is None:
+            self._spatial_index = build_spatial_index(self.terrain, self.spotting_capture_radius)
+        return self._spatial_index
+    
+    def _find_nearest_unburned_surface_cell(self, position: Tuple[float, float]) -> Optional[int]:
+        """找到离指定位置最近的未燃烧地表元胞（捕获半径内，返回扁平索引）"""
+        return self.spatial_index.nearest(position, self.spotting_capture_radius,
+                                          self.surface.state, UNBURNED)
+    
+    def _rebuild_statistics(self):
+        """按地表层数组完整重算燃烧元胞数、燃料消耗与周长边数（代价与网格大小成正比）"""
+        state = self.surface.state
+        burned = (state == SURFACE_FIRE) | (state == BURNED_OUT)
+        self._burned_surface_count = int(np.count_nonzero(burned))
+        self._surface_fuel_consumed = float(np.sum(self.initial_fuel_load - self.surface.fuel_load[burned]))
+        
+        padded = np.pad(burned, 1)
+        self._perimeter_edges = int(np.count_nonzero(padded[1:, :] != padded[:-1, :]) +
+                                    np.count_nonzero(padded[:, 1:] != padded[:, :-1]))
+    
+    def _record_surface_ignition(self, indices):
+        """
+        地表元胞被点燃后增量更新燃烧面积与火场周长（代价与新点燃元胞数成正比）
         
-        return nearest_cell if min_distance <= 50.0 else None  # 50米范围内
+        周长按已燃区域的4邻域边界边计数：每个新元胞带来4条边，
+        与旧已燃元胞相邻的边各抵消2条，新元胞之间相邻的边各抵消1条（两侧各算一次）。
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return
+        self._burned_surface_count += len(indices)
+        
+        height, width = self.terrain.shape
+        rows, cols = np.divmod(indices, width)
+        state = self.surface.state.reshape(-1)
+        
+        burned_neighbors = 0
+        new_neighbors = 0
+        for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            r, c = rows + di, cols + dj
+            inside = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+            neighbor = (r * width + c)[inside]
+            burned_neighbors += int(np.count_nonzero(
+                (state[neighbor] == SURFACE_FIRE) | (state[neighbor] == BURNED_OUT)))
+            new_neighbors += int(np.count_nonzero(np.isin(neighbor, indices)))
+        
+        self._perimeter_edges += 4 * len(indices) - 2 * burned_neighbors + new_neighbors
     
-    def _update_statistics(self):
-        """更新统计信息"""
-        # 计算燃烧面积
-        burned_count = sum(1 for cell in self.surface_cells 
-                          if cell.dynamic.state in [CellState.SURFACE_FIRE, CellState.BURNED_OUT])
+    def _update_statistics(self, max_intensity: Optional[float] = None):
+        """
+        更新统计信息（燃烧面积、燃料消耗、周长由增量累计值换算）
         
-        cell_area = self.terrain_generator.cell_size ** 2
-        self.stats['burned_area'] = burned_count * cell_area
+        Args:
+            max_intensity: 已算好的最大火线强度（批量模拟传入），None表示在此计算
+        """
+        cell_size = self.terrain_generator.cell_size
+        cell_area = cell_size ** 2
         
-        # 计算燃料消耗总量
-        total_consumed = sum(
-            (self.initial_fuel_load - cell.dynamic.fuel_load) for cell in self.surface_cells
-            if cell.dynamic.state in [CellState.SURFACE_FIRE, CellState.BURNED_OUT]
-        )
-        self.stats['total_fuel_consumed'] = total_consumed * cell_area
+        # 燃烧面积
+        self.stats['burned_area'] = self._burned_surface_count * cell_area
+        
+        # 燃料消耗总量
+        self.stats['total_fuel_consumed'] = self._surface_fuel_consumed * cell_area
+        
+        # 火场周长
+        self.stats['fire_perimeter'] = self._perimeter_edges * cell_size
         
-        # 计算最大火线强度
+        # 计算最大火线强度（火线强度随燃料逐步变化，对燃烧元胞整体向量化计算）
+        if max_intensity is not None:
+            self.stats['max_fire_intensity'] = max_intensity
+            return
         max_intensity = 0.0
-        for cell in self.burning_surface_cells:
-            intensity = self.fire_engine.calculate_fire_line_intensity(cell)
-            max_intensity = max(max_intensity, intensity)
+        if self._burning_surface:
+            intensity = fire_line_intensity(self.fire_engine, self.stencil, self.surface,
+                                            self._burning_surface.indices())
+            max_intensity = max(max_intensity, float(intensity.max()))
         
         self.stats['max_fire_intensity'] = max_intensity
     
@@ -368,6 +869,6 @@ class CellularAutomaton:
             self.stats_history.append({
                 'time': self.current_time,
                 'stats': self.stats.copy(),
-                'burning_surface_count': len(self.burning_surface_cells),
-                'burning_canopy_count': len(self.burning_canopy_cells)
+                'burning_surface_count': len(self._burning_surface),
+                'burning_canopy_count': len(self._burning_canopy)
             }) 
\ No newline at end of file
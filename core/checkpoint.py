@@ -0,0 +1,123 @@
+"""
+检查点 - 模拟的动态状态写入 .npz 文件并从中恢复，续算结果与不中断运行逐位相同
+Checkpoint - Dynamic Simulation State Saved to and Restored from an .npz File, Resumed Runs Bit-Identical to Uninterrupted Ones
+"""
+
+import json
+import os
+import numpy as np
+from .grid import ActiveSet, LayerState
+
+# 检查点格式版本（字段变化时递增）
+CHECKPOINT_VERSION = 1
+
+def save_checkpoint(ca, path: str):
+    """
+    把元胞自动机的全部动态状态写入压缩 .npz 文件
+
+    内容：两层动态数组、燃烧集合（保持插入顺序）、随机数发生器状态、模拟时间与步长记录、
+    统计量及其增量累计值、起火与统计历史，以及计算域的尺寸与原点（自动扩展后恢复用）。
+    静态地形与几何表不写入，恢复时由相同配置重新生成（或取自地形缓存）。
+    先写临时文件再改名，写入中途进程退出时上一个检查点仍然完整。
+
+    Args:
+        ca: 已初始化地形的元胞自动机
+        path: 检查点文件路径
+    """
+    arrays = {
+        'version': np.array(CHECKPOINT_VERSION),
+        'domain.shape': np.array(ca.terrain.shape, dtype=np.int64),
+        'domain.origin': np.array(ca._terrain_origin, dtype=np.int64),
+        'current_time': np.array(ca.current_time, dtype=np.float64),
+        'step_sizes': np.array(ca.step_sizes, dtype=np.float64),
+        'burning_surface': ca._burning_surface.indices(),
+        'burning_canopy': ca._burning_canopy.indices(),
+        'burned_surface_count': np.array(ca._burned_surface_count, dtype=np.int64),
+        'surface_fuel_consumed': np.array(ca._surface_fuel_consumed, dtype=np.float64),
+        'perimeter_edges': np.array(ca._perimeter_edges, dtype=np.int64),
+        # 统计量与历史是少量嵌套的字典/列表，以 JSON 文本保存（浮点数按 repr 写出，读回逐位相同）
+        'history': np.array(json.dumps({'stats': ca.stats,
+                                        'fire_history': ca.fire_history,
+                                        'stats_history': ca.stats_history}))
+    }
+    for prefix, layer in (('surface', ca.surface), ('canopy', ca.canopy)):
+        for name in LayerState.ARRAYS:
+            arrays[f'{prefix}.{name}'] = np.asarray(getattr(layer, name))
+
+    # 未配置 random_seed 时 ca.rng 是全局 random 模块，两者的 getstate 格式相同
+    version, state, gauss_next = ca.rng.getstate()
+    arrays['rng.version'] = np.array(version)
+    arrays['rng.state'] = np.array(state, dtype=np.int64)
+    arrays['rng.gauss_next'] = np.array([] if gauss_next is None else [gauss_next], dtype=np.float64)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temporary, path)
+
+def load_checkpoint(ca, path: str):
+    """
+    从 .npz 检查点恢复动态状态
+
+    元胞自动机须用与保存时相同的配置创建并初始化地形；检查点来自自动扩展后的计算域时，
+    先按同一规则把计算域扩展到保存时的范围。恢复后直接调用 run_simulation 续算。
+
+    Args:
+        ca: 已初始化地形的元胞自动机
+        path: 检查点文件路径
+    """
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data['version'])
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version {version} (expected {CHECKPOINT_VERSION})")
+
+        # 计算域：保存时的窗口须包含当前窗口，差值按 expand_domain 补齐
+        height, width = (int(v) for v in data['domain.shape'])
+        row_origin, col_origin = (int(v) for v in data['domain.origin'])
+        y_low = ca._terrain_origin[0] - row_origin
+        x_low = ca._terrain_origin[1] - col_origin
+        y_high = height - ca.terrain.height - y_low
+        x_high = width - ca.terrain.width - x_low
+        if min(y_low, y_high, x_low, x_high) < 0:
+            raise ValueError(f"checkpoint domain {height}x{width} at {(row_origin, col_origin)} does not contain "
+                             f"the current domain {ca.terrain.height}x{ca.terrain.width} at {ca._terrain_origin}")
+        if y_low or y_high or x_low or x_high:
+            ca.expand_domain(y_low, y_high, x_low, x_high)
+
+        for prefix, layer in (('surface', ca.surface), ('canopy', ca.canopy)):
+            # 稀疏分块时先释放全部块，写回时只为非默认值分配
+            layer.reset()
+            for name in LayerState.ARRAYS:
+                saved = data[f'{prefix}.{name}']
+                target = getattr(layer, name)
+                if saved.dtype != target.dtype:
+                    raise ValueError(f"checkpoint {prefix}.{name} has dtype {saved.dtype}, layer uses {target.dtype} "
+                                     f"(compact_dtypes must match the saving run)")
+                target[...] = saved
+
+        ca._burning_surface = ActiveSet(ca.terrain.size, data['burning_surface'])
+        ca._burning_canopy = ActiveSet(ca.terrain.size, data['burning_canopy'])
+        ca._ignition_candidates = {}
+        ca._shared_state = False
+
+        ca.current_time = float(data['current_time'])
+        ca.dt = ca.time_step
+        ca.step_sizes = data['step_sizes'].tolist()
+        ca._end_time = None
+
+        ca._burned_surface_count = int(data['burned_surface_count'])
+        ca._surface_fuel_consumed = float(data['surface_fuel_consumed'])
+        ca._perimeter_edges = int(data['perimeter_edges'])
+        history = json.loads(str(data['history']))
+        ca.stats = history['stats']
+        ca.fire_history = [dict(entry, ignition_points=[tuple(point) for point in entry['ignition_points']])
+                           for entry in history['fire_history']]
+        ca.stats_history = history['stats_history']
+
+        gauss_next = data['rng.gauss_next']
+        ca.rng.setstate((int(data['rng.version']), tuple(data['rng.state'].tolist()),
+                         float(gauss_next[0]) if len(gauss_next) else None))
+
+    ca._resumed = True
@@ -0,0 +1,458 @@
+"""
+区域分解并行模拟 - 网格分块、每块一个工作进程，经共享内存交换一圈光晕元胞
+Domain-Decomposed Simulation - Grid Tiled into Blocks, One Worker Process per Block, Halo Exchange through Shared Memory
+"""
+
+import copy
+import multiprocessing
+import os
+import traceback
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+from .cell import CellState
+from .fire_engine import FireEngine
+from .grid import ActiveSet, LayerState, StencilTables
+from .kernels import stencil_energy_transfer, fire_line_intensity
+
+UNBURNED = CellState.UNBURNED.value
+SURFACE_FIRE = CellState.SURFACE_FIRE.value
+CROWN_FIRE = CellState.CROWN_FIRE.value
+
+# 共享内存中各数组的起始偏移按此字节数对齐
+ALIGNMENT = 64
+
+def block_windows(shape: Tuple[int, int], blocks: Sequence[int]) -> List[Tuple[int, int, int, int]]:
+    """
+    把网格按行、列均匀切分为 rows × cols 个矩形块
+
+    Args:
+        shape: 网格尺寸 (height, width)
+        blocks: 分块数 (rows, cols)
+
+    Returns:
+        各块窗口 [(r0, r1, c0, c1)]，按行优先顺序排列
+    """
+    height, width = shape
+    rows, cols = blocks
+    if not (1 <= rows <= height and 1 <= cols <= width):
+        raise ValueError(f"cannot split a {height}x{width} grid into {rows}x{cols} blocks")
+    row_edges = np.linspace(0, height, rows + 1).round().astype(int)
+    col_edges = np.linspace(0, width, cols + 1).round().astype(int)
+    return [(int(row_edges[i]), int(row_edges[i + 1]), int(col_edges[j]), int(col_edges[j + 1]))
+            for i in range(rows) for j in range(cols)]
+
+def _layout(arrays: Dict[str, np.ndarray]) -> Tuple[Dict[str, tuple], int]:
+    """各数组在共享内存中的 (偏移, 形状, 类型) 与总字节数"""
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        specs[name] = (offset, array.shape, array.dtype.str)
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    return specs, max(offset, 1)
+
+def _views(buffer, specs: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+    """按布局在共享内存上建立数组视图"""
+    return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+            for name, (offset, shape, dtype) in specs.items()}
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """工作进程连接已有的共享内存（由协调进程负责释放）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有 track 参数：子进程与协调进程共用资源回收进程，重复登记无影响
+        return shared_memory.SharedMemory(name=name)
+
+def _skeleton(layer: LayerState) -> LayerState:
+    """只含层参数的副本（逐元胞数组置空），传给工作进程时不复制数组"""
+    skeleton = copy.copy(layer)
+    skeleton.tiles = None
+    for name in LayerState.ARRAYS:
+        setattr(skeleton, name, None)
+    return skeleton
+
+def _bind_layer(layer: LayerState, arrays: Dict[str, np.ndarray], prefix: str) -> LayerState:
+    """层参数不变、逐元胞数组换成共享内存视图的层状态"""
+    bound = copy.copy(layer)
+    bound.tiles = None
+    for name in LayerState.ARRAYS:
+        setattr(bound, name, arrays[f'{prefix}.{name}'])
+    return bound
+
+class BlockStepper:
+    """
+    单个区块的推进（在工作进程中运行）
+
+    只写本块元胞；能量传递读取本块外一圈光晕元胞的状态，它们由相邻块在上一阶段写入共享内存，
+    阶段之间由协调进程同步，因此光晕直接在共享内存中读取，无需复制。
+    活跃集合使用块内扁平索引，返回给协调进程的索引均为网格扁平索引（升序）。
+    """
+
+    def __init__(self, fire_engine: FireEngine, tables: StencilTables, surface: LayerState,
+                 canopy: LayerState, window: Tuple[int, int, int, int], options: Dict):
+        self.fire_engine = fire_engine
+        self.tables = tables
+        self.surface = surface
+        self.canopy = canopy
+        self.window = window
+        self.enable_wind_effects = options['enable_wind_effects']
+        self.enable_crown_fire = options['enable_crown_fire']
+        self.fuel_consumption_rate = options['fuel_consumption_rate']
+
+        r0, r1, c0, c1 = window
+        self.block_width = c1 - c0
+        self.burning = {id(surface): ActiveSet((r1 - r0) * (c1 - c0)),
+                        id(canopy): ActiveSet((r1 - r0) * (c1 - c0))}
+        self.candidates: Dict[int, np.ndarray] = {}
+
+    def _to_local(self, indices) -> np.ndarray:
+        r0, _, c0, _ = self.window
+        rows, cols = np.divmod(np.asarray(indices, dtype=np.int64), self.surface.shape[1])
+        return (rows - r0) * self.block_width + (cols - c0)
+
+    def _to_global(self, local: np.ndarray) -> np.ndarray:
+        r0, _, c0, _ = self.window
+        rows, cols = np.divmod(local, self.block_width)
+        return (rows + r0) * self.surface.shape[1] + (cols + c0)
+
+    def add(self, surface_indices, canopy_indices):
+        """把本块内已燃烧的元胞加入活跃集合（初始火点、飞火）"""
+        self.burning[id(self.surface)].add(self._to_local(surface_indices))
+        self.burning[id(self.canopy)].add(self._to_local(canopy_indices))
+
+    def _target_window(self, layer: LayerState) -> Optional[Tuple[int, int, int, int]]:
+        """
+        本块中可能接收能量的窗口：本块燃烧元胞与光晕中燃烧元胞的外接矩形外扩一圈，再裁到本块内
+
+        Returns:
+            窗口 (r0, r1, c0, c1)，块内及光晕中均无燃烧元胞时为 None
+        """
+        r0, r1, c0, c1 = self.window
+        height, width = layer.shape
+        local = self.burning[id(layer)].indices()
+        rows = [local // self.block_width + r0]
+        cols = [local % self.block_width + c0]
+
+        # 光晕：本块外一圈（含四角）
+        left, right = max(0, c0 - 1), min(width, c1 + 1)
+        strips = []
+        if r0 > 0:
+            strips.append((r0 - 1, r0, left, right))
+        if r1 < height:
+            strips.append((r1, r1 + 1, left, right))
+        if c0 > 0:
+            strips.append((r0, r1, c0 - 1, c0))
+        if c1 < width:
+            strips.append((r0, r1, c1, c1 + 1))
+        for a, b, c, d in strips:
+            state = layer.state[a:b, c:d]
+            halo_rows, halo_cols = np.nonzero((state == SURFACE_FIRE) | (state == CROWN_FIRE))
+            rows.append(halo_rows + a)
+            cols.append(halo_cols + c)
+
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        if len(rows) == 0:
+            return None
+        return (max(r0, int(rows.min()) - 1), min(r1, int(rows.max()) + 2),
+                max(c0, int(cols.min()) - 1), min(c1, int(cols.max()) + 2))
+
+    def energy(self, dt: float):
+        """阶段1：能量传递与预热（与 CellularAutomaton._energy_transfer_step 逐元胞相同）"""
+        evaporation = self.fire_engine.evaporation_coefficient
+        width = self.surface.shape[1]
+        for layer in (self.surface, self.canopy):
+            self.candidates[id(layer)] = np.zeros(0, dtype=np.int64)
+            window = self._target_window(layer)
+            if window is None:
+                continue
+            r0, r1, c0, c1 = window
+            energy_received = stencil_energy_transfer(self.fire_engine, self.tables, layer, dt, window,
+                                                      self.enable_wind_effects)
+            layer.energy[r0:r1, c0:c1] += energy_received
+            moisture = layer.moisture[r0:r1, c0:c1]
+            heated = energy_received > 0
+            moisture[heated] = np.maximum(0.0, moisture[heated] - energy_received[heated] * evaporation)
+
+            rows, cols = np.nonzero(heated)
+            self.candidates[id(layer)] = (rows + r0) * width + (cols + c0)
+
+    def ignite(self, time: float) -> Tuple[np.ndarray, np.ndarray]:
+        """阶段2：点燃判定，返回本块新点燃的地表、树冠元胞"""
+        ignited = []
+        for layer, fire_type in ((self.surface, CellState.SURFACE_FIRE), (self.canopy, CellState.CROWN_FIRE)):
+            candidates = self.candidates.pop(id(layer))
+            can_ignite = ((layer.state.reshape(-1)[candidates] == UNBURNED) &
+                          (layer.energy.reshape(-1)[candidates] >=
+                           layer.ignition_threshold(layer.moisture.reshape(-1)[candidates])))
+            newly_ignited = candidates[can_ignite]
+            layer.ignite(newly_ignited, fire_type, time)
+            self.burning[id(layer)].add(self._to_local(newly_ignited))
+            ignited.append(newly_ignited)
+        return ignited[0], ignited[1]
+
+    def consume(self, dt: float, time: float, intensity: bool) -> Dict:
+        """
+        阶段3：燃料消耗与熄灭、树冠火跃变，可选计算最大火线强度
+
+        Args:
+            dt: 步长
+            time: 本步结束时刻
+            intensity: 是否计算最大火线强度（无飞火时本阶段之后地表燃烧集合不再变化）
+
+        Returns:
+            surface / canopy: 各层 (燃烧元胞, 燃尽元胞)，燃烧元胞附本步地表燃料消耗量 consumed；
+            crown: 新树冠火元胞；max_intensity: 最大火线强度（未计算时为 None）
+        """
+        report = {}
+        for layer, name, rate in ((self.surface, 'surface', self.fuel_consumption_rate),
+                                  (self.canopy, 'canopy', self.fuel_consumption_rate * 2)):
+            burning = self.burning[id(layer)]
+            idx = self._to_global(burning.indices())
+            fuel_load = layer.fuel_load.reshape(-1)
+
+            remaining = np.maximum(0.0, fuel_load[idx] - rate * dt)
+            if layer is self.surface:
+                report['consumed'] = (idx, fuel_load[idx] - remaining)
+            fuel_load[idx] = remaining
+            layer.burn_time.reshape(-1)[idx] += dt
+
+            burned_out = idx[fuel_load[idx] <= 0.0]
+            layer.burn_out(burned_out, time)
+            burning.remove(self._to_local(burned_out))
+            report[name] = np.sort(burned_out)
+
+        report['crown'] = np.zeros(0, dtype=np.int64)
+        surface_burning = self._to_global(self.burning[id(self.surface)].indices())
+        if self.enable_crown_fire and len(surface_burning) > 0:
+            intensity_values = fire_line_intensity(self.fire_engine, self.tables, self.surface, surface_burning)
+            critical_intensity = self.fire_engine.critical_crown_intensity(
+                self.surface.canopy_base_height, self.surface.moisture.reshape(-1)[surface_burning]
+            )
+            candidates = surface_burning[intensity_values > critical_intensity]
+            newly_crown_fires = candidates[self.canopy.state.reshape(-1)[candidates] == UNBURNED]
+            self.canopy.ignite(newly_crown_fires, CellState.CROWN_FIRE, time)
+            self.burning[id(self.canopy)].add(self._to_local(newly_crown_fires))
+            report['crown'] = newly_crown_fires
+
+        report['max_intensity'] = self.max_intensity() if intensity else None
+        return report
+
+    def max_intensity(self, spot_fires=()) -> float:
+        """阶段4：加入飞火元胞后计算本块地表燃烧元胞的最大火线强度"""
+        self.burning[id(self.surface)].add(self._to_local(spot_fires))
+        burning = self.burning[id(self.surface)]
+        if not burning:
+            return 0.0
+        intensity = fire_line_intensity(self.fire_engine, self.tables, self.surface,
+                                        self._to_global(burning.indices()))
+        return float(intensity.max())
+
+def _block_worker(conn, shm_name: str, specs: Dict[str, tuple], fire_engine: FireEngine,
+                  tables: StencilTables, surface: LayerState, canopy: LayerState,
+                  window: Tuple[int, int, int, int], options: Dict):
+    """工作进程入口：连接共享内存后循环执行协调进程发来的阶段命令，直到收到 None"""
+    shm = _attach(shm_name)
+    stepper = None
+    try:
+        arrays = _views(shm.buf, specs)
+        tables.edge_class = arrays['edge_class']
+        stepper = BlockStepper(fire_engine, tables, _bind_layer(surface, arrays, 'surface'),
+                               _bind_layer(canopy, arrays, 'canopy'), window, options)
+        del arrays
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            command, args = message
+            try:
+                conn.send((True, getattr(stepper, command)(*args)))
+            except Exception:
+                conn.send((False, traceback.format_exc()))
+    finally:
+        # 释放共享内存视图后才能关闭映射
+        stepper = tables = None
+        shm.close()
+        conn.close()
+
+class DomainDecomposition:
+    """
+    区域分解并行模拟
+
+    网格切分为 rows × cols 个矩形块，每块由一个工作进程推进；两层动态数组和边类别表放在一块共享内存中，
+    相邻块之间的一圈光晕元胞在每个阶段之后经共享内存交换。每个时间步分阶段同步：
+    能量传递 → 点燃 → 燃料消耗/熄灭/树冠火跃变 → 飞火（协调进程）→ 最大火线强度。
+
+    协调进程按工作进程报告的点燃、燃尽维护与单进程相同顺序的活跃集合，并在其上执行飞火抽样与统计，
+    因此结果（状态、到达时间、统计量、随机数序列）与 CellularAutomaton.run_simulation 完全相同。
+    仅支持固定步长。
+    """
+
+    def __init__(self, ca, blocks: Optional[Sequence[int]] = None):
+        """
+        Args:
+            ca: 已初始化地形（并设置起火点）的元胞自动机
+            blocks: 分块数 (rows, cols)，None表示读取配置 domain_blocks，默认按CPU核数切成行条
+        """
+        if ca.adaptive_time_step:
+            raise ValueError("domain decomposition requires a fixed time step (adaptive_time_step is set)")
+        if ca.auto_expand_domain:
+            raise ValueError("domain decomposition does not support auto_expand_domain")
+        if blocks is None:
+            blocks = ca.config.get('domain_blocks', (os.cpu_count() or 1, 1))
+        self.ca = ca
+        self.windows = block_windows(ca.terrain.shape, blocks)
+
+    def _owner(self, indices: np.ndarray) -> List[np.ndarray]:
+        """按所属块拆分网格扁平索引"""
+        rows, cols = np.divmod(np.asarray(indices, dtype=np.int64), self.ca.terrain.width)
+        return [indices[(rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1)]
+                for r0, r1, c0, c1 in self.windows]
+
+    def _call(self, command: str, args: List[tuple]) -> list:
+        """向各块发送同一阶段命令并等待全部完成（阶段屏障）"""
+        for conn, block_args in zip(self._conns, args):
+            conn.send((command, block_args))
+        results = []
+        for b, conn in enumerate(self._conns):
+            ok, result = conn.recv()
+            if not ok:
+                raise RuntimeError(f"block {b} {self.windows[b]} failed in {command}:\n{result}")
+            results.append(result)
+        return results
+
+    def _broadcast(self, command: str, *args) -> list:
+        return self._call(command, [args] * len(self._conns))
+
+    def run(self, end_time: Optional[float] = None) -> Dict:
+        """
+        运行模拟
+
+        Args:
+            end_time: 结束时间（分钟），None表示使用默认最大时间
+
+        Returns:
+            模拟结果字典（格式与 run_simulation 相同）
+        """
+        ca = self.ca
+        if end_time is None:
+            end_time = ca.max_simulation_time
+
+        print(f"开始分块并行火灾模拟（{len(self.windows)} 个区块），目标时间: {end_time} 分钟")
+
+        ca._rebuild_statistics()
+        ca.step_sizes = []
+
+        # 动态数组与边类别表复制到共享内存，模拟期间协调进程也改用共享内存视图
+        surface, canopy = ca.surface, ca.canopy
+        arrays = {'edge_class': ca.stencil.edge_class}
+        for prefix, layer in (('surface', surface), ('canopy', canopy)):
+            arrays.update({f'{prefix}.{name}': np.asarray(getattr(layer, name)) for name in LayerState.ARRAYS})
+        specs, size = _layout(arrays)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        views = _views(shm.buf, specs)
+        for name, array in arrays.items():
+            views[name][...] = array
+        tables = copy.copy(ca.stencil)
+        tables.edge_class = None
+        options = {'enable_wind_effects': ca.enable_wind_effects,
+                   'enable_crown_fire': ca.enable_crown_fire,
+                   'fuel_consumption_rate': ca.fuel_consumption_rate}
+
+        self._conns = []
+        processes = []
+        try:
+            context = multiprocessing.get_context()
+            for window in self.windows:
+                parent, child = context.Pipe()
+                process = context.Process(target=_block_worker,
+                                          args=(child, shm.name, specs, ca.fire_engine, tables,
+                                                _skeleton(surface), _skeleton(canopy), window, options),
+                                          daemon=True)
+                process.start()
+                child.close()
+                self._conns.append(parent)
+                processes.append(process)
+
+            ca.surface = _bind_layer(surface, views, 'surface')
+            ca.canopy = _bind_layer(canopy, views, 'canopy')
+            self._call('add', list(zip(self._owner(ca._burning_surface.indices()),
+                                       self._owner(ca._burning_canopy.indices()))))
+
+            while ca.current_time < end_time:
+                self.step()
+
+                if len(ca._burning_surface) == 0 and len(ca._burning_canopy) == 0:
+                    print(f"模拟在 {ca.current_time:.1f} 分钟时自然结束（无活跃火点）")
+                    break
+
+                if int(ca.current_time) % 60 == 0:
+                    print(f"模拟进度: {ca.current_time:.1f} 分钟, "
+                          f"燃烧面积: {ca.stats['burned_area']:.1f} m²")
+        finally:
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+
+            # 结果写回原数组，释放共享内存
+            for prefix, layer in (('surface', surface), ('canopy', canopy)):
+                for name in LayerState.ARRAYS:
+                    getattr(layer, name)[...] = views[f'{prefix}.{name}']
+            ca.surface, ca.canopy = surface, canopy
+            del views
+            shm.close()
+            shm.unlink()
+
+        print(f"模拟完成，总用时: {ca.current_time:.1f} 分钟")
+
+        return ca.simulation_result()
+
+    def step(self):
+        """推进一个时间步（阶段顺序与 CellularAutomaton.step 相同）"""
+        ca = self.ca
+        dt = ca.dt
+        time = ca.current_time + dt
+
+        # 1. 能量传递与预热
+        self._broadcast('energy', dt)
+
+        # 2. 点燃判定：各块的新点燃元胞合并为行优先顺序，与单进程的候选顺序一致
+        ignited = self._broadcast('ignite', time)
+        newly_surface = np.sort(np.concatenate([surface for surface, _ in ignited]))
+        newly_canopy = np.sort(np.concatenate([canopy for _, canopy in ignited]))
+        ca._burning_surface.add(newly_surface)
+        ca._record_surface_ignition(newly_surface)
+        ca._burning_canopy.add(newly_canopy)
+
+        # 3-4. 燃料消耗与熄灭、树冠火跃变
+        reports = self._broadcast('consume', dt, time, not ca.enable_spotting)
+        cells = np.concatenate([report['consumed'][0] for report in reports])
+        consumed = np.concatenate([report['consumed'][1] for report in reports])
+        # 按单进程的燃烧集合顺序求和，浮点累加结果逐位相同
+        ca._surface_fuel_consumed += float(np.sum(consumed[ca._burning_surface.order(cells)]))
+        ca._burning_surface.remove(np.concatenate([report['surface'] for report in reports]))
+        ca._burning_canopy.remove(np.concatenate([report['canopy'] for report in reports]))
+        crown = np.concatenate([report['crown'] for report in reports])
+        ca._burning_canopy.add(crown[ca._burning_surface.order(crown)])
+
+        # 5. 飞火（协调进程按单进程顺序抽样，新火点交给所属块）
+        if ca.enable_spotting:
+            spot_fires = np.asarray(ca._spotting_step(), dtype=np.int64)
+            max_intensity = max(self._call('max_intensity', [(part,) for part in self._owner(spot_fires)]))
+        else:
+            max_intensity = max(report['max_intensity'] for report in reports)
+
+        # 6-8. 更新时间、统计与历史
+        ca.current_time = time
+        ca._update_statistics(max_intensity)
+        ca._record_history()
+        ca.step_sizes.append(dt)
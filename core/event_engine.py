@@ -0,0 +1,424 @@
+"""
+离散事件模拟引擎 - 按预测点燃时刻在事件之间跳跃推进
+Discrete-Event Simulation Engine - Jump Between Predicted Ignition, Burnout and Spotting Events
+"""
+
+import heapq
+import itertools
+import math
+import numpy as np
+from typing import Dict, Optional
+from .cell import CellState
+from .grid import NEIGHBOR_OFFSETS
+from .kernels import fire_line_intensity
+
+UNBURNED = CellState.UNBURNED.value
+SURFACE_FIRE = CellState.SURFACE_FIRE.value
+CROWN_FIRE = CellState.CROWN_FIRE.value
+
+# 事件类型（同一时刻按此顺序处理，与时间步模型中的阶段顺序一致）
+IGNITION = 0   # 能量达到点燃阈值
+BURNOUT = 1    # 燃料耗尽
+REFRESH = 2    # 受威胁元胞重新同步并重新预测
+SPOTTING = 3   # 树冠元胞产生飞火
+
+class EventDrivenEngine:
+    """
+    离散事件模拟引擎
+
+    时间仍落在 dt 网格上（第 s 个事件时刻 = 起始时刻 + s·dt），但只在有事件的时刻做工作：
+    受威胁的未燃烧元胞按当前燃烧邻居计算每步接收能量，预测越过点燃阈值的时刻并放入优先队列；
+    燃烧邻居变化（点燃、燃尽）时才重新同步和预测。燃烧元胞的燃尽时刻、树冠元胞的飞火时刻
+    （每步概率 p 的几何分布等待时间）同样作为事件调度。
+
+    燃料随燃烧逐步减少、目标元胞逐步干燥都会改变每步接收的能量，
+    因此预测最多向前 refresh_steps 步，之后重新同步；未启用飞火时 refresh_steps=1 与时间步推进结果一致
+    （飞火的几何分布等待时间对随机数的使用方式不同，启用飞火时两者只在统计意义上一致）。
+    """
+
+    def __init__(self, automaton, refresh_steps: Optional[int] = None):
+        """
+        Args:
+            automaton: 已初始化地形并设置起火点的 CellularAutomaton
+            refresh_steps: 预测的最大前瞻步数，None表示读取配置 event_refresh_steps（默认1）
+        """
+        ca = automaton
+        if ca.auto_expand_domain:
+            raise ValueError("event-driven simulation does not support auto_expand_domain")
+        self.ca = ca
+        self.dt = ca.time_step
+        if refresh_steps is None:
+            refresh_steps = ca.config.get('event_refresh_steps', 1)
+        self.refresh_steps = max(1, int(refresh_steps))
+
+        self.layers = (ca.surface, ca.canopy)
+        self.burning = (ca._burning_surface, ca._burning_canopy)
+        self.fire_types = (CellState.SURFACE_FIRE, CellState.CROWN_FIRE)
+        self.consumption = (ca.fuel_consumption_rate * self.dt, ca.fuel_consumption_rate * 2 * self.dt)
+
+        size = ca.terrain.size
+        self._sync_step = [np.zeros(size, dtype=np.int64) for _ in self.layers]    # 能量/含水量已同步到的时刻
+        self._inflow = [np.zeros(size) for _ in self.layers]                       # 每步接收能量
+        self._version = [np.zeros(size, dtype=np.int64) for _ in self.layers]      # 预测版本号
+        self._start_fuel = [layer.fuel_load.reshape(-1).copy() for layer in self.layers]
+        self._start_step = [np.zeros(size, dtype=np.int64) for _ in self.layers]   # 燃料开始消耗的时刻
+        self._trajectories = {}
+
+        self._queue = []
+        self._seq = itertools.count()
+        self._start_time = ca.current_time
+        self._history_step = 0   # 已记录小时历史的最后时刻
+        self.num_events = 0
+
+    def run(self, end_time: Optional[float] = None) -> Dict:
+        """
+        运行至 end_time 或火灾自然结束
+
+        Returns:
+            模拟结果字典（格式与 CellularAutomaton.run_simulation 相同）
+        """
+        ca = self.ca
+        if end_time is None:
+            end_time = ca.max_simulation_time
+        last_step = max(0, int(math.ceil((end_time - self._start_time) / self.dt - 1e-9)))
+
+        print(f"开始离散事件火灾模拟，目标时间: {end_time} 分钟")
+
+        if not ca._resumed:
+            ca.step_sizes = []
+        ca._resumed = False
+        self._seed()
+        final_step = last_step
+        while self._queue and self._queue[0][0] <= last_step:
+            step = self._queue[0][0]
+            # 两次事件之间状态不变，先补记其间越过的整点历史
+            self._record_hours(step - 1)
+            self._process(step)
+            if len(self.burning[0]) == 0 and len(self.burning[1]) == 0:
+                final_step = step
+                print(f"模拟在 {self._time(step):.1f} 分钟时自然结束（无活跃火点）")
+                break
+
+        self._finalize(final_step)
+        print(f"模拟完成，总用时: {ca.current_time:.1f} 分钟，处理事件 {self.num_events} 个")
+
+        return ca.simulation_result()
+
+    def _time(self, step: int) -> float:
+        return self._start_time + step * self.dt
+
+    def _push(self, step: int, kind: int, layer_id: int, index: int, version: int = 0):
+        heapq.heappush(self._queue, (step, kind, next(self._seq), layer_id, index, version))
+
+    # ------------------------------------------------------------------
+    # 初始化与事件处理
+    # ------------------------------------------------------------------
+
+    def _seed(self):
+        """按当前燃烧元胞调度燃尽与飞火事件，并预测其未燃烧邻居"""
+        for layer_id, burning in enumerate(self.burning):
+            indices = burning.indices()
+            self._schedule_burnout(layer_id, indices, 0)
+            if layer_id == 1:
+                for index in indices.tolist():
+                    self._schedule_spotting(index, 1)
+            self._predict(layer_id, self._neighbors(layer_id, indices, UNBURNED), 0)
+
+    def _process(self, step: int):
+        """处理同一时刻的全部事件"""
+        events = {IGNITION: [[], []], BURNOUT: [[], []], REFRESH: [[], []], SPOTTING: [[], []]}
+        dirty = [[], []]
+        crown_candidates = []
+
+        # 1. 点燃（版本号一致的预测才有效）
+        self._pop(step, IGNITION, events)
+        for layer_id, (indices, versions) in enumerate(self._split(events[IGNITION])):
+            valid = ((versions == self._version[layer_id][indices]) &
+                     (self.layers[layer_id].state.reshape(-1)[indices] == UNBURNED))
+            indices = np.unique(indices[valid])
+            if len(indices) == 0:
+                continue
+            # 点燃步内已消耗一步燃料（与时间步模型的阶段顺序一致）
+            self._ignite(layer_id, indices, step, step - 1, dirty)
+            if layer_id == 0:
+                crown_candidates.append(indices)
+            else:
+                for index in indices.tolist():
+                    self._schedule_spotting(index, step)
+
+        # 2. 燃尽
+        self._pop(step, BURNOUT, events)
+        for layer_id, (indices, _) in enumerate(self._split(events[BURNOUT])):
+            layer = self.layers[layer_id]
+            indices = np.unique(indices)
+            indices = indices[layer.state.reshape(-1)[indices] == self.fire_types[layer_id].value]
+            if len(indices) == 0:
+                continue
+            layer.burn_out(indices, self._time(step))
+            layer.burn_time.reshape(-1)[indices] = (step - self._start_step[layer_id][indices]) * self.dt
+            self.burning[layer_id].remove(indices)
+            dirty[layer_id].append(self._neighbors(layer_id, indices, UNBURNED))
+
+        # 3. 到期的预测重新同步
+        self._pop(step, REFRESH, events)
+        for layer_id, (indices, versions) in enumerate(self._split(events[REFRESH])):
+            dirty[layer_id].append(indices[versions == self._version[layer_id][indices]])
+
+        # 4. 树冠火跃变
+        if self.ca.enable_crown_fire:
+            self._crown_transition(step, dirty, crown_candidates)
+
+        # 5. 飞火
+        self._pop(step, SPOTTING, events)
+        for canopy_idx in events[SPOTTING][1]:
+            self._spot(canopy_idx[0], step, dirty)
+
+        # 6. 受影响元胞按新的燃烧邻居重新预测
+        for layer_id in range(len(self.layers)):
+            if dirty[layer_id]:
+                self._predict(layer_id, np.unique(np.concatenate(dirty[layer_id])), step)
+
+    def _pop(self, step: int, kind: int, events: Dict):
+        queue = self._queue
+        while queue and queue[0][0] == step and queue[0][1] == kind:
+            _, _, _, layer_id, index, version = heapq.heappop(queue)
+            events[kind][layer_id].append((index, version))
+            self.num_events += 1
+
+    @staticmethod
+    def _split(per_layer):
+        for items in per_layer:
+            if items:
+                pairs = np.array(items, dtype=np.int64)
+                yield pairs[:, 0], pairs[:, 1]
+            else:
+                yield np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    def _ignite(self, layer_id: int, indices: np.ndarray, step: int, start_step: int, dirty):
+        """点燃元胞并调度其燃尽事件"""
+        layer = self.layers[layer_id]
+        self._sync(layer_id, indices, step)
+        layer.ignite(indices, self.fire_types[layer_id], self._time(step))
+        self.burning[layer_id].add(indices)
+        self._start_fuel[layer_id][indices] = layer.fuel_load.reshape(-1)[indices]
+        self._schedule_burnout(layer_id, indices, start_step)
+        dirty[layer_id].append(self._neighbors(layer_id, indices, UNBURNED))
+
+    def _crown_transition(self, step: int, dirty, crown_candidates):
+        """检查火线强度可能变化的地表燃烧元胞：本时刻点燃的元胞与受影响未燃烧元胞的燃烧邻居"""
+        surface, canopy = self.layers
+        candidates = list(crown_candidates)
+        if dirty[0]:
+            candidates.append(self._neighbors(0, np.concatenate(dirty[0]), SURFACE_FIRE))
+        if not candidates:
+            return
+        candidates = np.unique(np.concatenate(candidates))
+        candidates = candidates[(surface.state.reshape(-1)[candidates] == SURFACE_FIRE) &
+                                (canopy.state.reshape(-1)[candidates] == UNBURNED)]
+        if len(candidates) == 0:
+            return
+
+        # 火线强度依赖当前燃料与未燃烧邻居的含水量，先同步
+        self._sync(0, self._neighbors(0, candidates, UNBURNED), step)
+        surface.fuel_load.reshape(-1)[candidates] = self._fuel_at(0, candidates, step)
+
+        intensity = fire_line_intensity(self.ca.fire_engine, self.ca.stencil, surface, candidates)
+        critical_intensity = self.ca.fire_engine.critical_crown_intensity(
+            surface.canopy_base_height, surface.moisture.reshape(-1)[candidates]
+        )
+        newly_crown_fires = candidates[intensity > critical_intensity]
+        if len(newly_crown_fires) == 0:
+            return
+
+        self._ignite(1, newly_crown_fires, step, step, dirty)
+        if self.ca.enable_spotting:
+            for index in newly_crown_fires.tolist():
+                self._schedule_spotting(index, step)
+
+    def _spot(self, canopy_idx: int, step: int, dirty):
+        """树冠元胞产生一次飞火，并调度下一次"""
+        if self.ca.canopy.state.reshape(-1)[canopy_idx] != CROWN_FIRE:
+            return
+        spot_position = self.ca._calculate_spot_fire_position(canopy_idx)
+        if spot_position:
+            target_idx = self.ca._find_nearest_unburned_surface_cell(spot_position)
+            if target_idx is not None:
+                self._ignite(0, np.array([target_idx]), step, step, dirty)
+        self._schedule_spotting(canopy_idx, step + 1)
+
+    def _schedule_spotting(self, canopy_idx: int, first_step: int):
+        """从 first_step 起每步以概率 p 产生飞火：按几何分布抽取等待步数"""
+        if not self.ca.enable_spotting:
+            return
+        p = self.ca.spotting_probability
+        if p <= 0:
+            return
+        delay = 0 if p >= 1 else int(math.log(1.0 - self.ca.rng.random()) / math.log1p(-p))
+        self._push(first_step + delay, SPOTTING, 1, canopy_idx)
+
+    def _schedule_burnout(self, layer_id: int, indices: np.ndarray, start_step: int):
+        self._start_step[layer_id][indices] = start_step
+        for index in indices.tolist():
+            trajectory = self._fuel_trajectory(layer_id, self._start_fuel[layer_id][index])
+            self._push(start_step + len(trajectory) - 1, BURNOUT, layer_id, index)
+
+    def _finalize(self, final_step: int):
+        """把惰性状态写回层数组，补记剩余的整点历史与步长记录"""
+        ca = self.ca
+        self._record_hours(final_step - 1)
+        self._materialize(final_step)
+        ca._record_history()
+        ca.step_sizes.extend([self.dt] * final_step)
+
+    def _record_hours(self, last_step: int):
+        """记录 (_history_step, last_step] 内越过的整点历史（同 CellularAutomaton._record_history 的判定）"""
+        for step in range(self._history_step + 1, last_step + 1):
+            if int(self._time(step)) % 60 == 0:
+                self._materialize(step)
+                self.ca._record_history()
+        self._history_step = max(self._history_step, last_step)
+
+    def _materialize(self, step: int):
+        """把 step 时刻的燃料、燃烧时间与受威胁元胞的能量写回层数组，并重建统计（代价与网格大小成正比）"""
+        ca = self.ca
+        for layer_id, layer in enumerate(self.layers):
+            pending = np.flatnonzero((self._inflow[layer_id] > 0) &
+                                     (layer.state.reshape(-1) == UNBURNED))
+            self._sync(layer_id, pending, step)
+            burning = self.burning[layer_id].indices()
+            layer.fuel_load.reshape(-1)[burning] = self._fuel_at(layer_id, burning, step)
+            layer.burn_time.reshape(-1)[burning] = (step - self._start_step[layer_id][burning]) * self.dt
+
+        ca.current_time = self._time(step)
+        ca._rebuild_statistics()
+        ca._update_statistics()
+
+    # ------------------------------------------------------------------
+    # 能量同步与点燃预测
+    # ------------------------------------------------------------------
+
+    def _fuel_trajectory(self, layer_id: int, fuel: float) -> np.ndarray:
+        """按时间步模型逐步扣减得到的燃料序列（末元素为0），按初始燃料缓存"""
+        key = (layer_id, float(fuel))
+        trajectory = self._trajectories.get(key)
+        if trajectory is None:
+            consumption = self.consumption[layer_id]
+            values = [float(fuel)]
+            while True:
+                values.append(max(0.0, values[-1] - consumption))
+                if values[-1] <= 0.0:
+                    break
+            trajectory = np.array(values)
+            self._trajectories[key] = trajectory
+        return trajectory
+
+    def _fuel_at(self, layer_id: int, indices: np.ndarray, step: int) -> np.ndarray:
+        """燃烧元胞在 step 时刻的燃料载量"""
+        start_fuel = self._start_fuel[layer_id][indices]
+        elapsed = step - self._start_step[layer_id][indices]
+        fuel = np.zeros(len(indices))
+        for value in np.unique(start_fuel):
+            trajectory = self._fuel_trajectory(layer_id, value)
+            same = start_fuel == value
+            fuel[same] = trajectory[np.minimum(elapsed[same], len(trajectory) - 1)]
+        return fuel
+
+    def _sync(self, layer_id: int, indices: np.ndarray, step: int):
+        """按上次预测的每步接收能量，把能量与含水量推进到 step 时刻"""
+        if len(indices) == 0:
+            return
+        layer = self.layers[layer_id]
+        evaporation = self.ca.fire_engine.evaporation_coefficient
+        elapsed = step - self._sync_step[layer_id][indices]
+        received = self._inflow[layer_id][indices]
+        energy = layer.energy.reshape(-1)[indices]
+        moisture = layer.moisture.reshape(-1)[indices]
+
+        # 无能量输入的元胞只需更新同步时刻
+        for k in range(int(elapsed[received > 0].max(initial=0))):
+            active = elapsed > k
+            energy[active] += received[active]
+            heated = active & (received > 0)
+            moisture[heated] = np.maximum(0.0, moisture[heated] - received[heated] * evaporation)
+
+        layer.energy.reshape(-1)[indices] = energy
+        layer.moisture.reshape(-1)[indices] = moisture
+        self._sync_step[layer_id][indices] = step
+
+    def _predict(self, layer_id: int, indices: np.ndarray, step: int):
+        """同步受威胁元胞，按当前燃烧邻居计算每步接收能量并预测点燃时刻"""
+        layer = self.layers[layer_id]
+        indices = indices[layer.state.reshape(-1)[indices] == UNBURNED]
+        if len(indices) == 0:
+            return
+        self._sync(layer_id, indices, step)
+
+        received = self._received_per_step(layer_id, indices, step)
+        self._inflow[layer_id][indices] = received
+        self._version[layer_id][indices] += 1
+        versions = self._version[layer_id][indices]
+
+        # 按时间步模型的逐步更新向前推演，最多 refresh_steps 步
+        evaporation = self.ca.fire_engine.evaporation_coefficient
+        energy = layer.energy.reshape(-1)[indices].copy()
+        moisture = layer.moisture.reshape(-1)[indices].copy()
+        pending = received > 0
+        for k in range(1, self.refresh_steps + 1):
+            if not pending.any():
+                break
+            energy[pending] += received[pending]
+            moisture[pending] = np.maximum(0.0, moisture[pending] - received[pending] * evaporation)
+            ignites = pending & (energy >= layer.ignition_threshold(moisture))
+            for i in np.flatnonzero(ignites).tolist():
+                self._push(step + k, IGNITION, layer_id, int(indices[i]), int(versions[i]))
+            pending &= ~ignites
+
+        for i in np.flatnonzero(pending).tolist():
+            self._push(step + self.refresh_steps, REFRESH, layer_id, int(indices[i]), int(versions[i]))
+
+    def _received_per_step(self, layer_id: int, indices: np.ndarray, step: int) -> np.ndarray:
+        """目标元胞从当前燃烧邻居每步接收的能量（公式与求和顺序同 stencil_energy_transfer）"""
+        ca = self.ca
+        layer = self.layers[layer_id]
+        tables = ca.stencil
+        height, width = layer.shape
+        wind_factor = tables.wind_factor(ca.fire_engine, ca.enable_wind_effects)
+        state = layer.state.reshape(-1)
+        moisture = layer.moisture.reshape(-1)[indices]
+        rows, cols = np.divmod(indices, width)
+
+        received = np.zeros(len(indices))
+        for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+            # 方向 d 上指向目标的源元胞为 (i-di, j-dj)
+            r, c = rows - di, cols - dj
+            inside = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+            source = np.where(inside, r * width + c, indices)
+            source_state = state[source]
+            active = inside & ((source_state == SURFACE_FIRE) | (source_state == CROWN_FIRE))
+            if not active.any():
+                continue
+
+            edge_class = tables.edge_class[d].reshape(-1)[source[active]]
+            distance = tables.distance[edge_class]
+            spread_rate = ca.fire_engine.spread_rate_array(wind_factor[edge_class], moisture[active],
+                                                           tables.slope_factor[edge_class])
+            energy_delta = ca.fire_engine.energy_transfer_array(self._fuel_at(layer_id, source[active], step),
+                                                                layer.heat_content, spread_rate, distance, self.dt)
+            received[active] += np.where(distance > 0, energy_delta, 0.0)
+
+        return received
+
+    # ------------------------------------------------------------------
+    # 邻居查询
+    # ------------------------------------------------------------------
+
+    def _neighbors(self, layer_id: int, indices: np.ndarray, value: int) -> np.ndarray:
+        """给定元胞的8邻域中状态为 value 的元胞（去重，代价与给定元胞数成正比）"""
+        width = self.ca.terrain.width
+        state = self.layers[layer_id].state.reshape(-1)
+        found = []
+        for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+            inside = self.ca.stencil.edge_class[d].reshape(-1)[indices] > 0
+            neighbor = indices[inside] + di * width + dj
+            found.append(neighbor[state[neighbor] == value])
+        return np.unique(np.concatenate(found))
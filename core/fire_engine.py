@@ -8,6 +8,17 @@ from typing import Tuple, Optional
 from .cell import Cell, CellState
 import math
 
+def with_wind_vector(config: dict, wind_vector) -> dict:
+    """
+    返回风向量替换为 wind_vector 的配置副本
+
+    风向量可能写在 environment 节点中（与 FireEngine 的读取规则一致），两处同时替换。
+    """
+    config = dict(config, wind_vector=wind_vector)
+    if 'environment' in config:
+        config['environment'] = dict(config['environment'], wind_vector=wind_vector)
+    return config
+
 class FireEngine:
     """火蔓延物理引擎"""
     
@@ -54,6 +65,22 @@ class FireEngine:
         self.base_ignition_energy = config.get('base_ignition_energy', 100.0)
         self.ignition_moisture_factor = config.get('ignition_moisture_factor', 2.0)
         
+    @property
+    def wind_vector(self) -> np.ndarray:
+        """全局风向量（只读数组，修改需整体赋值或调用 set_wind）"""
+        return self._wind_vector
+    
+    @wind_vector.setter
+    def wind_vector(self, value):
+        wind_vector = np.array(value, dtype=np.float64)
+        wind_vector.setflags(write=False)
+        self._wind_vector = wind_vector
+    
+    def wind_key(self, enable_wind: bool = True) -> tuple:
+        """风效应参数键：风向量或风效应参数变化时改变，用于风效应查找表的失效判断"""
+        return (enable_wind, tuple(self._wind_vector.tolist()), self.wind_speed_factor_c,
+                self.wind_speed_power_d, self.wind_direction_factor_k)
+    
     def set_wind(self, wind_speed: float, wind_direction_deg: float):
         """设置风向和风速"""
         wind_dir_rad = math.radians(wind_direction_deg)
@@ -155,10 +182,29 @@ class FireEngine:
         R_i→j = R0 · K_wind(V_w,α_ij,φ,aspect) · Ks · K_m(M_j) · Φ(φ_ij)
         考虑风-坡耦合效应和跨越地形分界线的情况
         """
+        return self.spread_rate_between(
+            from_cell.static.position, to_cell.static.position,
+            from_cell.static.slope, from_cell.static.aspect,
+            to_cell.static.slope, to_cell.static.aspect,
+            to_cell.dynamic.moisture_content, enable_wind
+        )
+    
+    def spread_rate_between(self, pos_from, pos_to,
+                            slope_from: float, aspect_from: float,
+                            slope_to: float, aspect_to: float,
+                            moisture_to: float, enable_wind: bool = True) -> float:
+        """
+        按坐标与地形参数计算蔓延速度（供数组后端直接调用）
+        
+        Args:
+            pos_from, pos_to: 源/目标元胞三维坐标
+            slope_from, aspect_from: 源元胞坡度、坡向 (弧度)
+            slope_to, aspect_to: 目标元胞坡度、坡向 (弧度)
+            moisture_to: 目标元胞含水量
+            enable_wind: 是否启用风效应
+        """
         # 计算蔓延方向向量
-        pos_from = np.array(from_cell.static.position)
-        pos_to = np.array(to_cell.static.position)
-        spread_vector = pos_to - pos_from
+        spread_vector = np.array(pos_to) - np.array(pos_from)
         
         # 计算局部坡度（从from到to的坡度）
         horizontal_dist = math.sqrt(spread_vector[0]**2 + spread_vector[1]**2)
@@ -169,14 +215,14 @@ class FireEngine:
         
         # 确定用于风效应计算的坡度和坡向
         # 如果跨越分界线，使用目标元胞的坡度/坡向；否则使用源元胞的
-        if self._cells_cross_terrain_boundary(from_cell, to_cell):
+        if self._crosses_terrain_boundary(pos_from[1], pos_to[1]):
             # 跨越平地-山坡分界线，使用目标元胞的地形参数
-            terrain_slope = to_cell.static.slope
-            terrain_aspect = to_cell.static.aspect
+            terrain_slope = slope_to
+            terrain_aspect = aspect_to
         else:
             # 在同一地形区域内，使用源元胞的地形参数
-            terrain_slope = from_cell.static.slope
-            terrain_aspect = from_cell.static.aspect
+            terrain_slope = slope_from
+            terrain_aspect = aspect_from
         
         # 计算各项因子
         slope_factor = self.slope_effect(local_slope)
@@ -186,7 +232,7 @@ class FireEngine:
             slope_aspect=terrain_aspect,
             enable_wind=enable_wind
         )
-        moisture_factor = self.moisture_effect(to_cell.dynamic.moisture_content)
+        moisture_factor = self.moisture_effect(moisture_to)
         
         # 统一蔓延速度公式
         spread_rate = (self.R0 * wind_factor * self.Ks * 
@@ -194,17 +240,26 @@ class FireEngine:
         
         return max(0.0, spread_rate)  # 确保非负
     
+    def spread_rate_array(self, wind_factor: np.ndarray, moisture_to: np.ndarray,
+                          slope_factor: np.ndarray) -> np.ndarray:
+        """统一蔓延速度公式的数组版本（各因子已逐边给出）"""
+        spread_rate = (self.R0 * wind_factor * self.Ks * 
+                      np.exp(-self.moisture_factor_b * moisture_to) * slope_factor)
+        return np.maximum(0.0, spread_rate)
+    
     def _cells_cross_terrain_boundary(self, from_cell: Cell, to_cell: Cell) -> bool:
         """
         判断两个元胞是否跨越地形分界线（平地-山坡）
         基于y坐标和intersection_distance判断
         """
+        return self._crosses_terrain_boundary(from_cell.static.position[1],
+                                              to_cell.static.position[1])
+    
+    def _crosses_terrain_boundary(self, from_y: float, to_y: float) -> bool:
+        """按y坐标判断是否跨越平地-山坡分界线"""
         # 使用更新后的分界线距离
         intersection_distance = 4000.0
         
-        from_y = from_cell.static.position[1]
-        to_y = to_cell.static.position[1]
-        
         from_is_flat = from_y <= intersection_distance
         to_is_flat = to_y <= intersection_distance
         
@@ -226,9 +281,18 @@ class FireEngine:
         # 计算蔓延速度
         spread_rate = self.calculate_spread_rate(from_cell, to_cell, enable_wind)
         
+        return self.energy_transfer_between(from_cell.dynamic.fuel_load,
+                                            from_cell.static.heat_content,
+                                            spread_rate, distance, dt)
+    
+    def energy_transfer_between(self, fuel_load: float, heat_content: float,
+                                spread_rate: float, distance: float, dt: float) -> float:
+        """
+        由源元胞燃料、蔓延速度和距离计算能量传递增量（供数组后端直接调用）
+        """
         # 能量传递系数 C（基于燃料载量和热值）
-        energy_coefficient = (from_cell.dynamic.fuel_load * 
-                            from_cell.static.heat_content / 1000)  # 转换为MJ
+        energy_coefficient = (fuel_load * 
+                            heat_content / 1000)  # 转换为MJ
         
         # 热通量计算
         heat_flux = energy_coefficient * spread_rate
@@ -245,6 +309,14 @@ class FireEngine:
         
         return energy_transfer
     
+    def energy_transfer_array(self, fuel_load: np.ndarray, heat_content: float,
+                              spread_rate: np.ndarray, distance: np.ndarray, dt: float) -> np.ndarray:
+        """能量传递增量的数组版本 ΔE = C·W·R / max(1, D) · Δt · multiplier，下限 min_energy_transfer"""
+        energy_coefficient = fuel_load * heat_content / 1000  # 转换为MJ
+        energy_transfer = energy_coefficient * spread_rate / np.maximum(1.0, distance) * dt
+        energy_transfer = energy_transfer * self.energy_transfer_multiplier
+        return np.maximum(energy_transfer, self.min_energy_transfer * dt)
+    
     def calculate_fire_line_intensity(self, cell: Cell) -> float:
         """
         计算火线强度 I = c_I · R_avg · W
@@ -281,14 +353,20 @@ class FireEngine:
         """
         fire_intensity = self.calculate_fire_line_intensity(surface_cell)
         
-        # Van Wagner临界强度公式（简化版）
-        cbh = surface_cell.static.canopy_base_height
-        fmc = surface_cell.dynamic.moisture_content * 100  # 转换为百分比
-        
-        critical_intensity = (0.01 * cbh * (460 + 26 * fmc)) ** 1.5
+        critical_intensity = self.critical_crown_intensity(
+            surface_cell.static.canopy_base_height,
+            surface_cell.dynamic.moisture_content
+        )
         
         return fire_intensity > critical_intensity
     
+    def critical_crown_intensity(self, canopy_base_height: float, moisture_content: float) -> float:
+        """Van Wagner临界强度公式（简化版）"""
+        cbh = canopy_base_height
+        fmc = moisture_content * 100  # 转换为百分比
+        
+        return (0.01 * cbh * (460 + 26 * fmc)) ** 1.5
+    
     def update_moisture_from_heat(self, cell: Cell, energy_received: float):
         """
         基于接收到的热量更新含水量（预热干燥过程）
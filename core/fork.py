@@ -0,0 +1,328 @@
+"""
+写时复制分叉 - 运行中的模拟分出共用静态地形、动态状态首次写入时才复制的子模拟，可经共享内存交给进程池
+Copy-on-Write Fork - Child Simulations Share the Static Terrain and Copy Dynamic State on First Write, Usable with a Process Pool through Shared Memory
+"""
+
+import contextlib
+import copy
+import io
+import random
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+from .decomposition import _attach, _layout, _views
+from .fire_engine import with_wind_vector
+from .grid import ActiveSet, LayerState
+from .tiles import TiledArray
+
+# 决定静态地形、几何表或已创建的层状态的配置项：子模拟必须与父模拟相同
+FORK_FIXED_KEYS = ('cell_size', 'slope_factor_a', 'max_slope_deg', 'sparse_tiles', 'tile_size', 'compact_dtypes',
+                   'initial_fuel_load', 'initial_moisture_content', 'base_ignition_energy', 'ignition_moisture_factor')
+
+# 描述一次分叉运行而不并入配置的变体项
+VARIANT_FIELDS = ('name', 'end_time', 'prepare')
+
+def fork_config(config: dict, overrides: Optional[Dict]) -> dict:
+    """
+    父模拟配置叠加子模拟的覆盖项
+
+    Args:
+        config: 父模拟配置
+        overrides: 覆盖项（如 wind_vector、enable_spotting、random_seed），不得包含 FORK_FIXED_KEYS
+
+    Returns:
+        子模拟配置
+    """
+    overrides = overrides or {}
+    fixed = [key for key in overrides if key in FORK_FIXED_KEYS and overrides[key] != config.get(key)]
+    if fixed:
+        raise ValueError(f"fork overrides cannot change {fixed} (the terrain and layer states are shared)")
+    config = dict(config, **overrides)
+    if 'wind_vector' in overrides:
+        config = with_wind_vector(config, overrides['wind_vector'])
+    return config
+
+def fork_simulation(ca, overrides: Optional[Dict] = None):
+    """
+    分叉：新建与 ca 当前状态相同的子模拟（见 CellularAutomaton.fork）
+
+    子模拟引用同一份静态地形、几何表与空间索引；两层动态数组与燃烧集合写时复制，
+    父、子模拟各自在首次写入前复制出自己的一份，分叉本身的代价与网格大小无关。
+    统计量、历史、步长记录等小对象直接复制；配置了 random_seed 且未覆盖时，
+    子模拟的随机数发生器从父模拟的当前状态继续，因此不加覆盖项的子模拟与父模拟继续运行的结果逐位相同。
+
+    Args:
+        ca: 已初始化地形的元胞自动机
+        overrides: 子模拟的配置覆盖项
+
+    Returns:
+        子模拟
+    """
+    child = type(ca)(fork_config(ca.config, overrides))
+    child.terrain = ca.terrain
+    child.stencil = ca.stencil
+    child._spatial_index = ca._spatial_index
+    child._terrain_params = ca._terrain_params
+    child._terrain_origin = ca._terrain_origin
+
+    child.surface = ca.surface.share()
+    child.canopy = ca.canopy.share()
+    child._burning_surface = ca._burning_surface
+    child._burning_canopy = ca._burning_canopy
+    ca._shared_state = child._shared_state = True
+
+    child.current_time = ca.current_time
+    child.step_sizes = list(ca.step_sizes)
+    child.stats = dict(ca.stats)
+    child._burned_surface_count = ca._burned_surface_count
+    child._surface_fuel_consumed = ca._surface_fuel_consumed
+    child._perimeter_edges = ca._perimeter_edges
+    child.fire_history = list(ca.fire_history)
+    child.stats_history = list(ca.stats_history)
+    # 父、子模拟都接着分叉前的增量统计与步长记录继续运行
+    ca._resumed = child._resumed = True
+
+    if ca.random_seed is not None and 'random_seed' not in (overrides or {}):
+        child.rng = random.Random()
+        child.rng.setstate(ca.rng.getstate())
+    return child
+
+def _compact_view(array: np.ndarray) -> np.ndarray:
+    """广播视图只保留被广播的数据（步长为0的维度取长度1），其余数组原样返回"""
+    return array[tuple(slice(0, 1) if stride == 0 else slice(None)
+                       for stride in array.strides)]
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+# 工作进程中已连接的快照：{共享内存名: (共享内存, 父模拟)}，每个进程每个快照只连接、重建一次
+_ATTACHED: Dict[str, tuple] = {}
+
+class ForkSnapshot:
+    """
+    分叉时刻的模拟状态，放在一块共享内存中
+
+    共享内存中存放静态地形（高程、坐标、分区、边类别表）、两层动态数组（稀疏分块时为偏移表、块表与
+    已使用的块池）和燃烧集合；配置、统计量、历史、随机数状态等小对象随快照对象 pickle 传给工作进程。
+    任一进程调用 fork() 时，先（每个进程一次）在共享内存上以只读视图重建父模拟，再由它分叉出子模拟，
+    子模拟首次写入时才在本进程内复制动态数组，公共前缀只模拟一次、只存放一份。
+
+    快照由创建它的进程负责释放（close 或 with 语句）。
+    """
+
+    def __init__(self, ca):
+        """
+        Args:
+            ca: 已初始化地形的元胞自动机（其状态被复制到共享内存，之后可继续运行）
+        """
+        terrain, stencil = ca.terrain, ca.stencil
+        arrays = {'terrain.x': _compact_view(terrain.x), 'terrain.y': _compact_view(terrain.y),
+                  'terrain.z': _compact_view(terrain.z), 'terrain.zone': terrain.zone,
+                  'edge_class': stencil.edge_class,
+                  'burning_surface': ca._burning_surface.indices(),
+                  'burning_canopy': ca._burning_canopy.indices()}
+        self.layers = {}
+        for prefix, layer in (('surface', ca.surface), ('canopy', ca.canopy)):
+            skeleton = copy.copy(layer)
+            for name in LayerState.ARRAYS:
+                setattr(skeleton, name, None)
+            if layer.tiles is not None:
+                # 稀疏分块：只放偏移表、块表与已使用的槽位
+                store = layer.tiles
+                skeleton.tiles = copy.copy(store)
+                skeleton.tiles.offsets = skeleton.tiles.table = None
+                skeleton.tiles.pools = {}
+                skeleton.tiles._capacity = store._used
+                arrays[f'{prefix}.offsets'] = store.offsets
+                arrays[f'{prefix}.table'] = store.table
+                used = store._used * store.tile_size ** 2
+                arrays.update({f'{prefix}.pool.{name}': pool[:used] for name, pool in store.pools.items()})
+                self.layers[prefix] = (skeleton, {name: getattr(layer, name).name for name in LayerState.ARRAYS})
+            else:
+                arrays.update({f'{prefix}.{name}': np.asarray(getattr(layer, name)) for name in LayerState.ARRAYS})
+                self.layers[prefix] = (skeleton, None)
+
+        self.shapes = {name: terrain.shape for name in ('terrain.x', 'terrain.y', 'terrain.z')}
+        self.specs, size = _layout(arrays)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self._shm.name
+        views = _views(self._shm.buf, self.specs)
+        for name, array in arrays.items():
+            views[name][...] = array
+        del views
+
+        self.terrain = copy.copy(terrain)
+        self.terrain.x = self.terrain.y = self.terrain.z = self.terrain.zone = None
+        self.stencil = copy.copy(stencil)
+        self.stencil.edge_class = None
+        self.stencil._wind_tables = {}
+
+        self.simulation_class = type(ca)
+        self.config = ca.config
+        self.state = {
+            'current_time': ca.current_time,
+            'step_sizes': list(ca.step_sizes),
+            'stats': dict(ca.stats),
+            'counters': (ca._burned_surface_count, ca._surface_fuel_consumed, ca._perimeter_edges),
+            'fire_history': list(ca.fire_history),
+            'stats_history': list(ca.stats_history),
+            'terrain_params': ca._terrain_params,
+            'terrain_origin': ca._terrain_origin,
+            'rng_state': ca.rng.getstate() if ca.random_seed is not None else None
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
+
+    def __enter__(self) -> 'ForkSnapshot':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """释放共享内存（仅创建快照的进程调用；尚未写入的子模拟仍引用的映射在其释放后回收）"""
+        if self._shm is None:
+            return
+        _ATTACHED.pop(self.name, None)
+        with contextlib.suppress(BufferError):
+            self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def parent(self):
+        """本进程中由共享内存只读视图重建的父模拟（首次调用时连接并重建，之后复用）"""
+        attached = _ATTACHED.get(self.name)
+        if attached is None:
+            shm = self._shm if self._shm is not None else _attach(self.name)
+            attached = (shm, self._rebuild(shm))
+            _ATTACHED[self.name] = attached
+        return attached[1]
+
+    def fork(self, overrides: Optional[Dict] = None):
+        """
+        由快照分叉出子模拟（可在任一进程中调用）
+
+        Args:
+            overrides: 子模拟的配置覆盖项，见 fork_simulation
+
+        Returns:
+            子模拟
+        """
+        return fork_simulation(self.parent(), overrides)
+
+    def _rebuild(self, shm):
+        """在共享内存上重建父模拟：静态地形与动态数组都是只读视图，燃烧集合在本进程内建立"""
+        views = {name: _read_only(array) for name, array in _views(shm.buf, self.specs).items()}
+        ca = self.simulation_class(self.config)
+
+        terrain = copy.copy(self.terrain)
+        for name in ('x', 'y', 'z'):
+            setattr(terrain, name, np.broadcast_to(views[f'terrain.{name}'], self.shapes[f'terrain.{name}']))
+        terrain.zone = views['terrain.zone']
+        stencil = copy.copy(self.stencil)
+        stencil.edge_class = views['edge_class']
+        stencil._wind_tables = {}
+        ca.terrain, ca.stencil = terrain, stencil
+        ca._terrain_params = self.state['terrain_params']
+        ca._terrain_origin = self.state['terrain_origin']
+
+        for prefix in ('surface', 'canopy'):
+            skeleton, fields = self.layers[prefix]
+            layer = copy.copy(skeleton)
+            if fields is not None:
+                layer.tiles = copy.copy(skeleton.tiles)
+                layer.tiles.offsets = views[f'{prefix}.offsets']
+                layer.tiles.table = views[f'{prefix}.table']
+                layer.tiles.pools = {field: views[f'{prefix}.pool.{field}'] for field in fields.values()}
+                for name, field in fields.items():
+                    setattr(layer, name, TiledArray(layer.tiles, field))
+            else:
+                for name in LayerState.ARRAYS:
+                    setattr(layer, name, views[f'{prefix}.{name}'])
+            # 数组属于快照：由快照分叉出的子模拟与重建的父模拟都须在写入前复制
+            layer.shared = True
+            setattr(ca, prefix, layer)
+        ca._burning_surface = ActiveSet(terrain.size, views['burning_surface'])
+        ca._burning_canopy = ActiveSet(terrain.size, views['burning_canopy'])
+        ca._shared_state = True
+
+        state = self.state
+        ca.current_time = state['current_time']
+        ca.step_sizes = list(state['step_sizes'])
+        ca.stats = dict(state['stats'])
+        ca._burned_surface_count, ca._surface_fuel_consumed, ca._perimeter_edges = state['counters']
+        ca.fire_history = list(state['fire_history'])
+        ca.stats_history = list(state['stats_history'])
+        if state['rng_state'] is not None:
+            ca.rng.setstate(state['rng_state'])
+        return ca
+
+def run_fork(snapshot: ForkSnapshot, variant: Dict, end_time: Optional[float] = None,
+             collect: Optional[Callable] = None, quiet: bool = True) -> Dict:
+    """
+    由快照分叉出一个变体并运行到结束时间（在工作进程中执行，参数与返回值均须可 pickle）
+
+    Args:
+        snapshot: 分叉时刻的快照
+        variant: 变体描述：name、end_time、prepare（运行前以 prepare(child) 调用，如设置防火隔离带，
+                 须为模块级函数），其余键为子模拟的配置覆盖项
+        end_time: 默认结束时间（分钟），None表示使用默认最大时间
+        collect: 可选的结果提取函数，模拟结束后以 collect(child) 调用
+        quiet: 是否屏蔽模拟过程中的进度输出
+
+    Returns:
+        结果字典（见 runner.scenario_result）
+    """
+    # runner 依赖 cellular_automaton，而后者在模块加载时导入本模块
+    from .runner import scenario_result
+    start = time.perf_counter()
+    overrides = {key: value for key, value in variant.items() if key not in VARIANT_FIELDS}
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        child = snapshot.fork(overrides)
+        if variant.get('prepare') is not None:
+            child.detach_state()
+            variant['prepare'](child)
+        initial_burning_cells = len(child.burning_surface_cells)
+
+        child.run_simulation(variant.get('end_time', end_time))
+        output = collect(child) if collect is not None else None
+
+    return scenario_result(child, initial_burning_cells, output, start)
+
+def run_forks(ca, variants: List[Dict], end_time: Optional[float] = None,
+              max_workers: Optional[int] = None, collect: Optional[Callable] = None,
+              quiet: bool = True) -> List[Dict]:
+    """
+    从 ca 的当前状态分叉出多个变体，在进程池中并行运行
+
+    ca 的状态只放入共享内存一次，各工作进程连接后按需分叉，公共前缀不重复模拟。
+
+    Args:
+        ca: 已运行完公共前缀的元胞自动机
+        variants: 变体描述列表，见 run_fork
+        end_time: 默认结束时间（分钟）
+        max_workers: 工作进程数，None表示使用CPU核数，1表示在当前进程内顺序运行
+        collect: 可选的结果提取函数，见 run_fork
+        quiet: 是否屏蔽各变体的进度输出
+
+    Returns:
+        按变体顺序排列的结果字典，附加 index、name
+    """
+    with ForkSnapshot(ca) as snapshot:
+        if max_workers == 1:
+            results = [run_fork(snapshot, variant, end_time, collect, quiet) for variant in variants]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(run_fork, snapshot, variant, end_time, collect, quiet)
+                           for variant in variants]
+                results = [future.result() for future in futures]
+
+    for index, (variant, result) in enumerate(zip(variants, results)):
+        result.update(index=index, name=str(variant.get('name', index)))
+    return results
@@ -0,0 +1,654 @@
+"""
+数组化网格状态 - 结构数组(SoA)存储后端
+Array-Backed Grid State - Structure-of-Arrays Storage Backend
+"""
+
+import copy
+import numpy as np
+from collections.abc import Sequence
+from typing import List, Optional, Tuple
+from .cell import Cell, CellState, LayerType, StaticAttributes
+from .tiles import TileStore, TiledArray
+
+# 8邻域偏移 (di, dj)，顺序与规则网格邻居关系的建立顺序一致
+NEIGHBOR_OFFSETS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1),           (0, 1),
+    (1, -1),  (1, 0),  (1, 1),
+)
+
+def owned_nbytes(array: np.ndarray) -> int:
+    """数组实际占用的字节数：广播视图（步长为0的维度）只计被广播的数据"""
+    return array.itemsize * int(np.prod([n for n, stride in zip(array.shape, array.strides) if stride != 0]))
+
+class TerrainGrid:
+    """
+    静态地形数组 - 位置、坡度、坡向（模拟开始前设定，不再变化）
+
+    坡度、坡向只按地形分区存储，逐元胞数组在访问时由分区编号查表得到；
+    规则网格的 x、y 可以是由行、列坐标广播得到的只读视图，不占逐元胞内存。
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                 slope: np.ndarray, aspect: np.ndarray, cell_size: float,
+                 zone: Optional[np.ndarray] = None):
+        """
+        Args:
+            x, y, z: 元胞三维坐标数组 (height, width)
+            slope: 坡度数组 (弧度)
+            aspect: 坡向数组 (弧度)
+            cell_size: 元胞大小 (米)
+            zone: 地形分区编号数组，None表示按 (坡度, 坡向) 组合自动划分
+        """
+        self.x = x
+        self.y = y
+        self.z = z
+        self.cell_size = cell_size
+        
+        # 地形分区：每个分区内坡度、坡向相同
+        if zone is None:
+            pairs, zone = np.unique(np.stack([slope.ravel(), aspect.ravel()], axis=1),
+                                    axis=0, return_inverse=True)
+            zone = zone.reshape(slope.shape)
+        self.zone = zone.astype(np.uint8 if zone.max() < 256 else np.int32)
+        first = np.zeros(int(self.zone.max()) + 1, dtype=np.int64)
+        first[self.zone.ravel()] = np.arange(self.zone.size)
+        self.zone_slope = slope.ravel()[first]
+        self.zone_aspect = aspect.ravel()[first]
+
+    @classmethod
+    def from_zones(cls, x: np.ndarray, y: np.ndarray, z: np.ndarray, zone: np.ndarray,
+                   zone_slope: np.ndarray, zone_aspect: np.ndarray, cell_size: float) -> 'TerrainGrid':
+        """
+        由分区编号与各分区的坡度、坡向直接构造（不经逐元胞坡度数组，数组原样引用，可为内存映射）
+
+        Args:
+            x, y, z: 元胞三维坐标数组 (height, width)
+            zone: 地形分区编号数组
+            zone_slope, zone_aspect: 各分区的坡度、坡向 (弧度)
+            cell_size: 元胞大小 (米)
+        """
+        terrain = cls.__new__(cls)
+        terrain.x = x
+        terrain.y = y
+        terrain.z = z
+        terrain.cell_size = cell_size
+        terrain.zone = zone
+        terrain.zone_slope = zone_slope
+        terrain.zone_aspect = zone_aspect
+        return terrain
+
+    @property
+    def slope(self) -> np.ndarray:
+        """坡度数组 (弧度)，由分区查表得到"""
+        return self.zone_slope[self.zone]
+
+    @property
+    def aspect(self) -> np.ndarray:
+        """坡向数组 (弧度)，由分区查表得到"""
+        return self.zone_aspect[self.zone]
+
+    @property
+    def nbytes(self) -> int:
+        """逐元胞地形数组占用的字节数（广播视图只计被广播的行、列）"""
+        return sum(owned_nbytes(array) for array in (self.x, self.y, self.z, self.zone))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.z.shape
+
+    @property
+    def height(self) -> int:
+        return self.z.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.z.shape[1]
+
+    @property
+    def size(self) -> int:
+        return self.z.size
+
+    def position(self, index: int, z_offset: float = 0.0) -> Tuple[float, float, float]:
+        """扁平索引对应的三维坐标"""
+        i, j = divmod(int(index), self.width)
+        return (float(self.x[i, j]), float(self.y[i, j]), float(self.z[i, j]) + z_offset)
+
+    def neighbor_indices(self, index: int) -> List[int]:
+        """扁平索引的8邻域（仅网格内部）"""
+        i, j = divmod(int(index), self.width)
+        neighbors = []
+        for di, dj in NEIGHBOR_OFFSETS:
+            ni, nj = i + di, j + dj
+            if 0 <= ni < self.height and 0 <= nj < self.width:
+                neighbors.append(ni * self.width + nj)
+        return neighbors
+
+def stencil_slices(di: int, dj: int, window: Tuple[int, int, int, int],
+                   shape: Tuple[int, int]) -> Tuple[Tuple[slice, slice], Tuple[slice, slice], Tuple[slice, slice]]:
+    """
+    方向 (di, dj) 上的移位切片：目标元胞 (i, j) 的源元胞为 (i-di, j-dj)
+    
+    Args:
+        window: 目标窗口 (r0, r1, c0, c1)，左闭右开
+        shape: 网格尺寸
+    
+    Returns:
+        src, tgt: 网格上的源/目标切片
+        out: 窗口输出数组内的目标切片
+    """
+    height, width = shape
+    r0, r1, c0, c1 = window
+    tr0, tr1 = max(r0, di), min(r1, height + di)
+    tc0, tc1 = max(c0, dj), min(c1, width + dj)
+    tr1, tc1 = max(tr0, tr1), max(tc0, tc1)
+    
+    src = (slice(tr0 - di, tr1 - di), slice(tc0 - dj, tc1 - dj))
+    tgt = (slice(tr0, tr1), slice(tc0, tc1))
+    out = (slice(tr0 - r0, tr1 - r0), slice(tc0 - c0, tc1 - c0))
+    return src, tgt, out
+
+class StencilTables:
+    """
+    每方向预计算的静态几何表（只依赖地形，每个地形生成一次）
+    
+    edge_class[d, i, j] 是从元胞 (i, j) 指向方向 d 邻居的边的类别编号（0 表示越界无边），
+    同类边的几何量完全相同，按类别查表即可得到三维距离、局部坡度、坡度因子和风效应所用的地形分区。
+    """
+    
+    def __init__(self, edge_class: np.ndarray, direction: np.ndarray,
+                 spread_x: np.ndarray, spread_y: np.ndarray, spread_z: np.ndarray,
+                 distance: np.ndarray, local_slope: np.ndarray,
+                 slope_factor: np.ndarray, zone: np.ndarray,
+                 zone_slope: np.ndarray, zone_aspect: np.ndarray):
+        """
+        Args:
+            edge_class: 每方向边类别数组 (8, height, width)
+            direction: 各类别的方向编号 (NEIGHBOR_OFFSETS 下标)
+            spread_x, spread_y, spread_z: 各类别的蔓延方向向量
+            distance: 各类别的三维距离
+            local_slope: 各类别的局部坡度 (弧度)
+            slope_factor: 各类别的坡度效应因子 Φ(φ)
+            zone: 各类别风效应所用的地形分区
+            zone_slope, zone_aspect: 各地形分区的坡度、坡向 (弧度)
+        """
+        self.edge_class = edge_class
+        self.direction = direction
+        self.spread_x = spread_x
+        self.spread_y = spread_y
+        self.spread_z = spread_z
+        self.distance = distance
+        self.local_slope = local_slope
+        self.slope_factor = slope_factor
+        self.zone = zone
+        self.zone_slope = zone_slope
+        self.zone_aspect = zone_aspect
+        
+        # 风效应查找表缓存：{风效应参数键: 各类别风效应因子}
+        self._wind_tables = {}
+    
+    @property
+    def num_classes(self) -> int:
+        return len(self.distance)
+    
+    @property
+    def nbytes(self) -> int:
+        """逐元胞边类别数组占用的字节数（各类别的查找表很小，不计入）"""
+        return self.edge_class.nbytes
+    
+    def wind_factor(self, fire_engine, enable_wind: bool = True) -> np.ndarray:
+        """
+        各类别边的风-坡耦合效应因子查找表
+        
+        全局风对同一类别（地形分区 × 邻居方向 × 蔓延向量）的边效应相同，
+        因此每个风况只编译一次；风向量或风效应参数改变后自动重建。
+        """
+        key = fire_engine.wind_key(enable_wind)
+        table = self._wind_tables.get(key)
+        if table is None:
+            if len(self._wind_tables) >= 8:
+                self._wind_tables.clear()
+            table = self._compile_wind_factor(fire_engine, enable_wind)
+            table.setflags(write=False)
+            self._wind_tables[key] = table
+        return table
+    
+    def _compile_wind_factor(self, fire_engine, enable_wind: bool) -> np.ndarray:
+        """按类别调用标量公式编译风效应因子表"""
+        factors = np.ones(self.num_classes)
+        if not enable_wind:
+            return factors
+        for k in range(1, self.num_classes):
+            spread_vector = np.array([self.spread_x[k], self.spread_y[k], self.spread_z[k]])
+            factors[k] = fire_engine.wind_effect(
+                spread_vector,
+                local_slope=self.zone_slope[self.zone[k]],
+                slope_aspect=self.zone_aspect[self.zone[k]],
+                enable_wind=enable_wind
+            )
+        return factors
+
+class LayerState:
+    """单层动态状态数组 - 状态、燃料、含水量、能量、燃烧时间"""
+
+    # 逐元胞动态数组的属性名（其余属性为整层共用的参数）
+    ARRAYS = ('state', 'fuel_load', 'moisture', 'energy', 'burn_time', 'ignition_time', 'burnout_time')
+
+    def __init__(self, shape: Tuple[int, int], layer_type: LayerType,
+                 fuel_load: float, moisture_content: float,
+                 base_ignition_energy: float = 100.0,
+                 ignition_moisture_factor: float = 2.0,
+                 height_offset: float = 0.0,
+                 id_offset: int = 0,
+                 heat_content: float = 18500,
+                 canopy_base_height: float = 3.0,
+                 tile_size: Optional[int] = None,
+                 float_dtype=np.float64):
+        """
+        Args:
+            shape: 网格尺寸 (height, width)
+            layer_type: 层类型
+            fuel_load: 初始可燃物载量 (kg/m²)
+            moisture_content: 初始含水量
+            base_ignition_energy, ignition_moisture_factor: 点燃阈值参数
+            height_offset: 相对地表的高度 (米)
+            id_offset: 元胞id偏移（树冠层 = width*height）
+            heat_content: 热值 (kJ/kg)
+            canopy_base_height: 树冠基部高度 (m)
+            tile_size: 稀疏分块的块边长，None表示稠密数组；分块时只有写入过非默认值的块才分配内存
+            float_dtype: 燃料、含水量、能量、燃烧时间与到达时间的浮点类型（紧凑模式为 float32）
+        """
+        self.layer_type = layer_type
+        self.height_offset = height_offset
+        self.id_offset = id_offset
+        self.heat_content = heat_content
+        self.canopy_base_height = canopy_base_height
+        self.base_ignition_energy = base_ignition_energy
+        self.ignition_moisture_factor = ignition_moisture_factor
+
+        self.tiles = TileStore(shape, tile_size) if tile_size is not None else None
+        full = self.tiles.full if self.tiles is not None else np.full
+
+        self.state = full(shape, CellState.UNBURNED.value, dtype=np.uint8)
+        self.fuel_load = full(shape, fuel_load, dtype=float_dtype)
+        self.moisture = full(shape, moisture_content, dtype=float_dtype)
+        self.energy = full(shape, 0.0, dtype=float_dtype)
+        self.burn_time = full(shape, 0.0, dtype=float_dtype)
+
+        # 到达时间栅格：点燃时刻与燃尽时刻（分钟），未发生为 inf
+        self.ignition_time = full(shape, np.inf, dtype=float_dtype)
+        self.burnout_time = full(shape, np.inf, dtype=float_dtype)
+
+        # 各数组的初值（reset 时恢复）
+        self._initial_values = {
+            'state': CellState.UNBURNED.value, 'fuel_load': fuel_load, 'moisture': moisture_content,
+            'energy': 0.0, 'burn_time': 0.0, 'ignition_time': np.inf, 'burnout_time': np.inf
+        }
+        self.shared = False     # 数组与其他层状态共用（写时复制，见 share / detach）
+
+    def share(self) -> 'LayerState':
+        """
+        写时复制的副本：与本层共用逐元胞数组（两者的数组都设为只读），
+        任一方首次写入前调用 detach() 复制出自己的一份；共享本身只需常数时间
+        """
+        if self.tiles is not None:
+            twin = copy.copy(self)
+            twin.tiles = self.tiles.share()
+            for name in self.ARRAYS:
+                setattr(twin, name, TiledArray(twin.tiles, getattr(self, name).name))
+        else:
+            for name in self.ARRAYS:
+                getattr(self, name).flags.writeable = False
+            twin = copy.copy(self)
+        self.shared = twin.shared = True
+        return twin
+
+    def detach(self):
+        """共用数组时复制为本层独有的可写数组（稀疏分块时只复制偏移表与已分配的块），否则不做任何事"""
+        if not self.shared:
+            return
+        if self.tiles is not None:
+            self.tiles.detach()
+        else:
+            for name in self.ARRAYS:
+                setattr(self, name, getattr(self, name).copy())
+        self.shared = False
+
+    def reset(self):
+        """所有元胞恢复初值：整层批量填充，稀疏分块时直接释放全部块"""
+        self.detach()
+        if self.tiles is not None:
+            self.tiles.clear()
+            return
+        for name in self.ARRAYS:
+            getattr(self, name).fill(self._initial_values[name])
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.state.shape
+
+    @property
+    def nbytes(self) -> int:
+        """逐元胞动态数组占用的字节数（稀疏分块时只计已分配的块）"""
+        if self.tiles is not None:
+            return self.tiles.nbytes
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    @classmethod
+    def stack(cls, layers: List['LayerState']) -> 'LayerState':
+        """
+        把参数相同的若干层状态沿新的批维度堆叠为 (batch, height, width) 数组（复制当前值）
+
+        扁平索引 b·height·width + i 对应第 b 个情景的元胞 i，ignite、burn_out 可直接使用。
+        """
+        batch = copy.copy(layers[0])
+        batch.tiles = None
+        for name in cls.ARRAYS:
+            setattr(batch, name, np.stack([getattr(layer, name) for layer in layers]))
+        return batch
+
+    def select(self, b: int) -> 'LayerState':
+        """批维度上第 b 个情景的层状态（数组为批数组的视图，修改互相可见）"""
+        layer = copy.copy(self)
+        for name in self.ARRAYS:
+            setattr(layer, name, getattr(self, name)[b])
+        return layer
+
+    def ignition_threshold(self, moisture=None):
+        """点燃阈值 E = E0 · e^(k·M)，默认对整层计算"""
+        if moisture is None:
+            moisture = self.moisture
+        return self.base_ignition_energy * np.exp(self.ignition_moisture_factor * moisture)
+
+    def ignite(self, indices, fire_type: CellState, time: float = 0.0):
+        """点燃指定扁平索引的元胞（调用方保证其未燃烧），并记录点燃时刻"""
+        self.state.reshape(-1)[indices] = fire_type.value
+        self.burn_time.reshape(-1)[indices] = 0.0
+        self.ignition_time.reshape(-1)[indices] = time
+
+    def burn_out(self, indices, time: float):
+        """指定元胞燃尽：燃料清零，并记录燃尽时刻"""
+        self.state.reshape(-1)[indices] = CellState.BURNED_OUT.value
+        self.fuel_load.reshape(-1)[indices] = 0.0
+        self.burnout_time.reshape(-1)[indices] = time
+
+    def state_at(self, time: float) -> np.ndarray:
+        """
+        由到达时间栅格重建任意时刻的状态（无需重跑或保存逐帧快照）
+
+        Args:
+            time: 模拟时刻（分钟）
+
+        Returns:
+            state: (height, width) 状态值数组；燃烧中的元胞取本层的火类型
+        """
+        fire_type = (CellState.CROWN_FIRE if self.layer_type == LayerType.CANOPY
+                     else CellState.SURFACE_FIRE)
+        # 按栅格的浮点类型比较：点燃时刻按同一类型舍入存储，查询恰好落在步末时刻时不会因舍入漏掉
+        time = self.ignition_time.dtype.type(time)
+        state = np.full(self.shape, CellState.UNBURNED.value, dtype=np.uint8)
+        state[self.ignition_time <= time] = fire_type.value
+        state[self.burnout_time <= time] = CellState.BURNED_OUT.value
+        return state
+
+class ActiveSet(Sequence):
+    """
+    活跃元胞集合 - 保持插入顺序的扁平索引集合，插入与删除均摊 O(1)
+
+    元素顺序存放在缓冲区中，slot 数组记录每个索引当前所在槽位（-1 表示不在集合中）。
+    删除只把 slot 置为 -1，失效槽位在超过一半时统一压缩。
+    """
+
+    def __init__(self, capacity: int, indices=()):
+        """
+        Args:
+            capacity: 索引上限（层元胞数）
+            indices: 初始元素
+        """
+        # 槽位不超过索引上限，能用 int32 时每元胞只占4字节
+        self._slot = np.full(capacity, -1, dtype=np.int32 if capacity < 2**31 else np.int64)
+        self._items = np.empty(16, dtype=np.int64)
+        self._end = 0       # 已使用的槽位数（含失效槽位）
+        self._count = 0     # 有效元素数
+        self._cache = None  # 有效元素数组缓存
+        self.add(indices)
+
+    @property
+    def nbytes(self) -> int:
+        """槽位数组与元素缓冲区占用的字节数"""
+        return self._slot.nbytes + self._items.nbytes
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, index) -> bool:
+        return 0 <= index < len(self._slot) and self._slot[index] >= 0
+
+    def __getitem__(self, i):
+        return self.indices()[i]
+
+    def __iter__(self):
+        return iter(self.indices().tolist())
+
+    def indices(self) -> np.ndarray:
+        """按插入顺序排列的有效元素（只读数组，集合修改前保持有效）"""
+        if self._cache is None:
+            items = self._items[:self._end]
+            live = items[self._slot[items] == np.arange(self._end)]
+            live.flags.writeable = False
+            self._cache = live
+        return self._cache
+
+    def add(self, indices):
+        """追加元素（调用方保证其不在集合中）"""
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if len(indices) == 0:
+            return
+        end = self._end + len(indices)
+        if end > len(self._items):
+            grown = np.empty(max(end, 2 * len(self._items)), dtype=np.int64)
+            grown[:self._end] = self._items[:self._end]
+            self._items = grown
+        self._items[self._end:end] = indices
+        self._slot[indices] = np.arange(self._end, end)
+        self._end = end
+        self._count += len(indices)
+        self._cache = None
+
+    def remove(self, indices):
+        """删除元素（调用方保证其在集合中）"""
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if len(indices) == 0:
+            return
+        self._slot[indices] = -1
+        self._count -= len(indices)
+        self._cache = None
+        if 2 * self._count < self._end:
+            self._compact()
+
+    def order(self, indices) -> np.ndarray:
+        """给定元素（须在集合中）按插入顺序排列的下标排列，即 indices[order] 与 indices() 中的先后一致"""
+        return np.argsort(self._slot[np.asarray(indices, dtype=np.int64)], kind='stable')
+
+    def clear(self):
+        """清空集合"""
+        self._slot[self._items[:self._end]] = -1
+        self._end = 0
+        self._count = 0
+        self._cache = None
+
+    def _compact(self):
+        live = self.indices().copy()
+        self._items[:len(live)] = live
+        self._slot[live] = np.arange(len(live))
+        self._end = len(live)
+        self._cache = None
+
+class GridDynamicAttributes:
+    """数组状态上的动态属性视图 - 读写直接落在层数组中"""
+
+    __slots__ = ('_layer', '_index')
+
+    def __init__(self, layer: LayerState, index: int):
+        self._layer = layer
+        self._index = index
+
+    def _get(self, array: np.ndarray) -> float:
+        return float(array.reshape(-1)[self._index])
+
+    def _set(self, array: np.ndarray, value: float):
+        array.reshape(-1)[self._index] = value
+
+    @property
+    def state(self) -> CellState:
+        return CellState(int(self._layer.state.reshape(-1)[self._index]))
+
+    @state.setter
+    def state(self, value: CellState):
+        self._set(self._layer.state, value.value)
+        if value == CellState.UNBURNED:
+            # 重置为未燃烧时同时清除到达时间
+            self._set(self._layer.ignition_time, np.inf)
+            self._set(self._layer.burnout_time, np.inf)
+
+    @property
+    def fuel_load(self) -> float:
+        return self._get(self._layer.fuel_load)
+
+    @fuel_load.setter
+    def fuel_load(self, value: float):
+        self._set(self._layer.fuel_load, value)
+
+    @property
+    def moisture_content(self) -> float:
+        return self._get(self._layer.moisture)
+
+    @moisture_content.setter
+    def moisture_content(self, value: float):
+        self._set(self._layer.moisture, value)
+
+    @property
+    def energy(self) -> float:
+        return self._get(self._layer.energy)
+
+    @energy.setter
+    def energy(self, value: float):
+        self._set(self._layer.energy, value)
+
+    @property
+    def burn_time(self) -> float:
+        return self._get(self._layer.burn_time)
+
+    @burn_time.setter
+    def burn_time(self, value: float):
+        self._set(self._layer.burn_time, value)
+
+    @property
+    def temperature(self) -> float:
+        return 20.0
+
+class GridCell(Cell):
+    """数组状态上的元胞视图 - 兼容 cell.static / cell.dynamic / cell.neighbors 对象API"""
+
+    __slots__ = ('_terrain', '_layer', '_index')
+
+    def __init__(self, terrain: TerrainGrid, layer: LayerState, index: int):
+        self._terrain = terrain
+        self._layer = layer
+        self._index = int(index)
+        i, j = divmod(self._index, terrain.width)
+        self.static = StaticAttributes(
+            id=self._index + layer.id_offset,
+            position=terrain.position(self._index, layer.height_offset),
+            slope=float(terrain.zone_slope[terrain.zone[i, j]]),
+            aspect=float(terrain.zone_aspect[terrain.zone[i, j]]),
+            fuel_type="pine",
+            layer_type=layer.layer_type,
+            canopy_base_height=layer.canopy_base_height,
+            heat_content=layer.heat_content
+        )
+        self.dynamic = GridDynamicAttributes(layer, self._index)
+
+    @property
+    def index(self) -> int:
+        """层内扁平索引"""
+        return self._index
+
+    @property
+    def neighbors(self) -> List['GridCell']:
+        return [GridCell(self._terrain, self._layer, n)
+                for n in self._terrain.neighbor_indices(self._index)]
+
+    @property
+    def ignition_threshold(self) -> float:
+        return float(self._layer.ignition_threshold(self.dynamic.moisture_content))
+
+    def set_ignition_parameters(self, base_energy: float, moisture_factor: float):
+        """点燃参数由层统一管理"""
+        self._layer.base_ignition_energy = base_energy
+        self._layer.ignition_moisture_factor = moisture_factor
+
+    @property
+    def neighbor_indices(self) -> Tuple[int, ...]:
+        return tuple(self._terrain.neighbor_indices(self._index))
+
+    def set_neighbors(self, layer_cells, indices):
+        """邻居由网格模板隐式给出"""
+        raise TypeError("GridCell neighbors are implied by the grid stencil")
+
+    def add_neighbor(self, neighbor: 'Cell', layer_cells=None):
+        """邻居由网格模板隐式给出"""
+        raise TypeError("GridCell neighbors are implied by the grid stencil")
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, GridCell) and other._layer is self._layer
+                and other._index == self._index)
+
+    def __hash__(self) -> int:
+        return hash((id(self._layer), self._index))
+
+class LayerCellView(Sequence):
+    """层数组的元胞序列视图 - 按需构造 GridCell，不常驻对象"""
+
+    def __init__(self, terrain: TerrainGrid, layer: LayerState,
+                 indices: Optional[Sequence] = None):
+        """
+        Args:
+            terrain: 静态地形
+            layer: 层状态
+            indices: 扁平索引序列，None表示整层
+        """
+        self._terrain = terrain
+        self._layer = layer
+        self._indices = indices
+
+    def __len__(self) -> int:
+        if self._indices is None:
+            return self._terrain.size
+        return len(self._indices)
+
+    def _index_at(self, i: int) -> int:
+        if self._indices is None:
+            return i
+        return self._indices[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("cell index out of range")
+        return GridCell(self._terrain, self._layer, self._index_at(i))
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield GridCell(self._terrain, self._layer, self._index_at(k))
+
+    def __add__(self, other) -> List[GridCell]:
+        """与列表相同的拼接语义（如 surface_cells + canopy_cells）"""
+        return list(self) + list(other)
+
+    def __radd__(self, other) -> List[GridCell]:
+        return list(other) + list(self)
@@ -0,0 +1,206 @@
+"""
+整网格向量化算子 - 8邻域模板上的能量传递与蔓延速度
+Whole-Grid Vectorized Kernels - Energy Transfer and Spread Rates on the 8-Neighbour Stencil
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+from .cell import CellState
+from .fire_engine import FireEngine
+from .grid import NEIGHBOR_OFFSETS, LayerState, StencilTables, stencil_slices
+
+Window = Tuple[int, int, int, int]  # (r0, r1, c0, c1)，左闭右开
+
+def active_window(indices: np.ndarray, shape: Tuple[int, int], margin: int = 1) -> Window:
+    """
+    覆盖给定扁平索引的最小矩形窗口，外扩 margin 个元胞并裁剪到网格内
+    """
+    height, width = shape
+    rows, cols = np.divmod(np.asarray(indices), width)
+    return (max(0, int(rows.min()) - margin), min(height, int(rows.max()) + margin + 1),
+            max(0, int(cols.min()) - margin), min(width, int(cols.max()) + margin + 1))
+
+def _shift(index: Tuple[slice, slice], r0: int, c0: int) -> Tuple[slice, slice]:
+    """网格切片换算为以 (r0, c0) 为原点的局部切片"""
+    rows, cols = index
+    return slice(rows.start - r0, rows.stop - r0), slice(cols.start - c0, cols.stop - c0)
+
+def _batch_offsets(indices: np.ndarray, layer: LayerState,
+                   wind_factor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批扁平索引拆分为层内索引与扁平化风效应表中所属情景的行偏移
+
+    层状态无批维度或各情景共用一维风效应表时偏移为 0。
+    """
+    if layer.state.ndim == 2:
+        return indices, 0
+    height, width = layer.shape[-2:]
+    scenario, cells = np.divmod(indices, height * width)
+    return cells, (scenario * wind_factor.shape[-1] if wind_factor.ndim > 1 else 0)
+
+def stencil_energy_transfer(fire_engine: FireEngine, tables: StencilTables, layer: LayerState,
+                            dt: float, window: Window, enable_wind: bool = True) -> np.ndarray:
+    """
+    整窗口能量传递：对8个方向做移位数组运算，源为燃烧元胞、目标为未燃烧元胞
+    ΔE = fuel_load · heat_content · R / max(1, D) · Δt · multiplier，下限 min_energy_transfer · Δt
+    
+    距离、坡度因子、风效应均按边类别从预计算表中读取。
+    
+    Args:
+        fire_engine: 物理引擎
+        tables: 每方向静态几何表
+        layer: 层状态（能量只在同层内传递）
+        dt: 时间步长（分钟）
+        window: 目标窗口 (r0, r1, c0, c1)
+        enable_wind: 是否启用风效应
+        
+    Returns:
+        received: 窗口内每个目标元胞本步接收的能量
+    """
+    r0, r1, c0, c1 = window
+    height, width = layer.shape
+    received = np.zeros((r1 - r0, c1 - c0))
+    wind_factor = tables.wind_factor(fire_engine, enable_wind)
+    
+    # 源元胞最多在窗口外一圈：只读取外扩一圈的区域，代价与窗口大小成正比
+    e0, f0 = max(0, r0 - 1), max(0, c0 - 1)
+    region = (slice(e0, min(height, r1 + 1)), slice(f0, min(width, c1 + 1)))
+    state = layer.state[region]
+    moisture = layer.moisture[region]
+    fuel_load = layer.fuel_load[region]
+    burning = ((state == CellState.SURFACE_FIRE.value) | 
+               (state == CellState.CROWN_FIRE.value))
+    unburned = state == CellState.UNBURNED.value
+    
+    for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+        src, tgt, out = stencil_slices(di, dj, window, layer.shape)
+        local_src, local_tgt = _shift(src, e0, f0), _shift(tgt, e0, f0)
+        mask = burning[local_src] & unburned[local_tgt]
+        if not mask.any():
+            continue
+        
+        # 只在 (燃烧源, 未燃烧目标) 边上计算，数组先按掩码压缩
+        edge_class = tables.edge_class[d][src][mask]
+        distance = tables.distance[edge_class]
+        
+        spread_rate = fire_engine.spread_rate_array(wind_factor[edge_class], moisture[local_tgt][mask],
+                                                    tables.slope_factor[edge_class])
+        energy_delta = fire_engine.energy_transfer_array(fuel_load[local_src][mask], layer.heat_content,
+                                                         spread_rate, distance, dt)
+        
+        received[out][mask] += np.where(distance > 0, energy_delta, 0.0)
+    
+    return received
+
+def edge_energy_transfer(fire_engine: FireEngine, tables: StencilTables, layer: LayerState,
+                         sources: np.ndarray, dt: float, enable_wind: bool = True,
+                         wind_factor: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按燃烧元胞列表逐边计算能量传递（代价与燃烧元胞数成正比，与火场外接矩形大小无关）
+    
+    公式与 stencil_energy_transfer 相同；同一目标的贡献按方向顺序累加，接收能量逐元素一致。
+    层状态数组可带前置批维度，此时 sources 为 情景 × height × width 上的扁平索引。
+    
+    Args:
+        sources: 燃烧元胞扁平索引
+        dt: 时间步长（分钟）
+        wind_factor: 风效应因子表，None表示按 fire_engine 的风况查表；批量时为 (batch, 类别数)
+        
+    Returns:
+        targets: 接收到能量的目标元胞扁平索引（升序）
+        received: 各目标本步接收的能量
+    """
+    height, width = layer.shape[-2:]
+    sources = np.asarray(sources, dtype=np.int64)
+    if wind_factor is None:
+        wind_factor = tables.wind_factor(fire_engine, enable_wind)
+    state = layer.state.reshape(-1)
+    moisture = layer.moisture.reshape(-1)
+    fuel_load = layer.fuel_load.reshape(-1)
+    
+    source_state = state[sources]
+    sources = sources[(source_state == CellState.SURFACE_FIRE.value) |
+                      (source_state == CellState.CROWN_FIRE.value)]
+    cells, wind_offset = _batch_offsets(sources, layer, wind_factor)
+    wind_factor = wind_factor.reshape(-1)
+    
+    targets = []
+    deltas = []
+    for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+        edge_class = tables.edge_class[d].reshape(-1)[cells]
+        target = sources + di * width + dj
+        edge = edge_class > 0
+        edge[edge] = state[target[edge]] == CellState.UNBURNED.value
+        if not edge.any():
+            continue
+        
+        wind_index = (wind_offset + edge_class)[edge]
+        edge_class = edge_class[edge]
+        target = target[edge]
+        distance = tables.distance[edge_class]
+        spread_rate = fire_engine.spread_rate_array(wind_factor[wind_index], moisture[target],
+                                                    tables.slope_factor[edge_class])
+        energy_delta = fire_engine.energy_transfer_array(fuel_load[sources[edge]], layer.heat_content,
+                                                         spread_rate, distance, dt)
+        targets.append(target)
+        deltas.append(np.where(distance > 0, energy_delta, 0.0))
+    
+    if not targets:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    
+    # 各方向依次拼接，bincount 按出现顺序累加，与逐方向 += 的求和顺序相同
+    targets, inverse = np.unique(np.concatenate(targets), return_inverse=True)
+    received = np.bincount(inverse, weights=np.concatenate(deltas), minlength=len(targets))
+    return targets, received
+
+def stencil_spread_rates(fire_engine: FireEngine, tables: StencilTables, layer: LayerState,
+                         indices: np.ndarray, enable_wind: bool = True,
+                         wind_factor: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    给定元胞向8个邻居的蔓延速度（逐元胞收集，代价与元胞数成正比）
+    
+    Args:
+        indices: 层内扁平索引（批量时为 情景 × height × width 上的扁平索引）
+        wind_factor: 风效应因子表，None表示按 fire_engine 的风况查表；批量时为 (batch, 类别数)
+        
+    Returns:
+        spread_rate: (8, n) 蔓延速度
+        to_unburned: (8, n) 邻居存在且未燃烧的掩码
+    """
+    height, width = layer.shape[-2:]
+    indices = np.asarray(indices, dtype=np.int64)
+    if wind_factor is None:
+        wind_factor = tables.wind_factor(fire_engine, enable_wind)
+    cells, wind_offset = _batch_offsets(indices, layer, wind_factor)
+    wind_factor = wind_factor.reshape(-1)
+    state = layer.state.reshape(-1)
+    moisture = layer.moisture.reshape(-1)
+    
+    spread_rate = np.zeros((len(NEIGHBOR_OFFSETS), len(indices)))
+    to_unburned = np.zeros((len(NEIGHBOR_OFFSETS), len(indices)), dtype=bool)
+    for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+        edge_class = tables.edge_class[d].reshape(-1)[cells]
+        neighbor = np.where(edge_class > 0, indices + di * width + dj, indices)
+        to_unburned[d] = (edge_class > 0) & (state[neighbor] == CellState.UNBURNED.value)
+        spread_rate[d] = fire_engine.spread_rate_array(wind_factor[wind_offset + edge_class], moisture[neighbor],
+                                                       tables.slope_factor[edge_class])
+    
+    return spread_rate, to_unburned
+
+def fire_line_intensity(fire_engine: FireEngine, tables: StencilTables, layer: LayerState,
+                        indices: np.ndarray, wind_factor: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    地表燃烧元胞的火线强度 I = c_I · R_avg · W（对未燃烧邻居取平均蔓延速度）
+    与 FireEngine.calculate_fire_line_intensity 相同，计算蔓延速度时总是考虑风效应
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    spread_rate, to_unburned = stencil_spread_rates(fire_engine, tables, layer, indices, True, wind_factor)
+    
+    neighbor_count = to_unburned.sum(axis=0)
+    total_spread_rate = np.where(to_unburned, spread_rate, 0.0).sum(axis=0)
+    avg_spread_rate = total_spread_rate / np.maximum(neighbor_count, 1)
+    
+    intensity = (layer.heat_content * avg_spread_rate * 
+                 layer.fuel_load.reshape(-1)[indices] / 1000)  # 转换为kW/m
+    on_fire = layer.state.reshape(-1)[indices] == CellState.SURFACE_FIRE.value
+    return np.where(on_fire & (neighbor_count > 0), intensity, 0.0)
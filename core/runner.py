@@ -0,0 +1,192 @@
+"""
+情景矩阵运行器 - 基础配置 × 覆盖项列表，按进程池并行运行并流式返回结果
+Scenario Matrix Runner - Base Config × Override List, Run on a Process Pool with Streamed Results
+"""
+
+import contextlib
+import copy
+import io
+import os
+import time
+import numpy as np
+import yaml
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+from .cellular_automaton import CellularAutomaton
+
+# 描述单次运行而不并入配置的覆盖项
+RUN_FIELDS = ('name', 'ignition_point', 'ignition_radius', 'end_time')
+
+def load_config(path: str) -> dict:
+    """读取 YAML 配置文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+def merge_config(base: dict, overrides: dict) -> dict:
+    """
+    递归合并配置：同名的字典逐键合并，其余值直接替换（不修改 base）
+
+    Args:
+        base: 基础配置
+        overrides: 覆盖项
+
+    Returns:
+        合并后的新配置
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+def run_scenario(config: dict, run: Dict, collect: Optional[Callable] = None,
+                 quiet: bool = True) -> Dict:
+    """
+    运行单个情景（在工作进程中执行，参数与返回值均须可 pickle）
+
+    地形参数取自 config['terrain']，按理想地形初始化。
+
+    Args:
+        config: 已合并覆盖项的完整配置
+        run: 运行描述，可含 ignition_point、ignition_radius、end_time
+        collect: 可选的结果提取函数，模拟结束后在工作进程中以 collect(ca) 调用，
+                 须为模块级函数（或其 functools.partial）
+        quiet: 是否屏蔽模拟过程中的进度输出
+
+    Returns:
+        结果字典：final_time、stats、stats_history、time_steps、地表到达时间栅格
+        ignition_time / burnout_time、collect 的返回值 output、耗时 elapsed（秒）和进程号 pid
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        ca = CellularAutomaton(config)
+        ca.initialize_terrain(terrain_type="ideal", **config.get('terrain', {}))
+        if run.get('ignition_point') is not None:
+            ca.set_ignition_point(run['ignition_point'], run.get('ignition_radius', 10.0))
+        initial_burning_cells = len(ca.burning_surface_cells)
+
+        ca.run_simulation(run.get('end_time'))
+        output = collect(ca) if collect is not None else None
+
+    return scenario_result(ca, initial_burning_cells, output, start)
+
+def scenario_result(ca, initial_burning_cells: int, output, start: float) -> Dict:
+    """
+    单次运行的可 pickle 结果字典（run_scenario 与 fork.run_fork 共用）
+
+    Args:
+        ca: 已运行结束的元胞自动机
+        initial_burning_cells: 起火时的燃烧元胞数
+        output: collect 的返回值
+        start: 开始时刻（time.perf_counter）
+
+    Returns:
+        结果字典：simulation_result 中的 final_time、stats、stats_history、time_steps，
+        另含 initial_burning_cells、ignition_time / burnout_time、output、elapsed（秒）和 pid
+    """
+    result = ca.simulation_result()
+    return {
+        'final_time': result['final_time'],
+        'stats': result['stats'],
+        'stats_history': result['stats_history'],
+        'time_steps': result['time_steps'],
+        'initial_burning_cells': initial_burning_cells,
+        'ignition_time': np.array(ca.surface.ignition_time),
+        'burnout_time': np.array(ca.surface.burnout_time),
+        'output': output,
+        'elapsed': time.perf_counter() - start,
+        'pid': os.getpid()
+    }
+
+class ScenarioMatrixRunner:
+    """
+    情景矩阵运行器
+
+    每个覆盖项描述一次独立运行：name、ignition_point、ignition_radius、end_time 描述运行本身，
+    其余键递归并入基础配置（如 wind_vector、terrain、environment）。各次运行互不依赖，
+    分发到进程池并行执行；结果默认按覆盖项顺序流式返回，某次运行一完成且之前的运行都已返回即交出。
+
+    飞火使用随机数，需要可复现结果时在配置或覆盖项中设置 random_seed。
+    """
+
+    def __init__(self, base_config: dict, overrides: List[Dict],
+                 max_workers: Optional[int] = None,
+                 collect: Optional[Callable] = None,
+                 quiet: bool = True):
+        """
+        Args:
+            base_config: 基础配置（通常由 load_config 读取）
+            overrides: 覆盖项列表，每项对应一次运行
+            max_workers: 工作进程数，None表示使用CPU核数，1表示在当前进程内顺序运行
+            collect: 可选的结果提取函数，见 run_scenario
+            quiet: 是否屏蔽各次运行的进度输出
+        """
+        self.base_config = base_config
+        self.max_workers = max_workers
+        self.collect = collect
+        self.quiet = quiet
+
+        self.runs = []
+        for index, override in enumerate(overrides):
+            config_overrides = {key: value for key, value in override.items() if key not in RUN_FIELDS}
+            self.runs.append({
+                'index': index,
+                'name': str(override.get('name', index)),
+                'overrides': dict(override),
+                'config': merge_config(base_config, config_overrides),
+                'run': {key: override[key] for key in RUN_FIELDS if key in override}
+            })
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    def results(self, ordered: bool = True) -> Iterator[Dict]:
+        """
+        运行全部情景并流式返回结果
+
+        Args:
+            ordered: True 时按覆盖项顺序返回（结果顺序确定），False 时按完成先后返回
+
+        Yields:
+            run_scenario 的结果字典，附加 index、name、overrides
+        """
+        if self.max_workers == 1:
+            for spec in self.runs:
+                yield self._finish(spec, run_scenario(spec['config'], spec['run'], self.collect, self.quiet))
+            return
+
+        pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {pool.submit(run_scenario, spec['config'], spec['run'], self.collect, self.quiet): spec
+                       for spec in self.runs}
+            pending = {}
+            next_index = 0
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    result = self._finish(spec, future.result())
+                except Exception as exc:
+                    raise RuntimeError(f"scenario {spec['name']!r} failed") from exc
+
+                if not ordered:
+                    yield result
+                    continue
+                # 先完成的结果暂存，直到之前的运行都已返回
+                pending[spec['index']] = result
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            # 调用方提前停止迭代或出错时取消尚未开始的运行
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def run(self) -> List[Dict]:
+        """运行全部情景，按覆盖项顺序返回结果列表"""
+        return list(self.results(ordered=True))
+
+    @staticmethod
+    def _finish(spec: Dict, result: Dict) -> Dict:
+        result.update(index=spec['index'], name=spec['name'], overrides=spec['overrides'])
+        return result
@@ -0,0 +1,111 @@
+"""
+空间索引 - 飞火落点的最近未燃烧元胞查询
+Spatial Index - Nearest Unburned Cell Lookup for Spotting Targets
+"""
+
+import math
+import numpy as np
+from typing import Optional, Tuple
+from .grid import TerrainGrid
+
+class GridSpatialIndex:
+    """规则网格的空间索引：由坐标直接换算行列，只检查半径内的元胞"""
+
+    def __init__(self, terrain: TerrainGrid):
+        self.terrain = terrain
+        self.x0 = float(terrain.x[0, 0])
+        self.y0 = float(terrain.y[0, 0])
+        self.cell_size = terrain.cell_size
+
+    def nearest(self, position: Tuple[float, float], radius: float,
+                state: np.ndarray, accept_state: int) -> Optional[int]:
+        """
+        半径内离指定位置最近的、状态为 accept_state 的元胞
+
+        Args:
+            position: 查询点 (x, y)
+            radius: 搜索半径 (米)
+            state: 元胞状态数组 (height, width)
+            accept_state: 可选元胞的状态值
+
+        Returns:
+            扁平索引，半径内没有可选元胞时为 None（距离相同时取索引最小者）
+        """
+        px, py = position
+        terrain = self.terrain
+        r0 = max(0, math.floor((py - radius - self.y0) / self.cell_size))
+        r1 = min(terrain.height, math.ceil((py + radius - self.y0) / self.cell_size) + 1)
+        c0 = max(0, math.floor((px - radius - self.x0) / self.cell_size))
+        c1 = min(terrain.width, math.ceil((px + radius - self.x0) / self.cell_size) + 1)
+        if r0 >= r1 or c0 >= c1:
+            return None
+
+        window = (slice(r0, r1), slice(c0, c1))
+        distance = np.sqrt((terrain.x[window] - px)**2 + (terrain.y[window] - py)**2)
+        distance = np.where(state[window] == accept_state, distance, np.inf)
+
+        k = int(np.argmin(distance))
+        if not distance.flat[k] <= radius:
+            return None
+        i, j = divmod(k, c1 - c0)
+        return (r0 + i) * terrain.width + (c0 + j)
+
+class BucketSpatialIndex:
+    """不规则坐标的空间索引：按边长 bucket_size 的桶分组，查询只检查相邻桶"""
+
+    def __init__(self, terrain: TerrainGrid, bucket_size: float):
+        self.terrain = terrain
+        self.bucket_size = bucket_size
+        x = terrain.x.reshape(-1)
+        y = terrain.y.reshape(-1)
+        self.x0 = float(x.min())
+        self.y0 = float(y.min())
+
+        bx = ((x - self.x0) // bucket_size).astype(np.int64)
+        by = ((y - self.y0) // bucket_size).astype(np.int64)
+        self.num_bx = int(bx.max()) + 1
+        self.num_by = int(by.max()) + 1
+
+        # 压缩存储：按桶编号排序的元胞索引 + 各桶起始位置
+        bucket = by * self.num_bx + bx
+        self.order = np.argsort(bucket, kind='stable')
+        self.starts = np.searchsorted(bucket[self.order], np.arange(self.num_bx * self.num_by + 1))
+
+    def nearest(self, position: Tuple[float, float], radius: float,
+                state: np.ndarray, accept_state: int) -> Optional[int]:
+        """半径内离指定位置最近的可选元胞（接口同 GridSpatialIndex.nearest）"""
+        px, py = position
+        reach = int(math.ceil(radius / self.bucket_size))
+        bx = int((px - self.x0) // self.bucket_size)
+        by = int((py - self.y0) // self.bucket_size)
+
+        candidates = []
+        for j in range(max(0, by - reach), min(self.num_by, by + reach + 1)):
+            b0 = j * self.num_bx + max(0, bx - reach)
+            b1 = j * self.num_bx + min(self.num_bx, bx + reach + 1)
+            if b0 < b1:
+                candidates.append(self.order[self.starts[b0]:self.starts[b1]])
+        if not candidates:
+            return None
+
+        candidates = np.sort(np.concatenate(candidates))
+        candidates = candidates[state.reshape(-1)[candidates] == accept_state]
+        if len(candidates) == 0:
+            return None
+
+        distance = np.sqrt((self.terrain.x.reshape(-1)[candidates] - px)**2 +
+                           (self.terrain.y.reshape(-1)[candidates] - py)**2)
+        k = int(np.argmin(distance))
+        return int(candidates[k]) if distance[k] <= radius else None
+
+def build_spatial_index(terrain: TerrainGrid, radius: float):
+    """
+    为地形选择空间索引：坐标为规则网格时使用行列换算，否则使用分桶索引
+    """
+    height, width = terrain.shape
+    x0, y0 = terrain.x[0, 0], terrain.y[0, 0]
+    regular = (np.array_equal(terrain.x, np.broadcast_to(x0 + np.arange(width) * terrain.cell_size, terrain.shape)) and
+               np.array_equal(terrain.y, np.broadcast_to((y0 + np.arange(height) * terrain.cell_size)[:, None], terrain.shape)))
+    if regular:
+        return GridSpatialIndex(terrain)
+    return BucketSpatialIndex(terrain, radius)
@@ -3,24 +3,159 @@
 Terrain Generation and Initialization Module
 """
 
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 import numpy as np
 import math
-from typing import Tuple, Optional, List
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, List
 from .cell import Cell, StaticAttributes, DynamicAttributes, LayerType, CellState
+from .grid import TerrainGrid, LayerState, StencilTables, NEIGHBOR_OFFSETS, stencil_slices
+
+# 地形缓存格式版本：地形或几何表的生成规则改变时递增，使旧缓存失效
+TERRAIN_CACHE_VERSION = 1
+
+# 磁盘缓存中逐元胞的大数组（加载时内存映射），其余为各类别/分区的小查找表
+_TERRAIN_ARRAYS = ('x', 'y', 'z', 'zone')
+_STENCIL_ARRAYS = ('edge_class', 'direction', 'spread_x', 'spread_y', 'spread_z',
+                   'distance', 'local_slope', 'slope_factor', 'zone', 'zone_slope', 'zone_aspect')
+_MAPPED_ARRAYS = ('terrain.z', 'terrain.zone', 'stencil.edge_class')
 
 class TerrainGenerator:
     """地形生成器"""
     
+    # 进程内地形缓存：{参数哈希: (地形, 几何表)}，按最近使用顺序排列，所有生成器共用
+    _terrain_cache: 'OrderedDict[str, Tuple[TerrainGrid, StencilTables]]' = OrderedDict()
+    
     def __init__(self, cell_size: float = 10.0, config: dict = None):
         """
         初始化地形生成器
         
         Args:
             cell_size: 元胞大小 (米)
-            config: 配置字典
+            config: 配置字典（terrain_cache_size 为进程内缓存的地形数，0 表示不缓存；
+                    terrain_cache_dir 为磁盘缓存目录，None 表示不写磁盘）
         """
         self.cell_size = cell_size
         self.config = config or {}
+        self.cache_size = self.config.get('terrain_cache_size', 4)
+        self.cache_dir = self.config.get('terrain_cache_dir')
+    
+    def ideal_terrain(self, fire_engine, width: int, height: int,
+                      slope_angle_deg: float = 30.0,
+                      intersection_distance: float = 1000.0) -> Tuple[TerrainGrid, StencilTables]:
+        """
+        理想地形的静态数组与几何表（带缓存）
+        
+        依次查找进程内 LRU 缓存、磁盘缓存（.npy，逐元胞数组以只读内存映射加载），
+        都未命中时生成并写入两级缓存。缓存的地形与几何表只读，可由多个模拟共用。
+        
+        Args:
+            fire_engine: 物理引擎（几何表的坡度因子取决于其坡度参数）
+            width, height: 网格尺寸
+            slope_angle_deg: 山坡与地面夹角（度）
+            intersection_distance: 到交线的距离（米）
+            
+        Returns:
+            terrain, stencil: 静态地形与每方向几何表
+        """
+        key = self.terrain_key(fire_engine, width, height, slope_angle_deg, intersection_distance)
+        cache = TerrainGenerator._terrain_cache
+        if self.cache_size > 0 and key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        
+        path = os.path.join(self.cache_dir, key) if self.cache_dir else None
+        if path is not None and os.path.isdir(path):
+            terrain, stencil = self.load_terrain(path)
+        else:
+            terrain = self.create_ideal_grid(width, height, slope_angle_deg, intersection_distance)
+            stencil = self.build_stencil_tables(terrain, fire_engine)
+            if path is not None:
+                self.save_terrain(path, terrain, stencil)
+        
+        if self.cache_size > 0:
+            # 共用的数组设为只读，防止某次运行改写其他运行的地形
+            for array in list(vars(terrain).values()) + list(vars(stencil).values()):
+                if isinstance(array, np.ndarray):
+                    array.setflags(write=False)
+            cache[key] = (terrain, stencil)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return terrain, stencil
+    
+    def terrain_key(self, fire_engine, width: int, height: int,
+                    slope_angle_deg: float, intersection_distance: float) -> str:
+        """
+        地形缓存键：决定静态数组与几何表的全部参数的哈希
+        
+        燃料载量、含水量只决定动态状态的初值，不影响静态数组，因此不计入键，
+        不同燃料、含水量的情景共用同一份地形。
+        """
+        params = {
+            'version': TERRAIN_CACHE_VERSION,
+            'width': int(width), 'height': int(height),
+            'cell_size': float(self.cell_size),
+            'slope_angle_deg': float(slope_angle_deg),
+            'intersection_distance': float(intersection_distance),
+            'slope_factor_a': float(fire_engine.slope_factor_a),
+            'max_slope_deg': float(fire_engine.max_slope_deg)
+        }
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    
+    @classmethod
+    def clear_terrain_cache(cls):
+        """清空进程内地形缓存（磁盘缓存直接删除目录即可）"""
+        cls._terrain_cache.clear()
+    
+    @staticmethod
+    def save_terrain(path: str, terrain: TerrainGrid, stencil: StencilTables):
+        """
+        把地形与几何表写成目录下的 .npy 文件
+        
+        先写入同级临时目录再改名，并发写入同一键时只保留先完成的一份，读取方不会看到写了一半的目录。
+        规则网格的 x、y 只存被广播的一行、一列。
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+        try:
+            arrays = {f'terrain.{name}': TerrainGenerator._reduce(getattr(terrain, name))
+                      for name in _TERRAIN_ARRAYS}
+            arrays.update({f'terrain.{name}': getattr(terrain, name) for name in ('zone_slope', 'zone_aspect')})
+            arrays.update({f'stencil.{name}': getattr(stencil, name) for name in _STENCIL_ARRAYS})
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array))
+            with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'shape': list(terrain.shape), 'cell_size': terrain.cell_size}, f)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging)
+    
+    @staticmethod
+    def load_terrain(path: str) -> Tuple[TerrainGrid, StencilTables]:
+        """读取 save_terrain 写出的目录：逐元胞数组以只读内存映射加载，小查找表直接读入"""
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        shape = tuple(meta['shape'])
+        
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f'{name}.npy'),
+                           mmap_mode='r' if name in _MAPPED_ARRAYS else None)
+        
+        x, y, z, zone = (np.broadcast_to(load(f'terrain.{name}'), shape) for name in _TERRAIN_ARRAYS)
+        terrain = TerrainGrid.from_zones(x, y, z, zone, load('terrain.zone_slope'),
+                                         load('terrain.zone_aspect'), meta['cell_size'])
+        stencil = StencilTables(*(load(f'stencil.{name}') for name in _STENCIL_ARRAYS))
+        return terrain, stencil
     
     def create_ideal_terrain(self, 
                            width: int, height: int,
@@ -42,30 +177,39 @@ class TerrainGenerator:
         cell_id = 0
         
         slope_rad = math.radians(slope_angle_deg)
+        fuel_load = self.config.get('initial_fuel_load', 2.0)
+        moisture_content = self.config.get('initial_moisture_content', 0.12)
+        base_energy = self.config.get('base_ignition_energy', 100.0)
+        moisture_factor = self.config.get('ignition_moisture_factor', 2.0)
+        
+        # 坐标、高程与坡度只取决于行或列，按行、列各算一次，同一行（列）的元胞共用同一组数值对象
+        x_values = [j * self.cell_size for j in range(width)]
         
         for i in range(height):
+            # 计算实际坐标
+            y = i * self.cell_size
+            
+            # 判断是在地面还是山坡
+            # 关键物理分区：y <= intersection_distance为平地，y > intersection_distance为山坡
+            distance_to_intersection = y
+            
+            if distance_to_intersection <= intersection_distance:
+                # 平地区域 (坡度为0)
+                # 点A(4000,3000)位于此区域：y=3000 <= intersection_distance=4000，距分界线1000m
+                z = 0.0
+                local_slope = 0.0
+                local_aspect = 0.0
+            else:
+                # 山坡区域 (30°坡度)
+                # 点B(4000,4500)位于此区域：y=4500 > intersection_distance=4000，距分界线500m
+                slope_distance = distance_to_intersection - intersection_distance
+                z = slope_distance * math.tan(slope_rad)
+                local_slope = slope_rad
+                local_aspect = math.pi / 2  # 北向坡
+            canopy_z = z + 5.0  # 树冠高度5米
+            
             for j in range(width):
-                # 计算实际坐标
-                x = j * self.cell_size
-                y = i * self.cell_size
-                
-                # 判断是在地面还是山坡
-                # 关键物理分区：y <= intersection_distance为平地，y > intersection_distance为山坡
-                distance_to_intersection = y
-                
-                if distance_to_intersection <= intersection_distance:
-                    # 平地区域 (坡度为0)
-                    # 点A(4000,3000)位于此区域：y=3000 <= intersection_distance=4000，距分界线1000m
-                    z = 0.0
-                    local_slope = 0.0
-                    local_aspect = 0.0
-                else:
-                    # 山坡区域 (30°坡度)
-                    # 点B(4000,4500)位于此区域：y=4500 > intersection_distance=4000，距分界线500m
-                    slope_distance = distance_to_intersection - intersection_distance
-                    z = slope_distance * math.tan(slope_rad)
-                    local_slope = slope_rad
-                    local_aspect = math.pi / 2  # 北向坡
+                x = x_values[j]
                 
                 # 创建地表层元胞
                 surface_static = StaticAttributes(
@@ -78,23 +222,20 @@ class TerrainGenerator:
                 )
                 
                 surface_dynamic = DynamicAttributes(
-                    fuel_load=self.config.get('initial_fuel_load', 2.0),
-                    moisture_content=self.config.get('initial_moisture_content', 0.12)
+                    fuel_load=fuel_load,
+                    moisture_content=moisture_content
                 )
                 
                 surface_cell = Cell(surface_static, surface_dynamic)
                 
                 # 设置点燃参数
-                surface_cell.set_ignition_parameters(
-                    self.config.get('base_ignition_energy', 100.0),
-                    self.config.get('ignition_moisture_factor', 2.0)
-                )
+                surface_cell.set_ignition_parameters(base_energy, moisture_factor)
                 surface_cells.append(surface_cell)
                 
                 # 创建对应的树冠层元胞
                 canopy_static = StaticAttributes(
                     id=cell_id + width * height,
-                    position=(x, y, z + 5.0),  # 树冠高度5米
+                    position=(x, y, canopy_z),
                     slope=local_slope,
                     aspect=local_aspect,
                     fuel_type="pine",
@@ -109,10 +250,7 @@ class TerrainGenerator:
                 canopy_cell = Cell(canopy_static, canopy_dynamic)
                 
                 # 设置点燃参数
-                canopy_cell.set_ignition_parameters(
-                    self.config.get('base_ignition_energy', 100.0),
-                    self.config.get('ignition_moisture_factor', 2.0)
-                )
+                canopy_cell.set_ignition_parameters(base_energy, moisture_factor)
                 canopy_cells.append(canopy_cell)
                 
                 cell_id += 1
@@ -123,6 +261,218 @@ class TerrainGenerator:
         
         return surface_cells, canopy_cells
     
+    def create_ideal_grid(self,
+                          width: int, height: int,
+                          slope_angle_deg: float = 30.0,
+                          intersection_distance: float = 1000.0,
+                          row_offset: int = 0, col_offset: int = 0) -> TerrainGrid:
+        """
+        创建理想几何地形的静态数组（数组后端使用）
+        分区规则与 create_ideal_terrain 相同：y <= intersection_distance 为平地，否则为北向山坡
+        
+        Args:
+            width, height: 网格尺寸
+            slope_angle_deg: 山坡与地面夹角（度）
+            intersection_distance: 到交线的距离（米）
+            row_offset, col_offset: 首行、首列的网格编号（扩展计算域时为负），坐标为 编号 × cell_size
+            
+        Returns:
+            terrain: 静态地形数组
+        """
+        slope_rad = math.radians(slope_angle_deg)
+        
+        # 坐标由行、列编号决定：x、y 是一行/一列坐标的广播视图，不占逐元胞内存
+        x = np.broadcast_to((np.arange(width) + col_offset) * self.cell_size, (height, width))
+        y = np.broadcast_to(((np.arange(height) + row_offset) * self.cell_size)[:, None], (height, width))
+        on_slope = y > intersection_distance
+        
+        z = np.where(on_slope, (y - intersection_distance) * math.tan(slope_rad), 0.0)
+        slope = np.where(on_slope, slope_rad, 0.0)
+        aspect = np.where(on_slope, math.pi / 2, 0.0)  # 北向坡
+        
+        # 分区 0 为平地，分区 1 为山坡
+        zone = on_slope.astype(np.uint8)
+        
+        return TerrainGrid(x, y, z, slope, aspect, self.cell_size, zone)
+    
+    def build_stencil_tables(self, terrain: TerrainGrid, fire_engine) -> StencilTables:
+        """
+        为地形生成每方向的静态几何表（每个地形只需一次）
+        
+        相同 (方向, 蔓延向量, 风效应地形分区) 的边归为一类，各类别的三维距离、局部坡度、
+        坡度因子 Φ(φ) 用物理引擎的标量公式只计算一次。
+        
+        Args:
+            terrain: 静态地形
+            fire_engine: 物理引擎（提供坡度效应与分界线判定）
+            
+        Returns:
+            tables: 每方向几何表
+        """
+        full_window = (0, terrain.height, 0, terrain.width)
+        edge_ids = []
+        class_keys = [(0, 0.0, 0.0, 0.0, 0)]   # 类别 0：越界无边
+        
+        for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+            src, tgt, _ = stencil_slices(di, dj, full_window, terrain.shape)
+            
+            # 跨越分界线时风效应使用目标元胞的地形分区，否则使用源元胞的
+            cross = fire_engine._crosses_terrain_boundary(terrain.y[src], terrain.y[tgt])
+            components = [terrain.x[tgt] - terrain.x[src],
+                          terrain.y[tgt] - terrain.y[src],
+                          terrain.z[tgt] - terrain.z[src],
+                          np.where(cross, terrain.zone[tgt], terrain.zone[src])]
+            
+            # 沿行或列不变的分量只保留一列或一行（理想地形的各分量都只随行变化），
+            # 去重与联合编号在缩减后的数组上进行，结果再广播回整个网格
+            components = [self._reduce(component) for component in components]
+            
+            # 逐分量压缩为联合编号，每类取一个代表边读取分量
+            code = np.zeros(np.broadcast_shapes(*(c.shape for c in components)), dtype=np.int64)
+            for component in components:
+                uniques, inverse = self._unique_inverse(component)
+                code = code * len(uniques) + inverse
+            codes, inverse = self._unique_inverse(code)
+            representative = np.zeros(len(codes), dtype=np.int64)
+            representative[inverse.ravel()] = np.arange(inverse.size)
+            
+            dx, dy, dz, zone = (np.broadcast_to(component, code.shape).ravel()[representative]
+                                for component in components)
+            class_keys.extend(zip([d] * len(codes), dx.tolist(), dy.tolist(), dz.tolist(), zone.tolist()))
+            edge_ids.append((src, inverse + len(class_keys) - len(codes)))
+        
+        num_classes = len(class_keys)
+        dtype = np.uint8 if num_classes <= 256 else (np.uint16 if num_classes <= 65536 else np.int32)
+        edge_class = np.zeros((len(NEIGHBOR_OFFSETS),) + terrain.shape, dtype=dtype)
+        for d, (src, ids) in enumerate(edge_ids):
+            edge_class[d][src] = ids
+        
+        # 各类别几何量（与 FireEngine.spread_rate_between 的标量公式一致）
+        direction, spread_x, spread_y, spread_z, zone = (np.array(v) for v in zip(*class_keys))
+        distance = np.zeros(num_classes)
+        local_slope = np.zeros(num_classes)
+        slope_factor = np.ones(num_classes)
+        for k in range(1, num_classes):
+            dx, dy, dz = spread_x[k], spread_y[k], spread_z[k]
+            distance[k] = math.sqrt(dx**2 + dy**2 + dz**2)
+            horizontal_dist = math.sqrt(dx**2 + dy**2)
+            local_slope[k] = 0.0 if horizontal_dist == 0 else math.atan(dz / horizontal_dist)
+            slope_factor[k] = fire_engine.slope_effect(local_slope[k])
+        
+        return StencilTables(edge_class, direction, spread_x, spread_y, spread_z,
+                             distance, local_slope, slope_factor, zone.astype(np.int64),
+                             terrain.zone_slope, terrain.zone_aspect)
+    
+    @staticmethod
+    def _reduce(values: np.ndarray) -> np.ndarray:
+        """沿列（或行）取值不变的二维数组缩减为单列 (height, 1)（或单行 (1, width)），可广播回原形状"""
+        column = values[:, :1]
+        if np.array_equal(values, np.broadcast_to(column, values.shape)):
+            return column
+        row = values[:1, :]
+        if np.array_equal(values, np.broadcast_to(row, values.shape)):
+            return row
+        return values
+    
+    @staticmethod
+    def _unique_inverse(values: np.ndarray):
+        """排序去重并返回逆索引（整块取值相同时跳过排序；单行或单列网格上某些方向没有边，数组为空）"""
+        if values.size == 0:
+            return values.reshape(-1), np.zeros(values.shape, dtype=np.int64)
+        first = values.flat[0]
+        if np.all(values == first):
+            return np.array([first]), np.zeros(values.shape, dtype=np.int64)
+        uniques, inverse = np.unique(values, return_inverse=True)
+        return uniques, inverse.reshape(values.shape)
+    
+    def create_layer_states(self, terrain: TerrainGrid) -> Tuple[LayerState, LayerState]:
+        """
+        创建与地形匹配的地表层、树冠层动态状态数组
+        
+        Returns:
+            surface, canopy: 地表层和树冠层状态
+        """
+        base_energy = self.config.get('base_ignition_energy', 100.0)
+        moisture_factor = self.config.get('ignition_moisture_factor', 2.0)
+        # 稀疏分块：动态状态只为火场触及的块分配内存
+        tile_size = self.config.get('tile_size', 64) if self.config.get('sparse_tiles', False) else None
+        # 紧凑模式：浮点动态状态用 float32（状态本来就是 uint8）
+        float_dtype = np.float32 if self.config.get('compact_dtypes', False) else np.float64
+        
+        surface = LayerState(
+            terrain.shape, LayerType.SURFACE,
+            fuel_load=self.config.get('initial_fuel_load', 2.0),
+            moisture_content=self.config.get('initial_moisture_content', 0.12),
+            base_ignition_energy=base_energy,
+            ignition_moisture_factor=moisture_factor,
+            tile_size=tile_size,
+            float_dtype=float_dtype
+        )
+        canopy = LayerState(
+            terrain.shape, LayerType.CANOPY,
+            fuel_load=0.5,              # 树冠燃料较少
+            moisture_content=0.8,       # 活燃料含水量较高
+            base_ignition_energy=base_energy,
+            ignition_moisture_factor=moisture_factor,
+            height_offset=5.0,          # 树冠高度5米
+            id_offset=terrain.size,
+            tile_size=tile_size,
+            float_dtype=float_dtype
+        )
+        return surface, canopy
+    
+    def ignition_indices(self, terrain: TerrainGrid, position,
+                         radius: float = 10.0) -> np.ndarray:
+        """
+        起火范围内的地表元胞扁平索引（与 set_ignition_point 的距离规则一致）
+        
+        Args:
+            terrain: 静态地形
+            position: 起火点坐标 (x, y) 或 (x, y, z)
+            radius: 起火范围半径
+            
+        Returns:
+            indices: 按行优先排序的扁平索引
+        """
+        if len(position) == 2:
+            distance_sq = (terrain.x - position[0])**2 + (terrain.y - position[1])**2
+        elif len(position) == 3:
+            distance_sq = ((terrain.x - position[0])**2 + 
+                           (terrain.y - position[1])**2 + 
+                           (terrain.z - position[2])**2)
+        else:
+            raise ValueError("position must be (x, y) or (x, y, z)")
+        
+        return np.flatnonzero(np.sqrt(distance_sq) <= radius)
+    
+    @staticmethod
+    def canopy_cell_id(surface_id, layer_size: int):
+        """
+        地表元胞id对应的树冠元胞id（树冠层id = 地表id + width*height）
+        
+        Args:
+            surface_id: 地表元胞id（标量或数组）
+            layer_size: 单层元胞数 width*height
+        """
+        return surface_id + layer_size
+    
+    @staticmethod
+    def surface_index(cell_id, layer_size: int):
+        """任一层元胞id对应的层内网格索引（地表层即id本身）"""
+        if not 0 <= cell_id < 2 * layer_size:
+            raise ValueError(f"cell id {cell_id} is outside the two layers of {layer_size} cells")
+        return cell_id % layer_size
+    
+    def corresponding_canopy_cell(self, surface_cell: Cell, canopy_cells: List[Cell]) -> Optional[Cell]:
+        """
+        对象接口下地表元胞对应的树冠元胞
+        create_ideal_terrain 按网格索引顺序生成两层，故直接按id下标取用（O(1)）
+        """
+        index = surface_cell.static.id
+        if 0 <= index < len(canopy_cells):
+            return canopy_cells[index]
+        return None
+    
     def set_ignition_point(self, cells: List[Cell], 
                           position, 
                           radius: float = 10.0) -> List[Cell]:
@@ -169,21 +519,19 @@ class TerrainGenerator:
     
     def _build_neighbor_relationships(self, cells: List[Cell], 
                                     width: int, height: int):
-        """建立规则网格的邻居关系"""
+        """
+        建立规则网格的邻居关系
+        
+        每个元胞记录8邻域（仅网格内部，顺序同 NEIGHBOR_OFFSETS）的下标偏移元组；
+        偏移只取决于元胞是否位于各条边上，同一类元胞共用一个元组。
+        """
+        shared = {}
         for i in range(height):
             for j in range(width):
-                center_idx = i * width + j
-                center_cell = cells[center_idx]
-                
-                # 8邻域
-                for di in [-1, 0, 1]:
-                    for dj in [-1, 0, 1]:
-                        if di == 0 and dj == 0:
-                            continue
-                        
-                        ni, nj = i + di, j + dj
-                        
-                        if 0 <= ni < height and 0 <= nj < width:
-                            neighbor_idx = ni * width + nj
-                            neighbor_cell = cells[neighbor_idx]
-                            center_cell.add_neighbor(neighbor_cell) 
\ No newline at end of file
+                key = (i == 0, i == height - 1, j == 0, j == width - 1)
+                offsets = shared.get(key)
+                if offsets is None:
+                    offsets = tuple(di * width + dj for di, dj in NEIGHBOR_OFFSETS
+                                    if 0 <= i + di < height and 0 <= j + dj < width)
+                    shared[key] = offsets
+                cells[i * width + j].set_neighbors(cells, offsets)
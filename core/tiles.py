@@ -0,0 +1,249 @@
+"""
+稀疏分块存储 - 动态状态按固定大小的块在首次写入非默认值时分配，未触及的块共用默认值
+Sparse Tile Storage - Dynamic State Allocated in Fixed-Size Tiles on First Non-Default Write, Untouched Tiles Share a Default
+"""
+
+import copy
+import math
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+from typing import Dict, Tuple
+
+class TileStore:
+    """
+    一层动态状态的分块存储
+
+    网格按 tile_size × tile_size 切块，各字段的块依次存放在块池中；槽位 0 是各字段的默认值块，
+    所有未分配的块都指向它（只读）。任一字段向未分配块写入非默认值时，为该块分配一个槽位
+    （各字段同时分配，初值为默认值）。
+
+    偏移表 offsets[i, j] 是元胞 (i, j) 在块池扁平数组中的位置，读写都只需一次查表；
+    它是唯一按网格大小分配的数组（每元胞8字节，用原生索引类型以免每次读取都做类型转换）。
+    """
+
+    def __init__(self, shape: Tuple[int, int], tile_size: int = 64):
+        """
+        Args:
+            shape: 网格尺寸 (height, width)
+            tile_size: 块边长（元胞数）
+        """
+        if tile_size < 1:
+            raise ValueError(f"tile_size must be positive, got {tile_size}")
+        height, width = shape
+        self.shape = (height, width)
+        self.tile_size = tile_size
+        self.table = np.zeros((math.ceil(height / tile_size), math.ceil(width / tile_size)), dtype=np.int64)
+
+        self.offsets = np.empty((height, width), dtype=np.intp)
+        self.pools: Dict[str, np.ndarray] = {}
+        self.defaults: Dict[str, object] = {}
+        self._capacity = 16
+        self.clear()
+
+    def clear(self):
+        """释放全部块：所有元胞恢复为各字段的默认值（块池容量保留，供再次分配）"""
+        height, width = self.shape
+        rows = np.arange(height, dtype=np.intp) % self.tile_size
+        cols = np.arange(width, dtype=np.intp) % self.tile_size
+        np.add(rows[:, None] * self.tile_size, cols[None, :], out=self.offsets)
+        self.table.fill(0)
+        self._used = 1          # 已使用的槽位数（含默认值块）
+
+    def share(self) -> 'TileStore':
+        """
+        写时复制的副本：与本存储共用偏移表、块表与块池（两者的数组都设为只读），
+        任一方首次写入前调用 detach() 复制出自己的一份
+        """
+        for array in (self.offsets, self.table, *self.pools.values()):
+            array.flags.writeable = False
+        twin = copy.copy(self)
+        twin.pools = dict(self.pools)
+        return twin
+
+    def detach(self):
+        """复制出本存储独有的可写数组（块池只复制已使用的槽位）"""
+        tile_cells = self._used * self.tile_size ** 2
+        self.offsets = self.offsets.copy()
+        self.table = self.table.copy()
+        self.pools = {name: pool[:tile_cells].copy() for name, pool in self.pools.items()}
+        self._capacity = self._used
+
+    def full(self, shape: Tuple[int, int], fill_value, dtype=None) -> 'TiledArray':
+        """新建一个默认值为 fill_value 的分块字段（参数与 np.full 相同，shape 须与网格一致）"""
+        if tuple(shape) != self.shape:
+            raise ValueError(f"shape {tuple(shape)} does not match tile store shape {self.shape}")
+        name = f'field_{len(self.pools)}'
+        pool = np.empty(self._capacity * self.tile_size ** 2, dtype=dtype)
+        pool[:self._used * self.tile_size ** 2] = fill_value
+        self.pools[name] = pool
+        self.defaults[name] = pool.dtype.type(fill_value)
+        return TiledArray(self, name)
+
+    @property
+    def allocated_tiles(self) -> int:
+        """已分配的块数"""
+        return self._used - 1
+
+    @property
+    def total_tiles(self) -> int:
+        """网格的总块数"""
+        return self.table.size
+
+    @property
+    def nbytes(self) -> int:
+        """偏移表与已分配块（含默认值块）占用的字节数"""
+        tile_cells = self._used * self.tile_size ** 2
+        return self.offsets.nbytes + sum(tile_cells * pool.itemsize for pool in self.pools.values())
+
+    def allocate(self, cells: np.ndarray):
+        """为给定扁平索引所在的、尚未分配的块分配槽位（重复的块只分配一次）"""
+        rows, cols = np.divmod(np.asarray(cells, dtype=np.int64), self.shape[1])
+        tiles = np.unique((rows // self.tile_size) * self.table.shape[1] + cols // self.tile_size)
+        tiles = tiles[self.table.reshape(-1)[tiles] == 0]
+        if len(tiles) == 0:
+            return
+
+        tile_cells = self.tile_size ** 2
+        used = self._used + len(tiles)
+        if used > self._capacity:
+            self._capacity = max(used, 2 * self._capacity)
+            for name, pool in self.pools.items():
+                grown = np.empty(self._capacity * tile_cells, dtype=pool.dtype)
+                grown[:self._used * tile_cells] = pool[:self._used * tile_cells]
+                self.pools[name] = grown
+        for name, pool in self.pools.items():
+            pool[self._used * tile_cells:used * tile_cells] = self.defaults[name]
+
+        slots = np.arange(self._used, used)
+        self.table.reshape(-1)[tiles] = slots
+        for tile, slot in zip(tiles.tolist(), slots.tolist()):
+            tile_row, tile_col = divmod(tile, self.table.shape[1])
+            self.offsets[tile_row * self.tile_size:(tile_row + 1) * self.tile_size,
+                         tile_col * self.tile_size:(tile_col + 1) * self.tile_size] += slot * tile_cells
+        self._used = used
+
+class _TiledBase(NDArrayOperatorsMixin):
+    """分块字段的公共部分：按偏移表读写块池；数组运算时先拼成稠密数组（代价与网格大小成正比，只用于分析）"""
+
+    def __init__(self, store: TileStore, name: str):
+        self.store = store
+        self.name = name
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.store.pools[self.name].dtype
+
+    @property
+    def default(self):
+        return self.store.defaults[self.name]
+
+    @property
+    def size(self) -> int:
+        return self.store.offsets.size
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _offsets(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        dense = self.store.pools[self.name].take(self._offsets())
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __getitem__(self, key):
+        return self.store.pools[self.name].take(self._offsets()[key])
+
+    def copy(self) -> np.ndarray:
+        """稠密副本"""
+        return np.asarray(self)
+
+    def astype(self, dtype) -> np.ndarray:
+        return np.asarray(self).astype(dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, out=None, **kwargs):
+        inputs = tuple(np.asarray(x) if isinstance(x, _TiledBase) else x for x in inputs)
+        if out is None:
+            return getattr(ufunc, method)(*inputs, **kwargs)
+        dense_out = tuple(np.asarray(x) if isinstance(x, _TiledBase) else x for x in out)
+        getattr(ufunc, method)(*inputs, out=dense_out, **kwargs)
+        for target, dense in zip(out, dense_out):
+            if isinstance(target, _TiledBase):
+                target[...] = dense
+        return out[0] if len(out) == 1 else out
+
+    def _scatter(self, cells, values):
+        """按扁平索引写入；写入默认值的未分配块不分配"""
+        cells = np.asarray(cells, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values), cells.shape)
+        offsets = self.store.offsets.reshape(-1)[cells]
+        missing = offsets < self.store.tile_size ** 2
+        if missing.any():
+            needed = missing & (values != self.default)
+            if needed.any():
+                self.store.allocate(cells[needed])
+                offsets = self.store.offsets.reshape(-1)[cells]
+                missing = offsets < self.store.tile_size ** 2
+            offsets, values = offsets[~missing], values[~missing]
+        self.store.pools[self.name][offsets] = values
+
+class TiledArray(_TiledBase):
+    """
+    分块字段的二维数组接口
+
+    任意 numpy 索引都可读取（得到稠密副本）；连续窗口切片与 reshape(-1) 上的扁平索引可高效写入，
+    其余写入与比较等数组运算先拼成整层稠密数组。
+    """
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.store.shape
+
+    def _offsets(self) -> np.ndarray:
+        return self.store.offsets
+
+    def reshape(self, *shape):
+        """reshape(-1) 返回扁平索引视图，其他形状返回稠密数组"""
+        if len(shape) == 1 and isinstance(shape[0], tuple):
+            shape = shape[0]
+        if shape in ((-1,), (self.size,)):
+            return FlatTiles(self.store, self.name)
+        return np.asarray(self).reshape(shape)
+
+    def __setitem__(self, key, value):
+        height, width = self.shape
+        if (isinstance(key, tuple) and len(key) == 2 and
+                all(isinstance(k, slice) and k.step in (None, 1) for k in key)):
+            r0, r1, _ = key[0].indices(height)
+            c0, c1, _ = key[1].indices(width)
+            cells = np.arange(r0, max(r0, r1))[:, None] * width + np.arange(c0, max(c0, c1))[None, :]
+        else:
+            cells = np.arange(height * width).reshape(self.shape)[key]
+        self._scatter(cells, value)
+
+class FlatTiles(_TiledBase):
+    """分块字段的一维扁平索引接口（TiledArray.reshape(-1)）"""
+
+    @property
+    def shape(self) -> Tuple[int]:
+        return (self.size,)
+
+    def _offsets(self) -> np.ndarray:
+        return self.store.offsets.reshape(-1)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, (int, np.integer)):
+            cells = key
+        else:
+            key = np.asarray(key)
+            if key.dtype == bool:
+                cells = np.flatnonzero(key)
+            elif np.issubdtype(key.dtype, np.integer) or key.size == 0:
+                cells = key
+            else:
+                cells = np.arange(self.size)[key]
+        self._scatter(cells, value)
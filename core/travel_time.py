@@ -0,0 +1,96 @@
+"""
+最短蔓延时间求解 - 8邻域图上的 Dijkstra 到达时间扫描
+Minimum Travel Time Solver - Dijkstra Arrival-Time Sweep over the 8-Neighbour Graph
+"""
+
+import heapq
+import numpy as np
+from .fire_engine import FireEngine
+from .grid import NEIGHBOR_OFFSETS, StencilTables
+
+def edge_travel_times(fire_engine: FireEngine, tables: StencilTables, moisture: np.ndarray,
+                      enable_wind: bool = True) -> np.ndarray:
+    """
+    每个元胞向8个方向邻居的蔓延耗时 t = D / R（分钟）
+
+    蔓延速度与 FireEngine.calculate_spread_rate 相同（按目标元胞含水量计算），
+    越界或蔓延速度为0的边耗时为 inf。
+
+    Args:
+        fire_engine: 物理引擎
+        tables: 每方向静态几何表
+        moisture: 含水量数组 (height, width)
+        enable_wind: 是否启用风效应
+
+    Returns:
+        travel_time: (8, height*width) 扁平索引上的边耗时
+    """
+    height, width = moisture.shape
+    size = moisture.size
+    wind_factor = tables.wind_factor(fire_engine, enable_wind)
+    moisture = moisture.reshape(-1)
+    cells = np.arange(size)
+
+    travel_time = np.full((len(NEIGHBOR_OFFSETS), size), np.inf)
+    for d, (di, dj) in enumerate(NEIGHBOR_OFFSETS):
+        edge_class = tables.edge_class[d].reshape(-1)
+        has_edge = edge_class > 0
+        target = cells[has_edge] + di * width + dj
+        edge_class = edge_class[has_edge]
+
+        spread_rate = fire_engine.spread_rate_array(wind_factor[edge_class], moisture[target],
+                                                    tables.slope_factor[edge_class])
+        with np.errstate(divide='ignore'):
+            travel_time[d, has_edge] = np.where(spread_rate > 0,
+                                                tables.distance[edge_class] / spread_rate, np.inf)
+    return travel_time
+
+def minimum_travel_time(fire_engine: FireEngine, tables: StencilTables, moisture: np.ndarray,
+                        sources: np.ndarray, enable_wind: bool = True,
+                        start_time: float = 0.0) -> np.ndarray:
+    """
+    从起火元胞出发的最早到达时间（单次 Dijkstra 扫描，O(N log N)）
+
+    只考虑蔓延速度决定的传播耗时，不模拟能量累积、预热干燥、燃料消耗和飞火，
+    适用于无飞火的确定性配置下的快速方案筛选。
+
+    Args:
+        fire_engine: 物理引擎
+        tables: 每方向静态几何表
+        moisture: 含水量数组 (height, width)
+        sources: 起火元胞扁平索引
+        enable_wind: 是否启用风效应
+        start_time: 起火时刻（分钟）
+
+    Returns:
+        arrival_time: (height, width) 到达时间（分钟），不可达为 inf
+    """
+    shape = moisture.shape
+    travel_time = edge_travel_times(fire_engine, tables, moisture, enable_wind)
+    offsets = [di * shape[1] + dj for di, dj in NEIGHBOR_OFFSETS]
+    edges = list(zip(offsets, (memoryview(row) for row in travel_time)))
+
+    arrival = np.full(moisture.size, np.inf)
+    best = memoryview(arrival)
+    heap = []
+    for index in np.unique(np.asarray(sources, dtype=np.int64)).tolist():
+        best[index] = start_time
+        heap.append((start_time, index))
+    heapq.heapify(heap)
+
+    inf = float('inf')
+    while heap:
+        time, index = heapq.heappop(heap)
+        if time > best[index]:
+            continue
+        for offset, cost in edges:
+            edge_time = cost[index]
+            if edge_time == inf:
+                continue
+            neighbor = index + offset
+            neighbor_time = time + edge_time
+            if neighbor_time < best[neighbor]:
+                best[neighbor] = neighbor_time
+                heapq.heappush(heap, (neighbor_time, neighbor))
+
+    return arrival.reshape(shape)
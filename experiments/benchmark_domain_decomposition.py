@@ -0,0 +1,88 @@
+"""
+区域分解强扩展性测试 - 固定网格规模，工作进程数从1增加到N，比较耗时与单进程结果
+Domain Decomposition Strong-Scaling Benchmark - Fixed Grid, 1 to N Worker Processes, Checked against a Single-Process Run
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import io
+import time
+import yaml
+import numpy as np
+from core.cellular_automaton import CellularAutomaton
+from core.grid import LayerState
+from experiment_setup import build
+
+def block_shape(workers: int) -> tuple:
+    """最接近正方形的分块 (rows, cols)，rows × cols = workers"""
+    cols = max(c for c in range(1, int(workers ** 0.5) + 1) if workers % c == 0)
+    return workers // cols, cols
+
+def same_result(a: CellularAutomaton, b: CellularAutomaton) -> bool:
+    """两次模拟的两层动态数组与统计量是否完全相同"""
+    return (a.stats == b.stats and
+            all(np.array_equal(getattr(a.surface, name), getattr(b.surface, name)) and
+                np.array_equal(getattr(a.canopy, name), getattr(b.canopy, name))
+                for name in LayerState.ARRAYS))
+
+def run_benchmark(size: int = 1000, end_time: float = 120.0, max_workers: int = None,
+                  ignition_radius: float = 500.0):
+    """
+    强扩展性测试
+
+    Args:
+        size: 网格边长（元胞数）
+        end_time: 模拟时长（分钟）
+        max_workers: 最大工作进程数，None表示使用CPU核数
+        ignition_radius: 起火半径（米），决定火线长度即每步的工作量
+    """
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'problem_2_wind.yaml')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['random_seed'] = 0
+    max_workers = max_workers or os.cpu_count() or 1
+
+    print("=" * 70)
+    print(f"区域分解强扩展性测试: {size} × {size} 网格, 模拟 {end_time} 分钟, "
+          f"CPU核数 {os.cpu_count()}")
+    print("=" * 70)
+
+    quiet = io.StringIO()
+    reference = build(config, size, ignition_radius)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        reference.run_simulation(end_time)
+    serial_time = time.perf_counter() - start
+    print(f"单进程 run_simulation: {serial_time:.2f} s, 燃烧面积 {reference.stats['burned_area']:.0f} m²")
+    print()
+    print(f"{'进程数':>6} {'分块':>8} {'耗时(s)':>10} {'加速比':>8} {'并行效率':>8} {'结果一致':>8}")
+
+    rows = []
+    for workers in range(1, max_workers + 1):
+        blocks = block_shape(workers)
+        ca = build(config, size, ignition_radius)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            ca.run_decomposed_simulation(end_time, blocks)
+        elapsed = time.perf_counter() - start
+        speedup = serial_time / elapsed
+        identical = same_result(reference, ca)
+        rows.append({'workers': workers, 'blocks': blocks, 'elapsed': elapsed,
+                     'speedup': speedup, 'identical': identical})
+        print(f"{workers:>6} {f'{blocks[0]}×{blocks[1]}':>8} {elapsed:>10.2f} {speedup:>8.2f} "
+              f"{speedup / workers:>8.2f} {str(identical):>8}")
+
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="区域分解强扩展性测试")
+    parser.add_argument('--size', type=int, default=1000, help="网格边长（元胞数）")
+    parser.add_argument('--end-time', type=float, default=120.0, help="模拟时长（分钟）")
+    parser.add_argument('--max-workers', type=int, default=None, help="最大工作进程数，默认CPU核数")
+    parser.add_argument('--ignition-radius', type=float, default=500.0, help="起火半径（米）")
+    args = parser.parse_args()
+    run_benchmark(args.size, args.end_time, args.max_workers, args.ignition_radius)
@@ -0,0 +1,100 @@
+"""
+紧凑数据类型精度对比 - 同一情景分别以 float64 与 float32（compact_dtypes）运行，比较内存占用与结果差异
+Compact Dtype Accuracy Comparison - Same Scenario in float64 and float32 (compact_dtypes), Memory and Result Differences
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import io
+import time
+import yaml
+import numpy as np
+from experiment_setup import build
+
+def relative_error(value: float, reference: float) -> float:
+    return abs(value - reference) / abs(reference) if reference else abs(value)
+
+def compare(config_name: str, size: int, end_time: float, overrides: dict = None) -> dict:
+    """
+    同一情景的 float64 / float32 对比
+
+    Args:
+        config_name: config/ 下的配置文件名
+        size: 网格边长（元胞数）
+        end_time: 模拟时长（分钟）
+        overrides: 覆盖的配置项
+
+    Returns:
+        两种模式的每元胞字节数与耗时、统计量相对误差、到达时间差异
+    """
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', config_name)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config.update(overrides or {}, random_seed=0)
+
+    runs = {}
+    for compact in (False, True):
+        ca = build(dict(config, compact_dtypes=compact), size, 30.0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ca.run_simulation(end_time)
+        runs[compact] = (ca, time.perf_counter() - start)
+
+    (reference, reference_time), (compact, compact_time) = runs[False], runs[True]
+    ignited = np.asarray(reference.surface.ignition_time) < np.inf
+    compact_ignited = np.asarray(compact.surface.ignition_time) < np.inf
+    both = ignited & compact_ignited
+    arrival_diff = np.abs(np.asarray(reference.surface.ignition_time, dtype=np.float64)[both] -
+                          np.asarray(compact.surface.ignition_time, dtype=np.float64)[both])
+
+    return {
+        'config': config_name,
+        'overrides': overrides or {},
+        'bytes_per_cell': (reference.memory_report()['bytes_per_cell'],
+                           compact.memory_report()['bytes_per_cell']),
+        'elapsed': (reference_time, compact_time),
+        'burned_cells': int(ignited.sum()),
+        'ignition_mismatch': int((ignited != compact_ignited).sum()),
+        'arrival_max_diff': float(arrival_diff.max()) if len(arrival_diff) else 0.0,
+        'arrival_mean_diff': float(arrival_diff.mean()) if len(arrival_diff) else 0.0,
+        'stats_error': {key: relative_error(compact.stats[key], reference.stats[key])
+                        for key in reference.stats}
+    }
+
+def run_comparison(size: int = 600, end_time: float = 120.0):
+    """对各问题配置分别比较并打印结果"""
+    print("=" * 70)
+    print(f"紧凑数据类型精度对比: {size} × {size} 网格, 模拟 {end_time} 分钟")
+    print("=" * 70)
+
+    cases = [
+        ('problem_1_aggressive.yaml', {}),
+        ('problem_2_wind.yaml', {'enable_wind_effects': True, 'wind_vector': [3.0, 2.0, 0.0]}),
+        ('problem_2_wind.yaml', {'enable_wind_effects': True, 'wind_vector': [3.0, 2.0, 0.0],
+                                 'adaptive_time_step': True}),
+    ]
+    results = []
+    for config_name, overrides in cases:
+        result = compare(config_name, size, end_time, overrides)
+        results.append(result)
+        print(f"\n{config_name} {overrides}")
+        print(f"  每元胞字节数: float64 {result['bytes_per_cell'][0]:.1f}, "
+              f"float32 {result['bytes_per_cell'][1]:.1f}")
+        print(f"  耗时: float64 {result['elapsed'][0]:.2f} s, float32 {result['elapsed'][1]:.2f} s")
+        print(f"  点燃元胞: {result['burned_cells']}, 点燃与否不一致: {result['ignition_mismatch']}")
+        print(f"  到达时间差: 最大 {result['arrival_max_diff']:.4f} 分钟, "
+              f"平均 {result['arrival_mean_diff']:.6f} 分钟")
+        for key, error in result['stats_error'].items():
+            print(f"  {key} 相对误差: {error:.2e}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="紧凑数据类型精度对比")
+    parser.add_argument('--size', type=int, default=600, help="网格边长（元胞数）")
+    parser.add_argument('--end-time', type=float, default=120.0, help="模拟时长（分钟）")
+    args = parser.parse_args()
+    run_comparison(args.size, args.end_time)
@@ -0,0 +1,18 @@
+"""
+实验脚本公用的模拟构建函数
+Shared Simulation Setup for Experiment Scripts
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cellular_automaton import CellularAutomaton
+
+def build(config: dict, size: int, ignition_radius: float) -> CellularAutomaton:
+    """按配置生成 size × size 理想地形，在网格中心起火"""
+    ca = CellularAutomaton(config)
+    ca.initialize_terrain("ideal", **dict(config.get('terrain', {}), width=size, height=size))
+    cell_size = config.get('cell_size', 10.0)
+    ca.set_ignition_point((size * cell_size / 2, size * cell_size / 2), ignition_radius)
+    return ca
@@ -46,25 +46,10 @@ def run_simulation_for_point(ca, point_config, point_name):
     """为指定起火点运行模拟"""
     print(f"\n=== {point_name} 起火点模拟 ===")
     
-    # 重置CA状态
-    ca.current_time = 0.0
-    ca.burning_surface_cells = []
-    ca.burning_canopy_cells = []
-    ca.fire_history = []
-    ca.stats_history = []
-    
-    # 重置所有元胞状态
-    for cell in ca.surface_cells + ca.canopy_cells:
-        cell.dynamic.state = CellState.UNBURNED
-        cell.dynamic.fuel_load = 2.0 if cell.static.layer_type.name == 'SURFACE' else 0.5
-        cell.dynamic.moisture_content = 0.12 if cell.static.layer_type.name == 'SURFACE' else 0.8
-        cell.dynamic.energy = 0.0
-        cell.dynamic.burn_time = 0.0
-    
-    # 设置起火点
+    # 重置CA状态（动态数组批量恢复初值，地形保留）并设置起火点
     position = (point_config['x'], point_config['y'])
     radius = point_config['radius']
-    ca.set_ignition_point(position, radius)
+    ca.reignite(position, radius)
     
     print(f"起火点位置: ({position[0]}, {position[1]}), 影响半径: {radius}m")
     print(f"初始点燃元胞数: {len(ca.burning_surface_cells)}")
@@ -10,7 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import yaml
 import json
 import math
-from core.cellular_automaton import CellularAutomaton
+from functools import partial
+from core.runner import ScenarioMatrixRunner
 
 def run_problem_1():
     """运行问题一完整模拟"""
@@ -42,56 +43,34 @@ def run_problem_1():
     print()
     
     # 起火点配置
-    point_A = config['ignition']['point_A']
-    point_B = config['ignition']['point_B']
+    point_A = config['ignition_points']['point_A']
+    point_B = config['ignition_points']['point_B']
     
-    results = {}
-    
-    # ===== 模拟点A起火 =====
-    print("=== 点A 起火点模拟 ===")
-    print(f"起火点位置: {point_A['position']}, 影响半径: {point_A['radius']}m")
-    
-    ca_A = CellularAutomaton(config)
-    ca_A.initialize_terrain(terrain_type="ideal", **terrain_params)
-    ca_A.set_ignition_point(point_A['position'], point_A['radius'])
-    
-    print(f"初始点燃元胞数: {len(ca_A.burning_surface_cells)}")
-    
-    # 运行72小时模拟
-    simulation_result_A = ca_A.run_simulation(4320)  # 72小时 = 4320分钟
-    
-    # 提取各时间点的火场边界
-    fire_boundaries_A = extract_fire_boundaries(ca_A, [24*60, 48*60, 72*60])
-    
-    print_summary("点A", simulation_result_A, fire_boundaries_A)
-    results['point_A'] = {
-        'simulation_result': simulation_result_A,
-        'fire_boundaries': fire_boundaries_A
-    }
-    
-    print()
-    
-    # ===== 模拟点B起火 =====  
-    print("=== 点B 起火点模拟 ===")
-    print(f"起火点位置: {point_B['position']}, 影响半径: {point_B['radius']}m")
+    # A、B两点的模拟互不依赖，分发到两个工作进程并行运行（72小时 = 4320分钟）
+    runner = ScenarioMatrixRunner(config, [
+        {'name': '点A', 'terrain': terrain_params, 'end_time': 4320,
+         'ignition_point': point_A['position'], 'ignition_radius': point_A['radius']},
+        {'name': '点B', 'terrain': terrain_params, 'end_time': 4320,
+         'ignition_point': point_B['position'], 'ignition_radius': point_B['radius']},
+    ], max_workers=2, collect=partial(extract_fire_boundaries, time_points=[24*60, 48*60, 72*60]))
     
-    ca_B = CellularAutomaton(config)
-    ca_B.initialize_terrain(terrain_type="ideal", **terrain_params)
-    ca_B.set_ignition_point(point_B['position'], point_B['radius'])
-    
-    print(f"初始点燃元胞数: {len(ca_B.burning_surface_cells)}")
-    
-    # 运行72小时模拟
-    simulation_result_B = ca_B.run_simulation(4320)
-    
-    # 提取各时间点的火场边界
-    fire_boundaries_B = extract_fire_boundaries(ca_B, [24*60, 48*60, 72*60])
-    
-    print_summary("点B", simulation_result_B, fire_boundaries_B)
-    results['point_B'] = {
-        'simulation_result': simulation_result_B,
-        'fire_boundaries': fire_boundaries_B
-    }
+    results = {}
+    for point, run in zip(['point_A', 'point_B'], runner.results()):
+        print(f"=== {run['name']} 起火点模拟 ===")
+        print(f"起火点位置: {run['overrides']['ignition_point']}, 影响半径: {run['overrides']['ignition_radius']}m")
+        print(f"初始点燃元胞数: {run['initial_burning_cells']}")
+        print(f"运行耗时: {run['elapsed']:.1f} s")
+        
+        # 各时间点的火场边界已在工作进程中提取
+        fire_boundaries = run['output']
+        
+        print_summary(run['name'], run, fire_boundaries)
+        results[point] = {
+            'simulation_result': run,
+            'fire_boundaries': fire_boundaries
+        }
+        
+        print()
     
     # 保存详细结果
     save_results(results)
@@ -111,11 +90,8 @@ def extract_fire_boundaries(ca, time_points):
     for time_minutes in time_points:
         time_hours = time_minutes // 60
         
-        # 获取该时间点的燃烧和燃尽元胞
-        burned_cells = []
-        for cell in ca.surface_cells:
-            if cell.dynamic.state.name in ['SURFACE_FIRE', 'BURNED_OUT']:
-                burned_cells.append(cell)
+        # 由到达时间栅格重建该时间点的燃烧和燃尽元胞
+        burned_cells = list(ca.burned_cells_at(time_minutes))
         
         if not burned_cells:
             boundaries[f"{time_hours}h"] = {
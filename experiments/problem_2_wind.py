@@ -10,7 +10,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import yaml
 import json
 import math
-from core.cellular_automaton import CellularAutomaton
+from core.batch import ScenarioBatch
 
 def run_problem_2():
     """运行问题二完整模拟"""
@@ -46,72 +46,49 @@ def run_problem_2():
     print(f"  交线距离: {terrain_params['intersection_distance']} m")
     print()
     
-    results = {}
-    
-    # 对每种风况运行模拟
+    # 3种风况 × A、B两个起火点共用同一地形，作为一个批量模拟同步推进
+    scenarios = []
+    scenario_keys = []
     for scenario_id, wind_scenario in wind_scenarios.items():
-        print(f"=== 风况 {scenario_id}: {wind_scenario['description']} ===")
-        
-        # 创建当前风况的配置
-        scenario_config = config.copy()
-        scenario_config['wind_vector'] = [
+        wind_vector = [
             wind_scenario['wind_speed'] * math.cos(math.radians(wind_scenario['wind_direction_deg'])),
             wind_scenario['wind_speed'] * math.sin(math.radians(wind_scenario['wind_direction_deg'])),
             0.0
         ]
+        print(f"风况 {scenario_id} 风向量: {wind_vector}")
         
-        print(f"风向量: {scenario_config['wind_vector']}")
-        
-        scenario_results = {}
-        
-        # ===== 模拟点A起火 =====
-        print(f"\n--- 点A 起火点模拟 ---")
-        point_A = config['ignition_points']['point_A']
-        print(f"起火点位置: {point_A['position']}")
-        
-        ca_A = CellularAutomaton(scenario_config)
-        ca_A.initialize_terrain(terrain_type="ideal", **terrain_params)
-        ca_A.set_ignition_point(point_A['position'], point_A['radius'])
-        
-        print(f"初始点燃元胞数: {len(ca_A.burning_surface_cells)}")
-        
-        # 运行72小时模拟
-        simulation_result_A = ca_A.run_simulation(4320)  # 72小时
-        fire_boundaries_A = extract_fire_boundaries(ca_A, [24*60, 48*60, 72*60])
-        
-        print_summary(f"点A ({scenario_id})", simulation_result_A, fire_boundaries_A, wind_scenario)
-        scenario_results['point_A'] = {
-            'simulation_result': simulation_result_A,
-            'fire_boundaries': fire_boundaries_A,
+        for point in ['point_A', 'point_B']:
+            ignition = config['ignition_points'][point]
+            scenarios.append({
+                'name': f"点{point[-1]} ({scenario_id})",
+                'wind_vector': wind_vector,
+                'ignition_point': ignition['position'],
+                'ignition_radius': ignition['radius']
+            })
+            scenario_keys.append((scenario_id, point))
+    print()
+    
+    batch = ScenarioBatch(config, scenarios)
+    batch.initialize_terrain(terrain_type="ideal", **terrain_params)
+    for b, member in enumerate(batch.members):
+        print(f"{batch.scenario_name(b)} 初始点燃元胞数: {len(member.burning_surface_cells)}")
+    
+    # 运行72小时模拟
+    simulation_results = batch.run_simulation(4320)
+    print()
+    
+    results = {}
+    for b, (scenario_id, point) in enumerate(scenario_keys):
+        wind_scenario = wind_scenarios[scenario_id]
+        fire_boundaries = extract_fire_boundaries(batch.members[b], [24*60, 48*60, 72*60])
+        
+        print_summary(batch.scenario_name(b), simulation_results[b], fire_boundaries, wind_scenario)
+        results.setdefault(scenario_id, {})[point] = {
+            'simulation_result': simulation_results[b],
+            'fire_boundaries': fire_boundaries,
             'wind_scenario': wind_scenario
         }
-        
         print()
-        
-        # ===== 模拟点B起火 =====
-        print(f"--- 点B 起火点模拟 ---")
-        point_B = config['ignition_points']['point_B']
-        print(f"起火点位置: {point_B['position']}")
-        
-        ca_B = CellularAutomaton(scenario_config)
-        ca_B.initialize_terrain(terrain_type="ideal", **terrain_params)
-        ca_B.set_ignition_point(point_B['position'], point_B['radius'])
-        
-        print(f"初始点燃元胞数: {len(ca_B.burning_surface_cells)}")
-        
-        # 运行72小时模拟
-        simulation_result_B = ca_B.run_simulation(4320)
-        fire_boundaries_B = extract_fire_boundaries(ca_B, [24*60, 48*60, 72*60])
-        
-        print_summary(f"点B ({scenario_id})", simulation_result_B, fire_boundaries_B, wind_scenario)
-        scenario_results['point_B'] = {
-            'simulation_result': simulation_result_B,
-            'fire_boundaries': fire_boundaries_B,
-            'wind_scenario': wind_scenario
-        }
-        
-        results[scenario_id] = scenario_results
-        print("\n" + "-" * 50 + "\n")
     
     # 保存详细结果
     save_wind_results(results)
@@ -134,10 +111,8 @@ def extract_fire_boundaries(ca, time_points):
     for time_minutes in time_points:
         time_hours = time_minutes // 60
         
-        burned_cells = []
-        for cell in ca.surface_cells:
-            if cell.dynamic.state.name in ['SURFACE_FIRE', 'BURNED_OUT']:
-                burned_cells.append(cell)
+        # 由到达时间栅格重建该时间点的燃烧和燃尽元胞
+        burned_cells = list(ca.burned_cells_at(time_minutes))
         
         if not burned_cells:
             boundaries[f"{time_hours}h"] = {
@@ -0,0 +1,57 @@
+"""
+自适应步长测试 - 验证每小时历史记录与固定步长落在相同时刻
+Adaptive Time Step Test - Verify Hourly History Matches the Fixed-Step Run
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+from core.cellular_automaton import CellularAutomaton
+
+def run_history(config, adaptive, end_time):
+    """运行一次模拟，返回每小时历史的记录时刻"""
+    test_config = dict(config)
+    test_config['adaptive_time_step'] = adaptive
+
+    ca = CellularAutomaton(test_config)
+    ca.initialize_terrain(
+        terrain_type="ideal",
+        width=100,
+        height=100,
+        slope_angle_deg=30.0,
+        intersection_distance=500.0
+    )
+    center = 50 * test_config.get('cell_size', 10.0)
+    ca.set_ignition_point((center, center), 15.0)
+
+    result = ca.run_simulation(end_time)
+    return [record['time'] for record in result['stats_history']], result['final_time']
+
+def test_adaptive_hourly_history():
+    """自适应步长与固定步长的每小时历史时刻相同"""
+    print("=== 自适应步长每小时历史测试 ===\n")
+
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'problem_1_aggressive.yaml')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['enable_spotting'] = False
+
+    end_time = 180.0
+    fixed_times, fixed_final = run_history(config, False, end_time)
+    adaptive_times, adaptive_final = run_history(config, True, end_time)
+
+    print(f"固定步长历史时刻: {fixed_times}（结束于 {fixed_final:.1f} 分钟）")
+    print(f"自适应步长历史时刻: {adaptive_times}（结束于 {adaptive_final:.1f} 分钟）")
+
+    # 两种推进都只在整点记录；比较双方都仍在运行的时段
+    last_hour = min(fixed_final, adaptive_final)
+    assert all(time % 60.0 == 0.0 for time in adaptive_times), "自适应步长历史未落在整点"
+    assert ([time for time in fixed_times if time <= last_hour] ==
+            [time for time in adaptive_times if time <= last_hour]), "每小时历史时刻不一致"
+
+    print("\n✓ 自适应步长的每小时历史与固定步长一致")
+
+if __name__ == "__main__":
+    test_adaptive_hourly_history()